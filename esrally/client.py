@@ -1,6 +1,13 @@
+import asyncio
+import base64
 import gzip
-import urllib3
+import itertools
+import json
 import logging
+import ssl
+import urllib.parse
+
+import urllib3
 import elasticsearch
 import certifi
 
@@ -29,6 +36,31 @@ class ConfigurableHttpConnection(elasticsearch.Urllib3HttpConnection):
             self.headers.update({"Content-Encoding": "gzip"})
         self.pool = PoolWrap(self.pool, **kwargs)
 
+    def log_request_success(self, method, full_url, path, body, status_code, response, duration):
+        super().log_request_success(method, full_url, path, self._loggable(body), status_code, response, duration)
+
+    def log_request_fail(self, method, full_url, body, duration, status_code=None, response=None, exception=None):
+        super().log_request_fail(method, full_url, self._loggable(body), duration, status_code, response, exception)
+
+    @staticmethod
+    def _loggable(body):
+        # Memory views (e.g. slices of a memory-mapped file) cannot be decoded by the client's logging code. We only copy them if they
+        # are actually logged.
+        if isinstance(body, memoryview):
+            return body.tobytes() if logging.getLogger("elasticsearch").isEnabledFor(logging.DEBUG) else None
+        return body
+
+
+class PassThroughSerializer(elasticsearch.JSONSerializer):
+    """
+    Does not serialize request bodies that are already encoded (e.g. pre-encoded bulk bodies) but behaves like the default serializer
+    otherwise.
+    """
+    def dumps(self, data):
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            return data
+        return super().dumps(data)
+
 
 class EsClientFactory:
     """
@@ -42,7 +74,10 @@ class EsClientFactory:
         if self._is_set(client_options, "basic_auth_user") and self._is_set(client_options, "basic_auth_password"):
             # Maybe we should remove these keys from the dict?
             client_options["http_auth"] = (client_options["basic_auth_user"], client_options["basic_auth_password"])
-        self.client = elasticsearch.Elasticsearch(hosts=hosts, connection_class=ConfigurableHttpConnection, **client_options)
+        self.hosts = hosts
+        self.client_options = client_options
+        self.client = elasticsearch.Elasticsearch(hosts=hosts, connection_class=ConfigurableHttpConnection,
+                                                  serializer=PassThroughSerializer(), **client_options)
 
     def _is_set(self, client_opts, k):
         try:
@@ -52,3 +87,210 @@ class EsClientFactory:
 
     def create(self):
         return self.client
+
+    def create_async(self):
+        """
+        :return: A new ``AsyncEsClient`` with the same hosts and options as the synchronous client. It must only be used from within the
+                 event loop on which it has been created.
+        """
+        return AsyncEsClient(self.hosts, self.client_options)
+
+
+class AsyncEsClient:
+    """
+    A minimal HTTP/1.1 client for Elasticsearch based on asyncio streams. It supports only the APIs that are needed by Rally's
+    asynchronous runners and keeps one idle connection pool per host (connections are reused with keep-alive).
+
+    Error handling mimics the official Python client: HTTP status codes >= 400 raise an ``elasticsearch.TransportError`` (or one of its
+    subclasses) and network issues raise an ``elasticsearch.ConnectionError``.
+    """
+
+    def __init__(self, hosts, client_options):
+        self.hosts = hosts
+        self.use_ssl = client_options.get("use_ssl", False)
+        self.ssl_context = None
+        if self.use_ssl:
+            self.ssl_context = ssl.create_default_context(cafile=client_options.get("ca_certs"))
+            if not client_options.get("verify_certs", True):
+                self.ssl_context.check_hostname = False
+                self.ssl_context.verify_mode = ssl.CERT_NONE
+        self.compressed = client_options.get("compressed", False)
+        self.timeout = client_options.get("timeout", 10)
+        self.headers = {
+            "Content-Type": "application/json",
+            "Connection": "keep-alive"
+        }
+        if "http_auth" in client_options:
+            credentials = ("%s:%s" % client_options["http_auth"]).encode("utf-8")
+            self.headers["Authorization"] = "Basic %s" % base64.b64encode(credentials).decode("ascii")
+        if self.compressed:
+            self.headers["Accept-Encoding"] = "gzip"
+            self.headers["Content-Encoding"] = "gzip"
+        self._host_order = itertools.cycle(range(len(hosts)))
+        self._idle_connections = [[] for _ in hosts]
+
+    async def bulk(self, body, index=None, doc_type=None, params=None):
+        return await self.perform_request("POST", self._path(index, doc_type, "_bulk"), params=params, body=self._bulk_body(body))
+
+    async def search(self, index=None, doc_type=None, body=None, **params):
+        return await self.perform_request("POST", self._path(index, doc_type, "_search"), params=params, body=body)
+
+    async def scroll(self, scroll_id, **params):
+        params["scroll_id"] = scroll_id
+        return await self.perform_request("GET", "/_search/scroll", params=params)
+
+    async def clear_scroll(self, scroll_id):
+        return await self.perform_request("DELETE", "/_search/scroll", body={"scroll_id": [scroll_id]})
+
+    async def perform_request(self, method, path, params=None, body=None):
+        host_index = next(self._host_order)
+        if params:
+            path = "%s?%s" % (path, urllib.parse.urlencode({k: self._param_value(v) for k, v in params.items()}))
+        if body is not None:
+            body = self._encode(body)
+            if self.compressed:
+                body = gzip.compress(body)
+
+        try:
+            # the timeout also covers connection setup so an unreachable host cannot block a client longer than a slow request
+            connection, status, headers, data = await asyncio.wait_for(self._send(host_index, method, path, body), self.timeout)
+        except (OSError, EOFError, asyncio.TimeoutError) as e:
+            raise elasticsearch.ConnectionError("N/A", str(e), e)
+        if headers.get("connection", "").lower() == "close":
+            connection[1].close()
+        else:
+            self._idle_connections[host_index].append(connection)
+
+        if headers.get("content-encoding") == "gzip":
+            data = gzip.decompress(data)
+        raw_data = data.decode("utf-8")
+        if status >= 400:
+            self._raise_error(status, raw_data)
+        if method == "HEAD":
+            return True
+        return json.loads(raw_data) if raw_data else None
+
+    def close(self):
+        for connections in self._idle_connections:
+            for _, writer in connections:
+                writer.close()
+            connections.clear()
+
+    async def _send(self, host_index, method, path, body):
+        """
+        Sends a request on an idle connection to the given host or on a new one if there is none. If the host has closed an idle
+        connection before it has sent any response, the request is retried once on a new connection.
+
+        :return: A tuple of the connection, the HTTP status, the (lower-cased) response headers and the raw response body.
+        """
+        host = self.hosts[host_index]
+        connection = self._idle_connection(host_index)
+        if connection is not None:
+            try:
+                return (connection,) + await self._round_trip(connection, host, method, path, body)
+            except asyncio.IncompleteReadError:
+                # the host has already started to respond so we must not send the request again
+                connection[1].close()
+                raise
+            except (EOFError, ConnectionResetError, BrokenPipeError):
+                logger.debug("Idle connection to [%s:%s] has been closed. Retrying on a new connection." % (host["host"], host["port"]))
+                connection[1].close()
+            except BaseException:
+                connection[1].close()
+                raise
+        connection = await asyncio.open_connection(host["host"], host["port"], ssl=self.ssl_context)
+        try:
+            return (connection,) + await self._round_trip(connection, host, method, path, body)
+        except BaseException:
+            connection[1].close()
+            raise
+
+    def _idle_connection(self, host_index):
+        idle = self._idle_connections[host_index]
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    async def _round_trip(self, connection, host, method, path, body):
+        reader, writer = connection
+        request = ["%s %s HTTP/1.1" % (method, path), "Host: %s:%s" % (host["host"], host["port"])]
+        for k, v in self.headers.items():
+            request.append("%s: %s" % (k, v))
+        request.append("Content-Length: %d" % (len(body) if body is not None else 0))
+        writer.write(("\r\n".join(request) + "\r\n\r\n").encode("latin-1"))
+        if body is not None:
+            writer.write(body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise EOFError("Connection closed by remote host")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            k, v = line.decode("latin-1").split(":", 1)
+            headers[k.strip().lower()] = v.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    # skip trailers
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            data = b"".join(chunks)
+        elif method == "HEAD":
+            data = b""
+        else:
+            data = await reader.readexactly(int(headers.get("content-length", 0)))
+        return status, headers, data
+
+    def _raise_error(self, status_code, raw_data):
+        error_message = raw_data
+        additional_info = None
+        try:
+            additional_info = json.loads(raw_data)
+            error_message = additional_info.get("error", error_message)
+            if isinstance(error_message, dict) and "type" in error_message:
+                error_message = error_message["type"]
+        except (ValueError, AttributeError):
+            pass
+        raise elasticsearch.exceptions.HTTP_EXCEPTIONS.get(status_code, elasticsearch.TransportError)(status_code, error_message,
+                                                                                                      additional_info)
+
+    @staticmethod
+    def _path(index, doc_type, endpoint):
+        return "/" + "/".join(p for p in [index, doc_type, endpoint] if p)
+
+    @staticmethod
+    def _param_value(v):
+        if isinstance(v, bool):
+            return "true" if v else "false"
+        return v
+
+    @staticmethod
+    def _bulk_body(body):
+        if isinstance(body, (str, bytes, bytearray, memoryview)):
+            return body
+        lines = [line if isinstance(line, str) else json.dumps(line) for line in body]
+        lines.append("")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _encode(body):
+        if isinstance(body, str):
+            return body.encode("utf-8")
+        elif isinstance(body, (bytes, bytearray, memoryview)):
+            return body
+        else:
+            return json.dumps(body).encode("utf-8")
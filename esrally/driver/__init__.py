@@ -1 +1 @@
-from .driver import Driver, StartBenchmark, BenchmarkComplete, BenchmarkFailure
+from .driver import Driver, StartBenchmark, UpdateMetrics, BenchmarkComplete, BenchmarkFailure, is_local_load_driver
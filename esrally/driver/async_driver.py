@@ -0,0 +1,259 @@
+import asyncio
+import concurrent.futures
+import datetime
+import logging
+import threading
+import time
+
+import elasticsearch
+import thespian.actors
+from esrally import exceptions, track, client
+from esrally.driver import driver, runner, scheduler
+from esrally.utils import convert
+
+logger = logging.getLogger("rally.driver")
+
+
+class AsyncLoadGenerator(thespian.actors.Actor):
+    """
+    A load generator that runs all of its clients as coroutines on an asyncio event loop within a single process.
+
+    Each client runs the tasks of its row in the allocation matrix until it reaches the next join point. When all clients of this load
+    generator have reached the join point, it notifies the master (i.e. from the master's perspective it behaves like one large client).
+    """
+
+    WAKEUP_INTERVAL_SECONDS = 5
+
+    actorSystemCapabilityCheck = staticmethod(driver.load_driver_capability_check)
+
+    def __init__(self):
+        super().__init__()
+        self.master = None
+        self.worker_id = None
+        self.es = None
+        self.config = None
+        self.track = None
+        self.client_allocations = None
+        self.current_tasks = None
+        self.start_timestamp = None
+        self.loop = None
+        self.loop_thread = None
+        self.async_es = None
+        self.pool = None
+        self.executor_future = None
+        self.samplers = []
+        self.start_driving = False
+
+    def receiveMessage(self, msg, sender):
+        try:
+            if isinstance(msg, driver.StartWorker):
+                logger.debug("load generator [%d] is about to start." % msg.worker_id)
+                self.master = sender
+                self.worker_id = msg.worker_id
+                self.config = msg.config
+                self.track = msg.track
+                self.client_allocations = msg.client_allocations
+                self.current_tasks = {client_id: 0 for client_id in self.client_allocations.keys()}
+                driver.pin_to_cpu(self.config, self.worker_id, msg.local_id)
+                es_client_factory = client.EsClientFactory(self.config.opts("client", "hosts"), self.config.opts("client", "options"))
+                self.es = es_client_factory.create()
+                # synchronous runners block and thus run on a separate thread pool. Threads are only created on demand.
+                self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=len(self.client_allocations))
+                self.start_event_loop()
+                self.async_es = self.run_in_loop(self.create_async_client(es_client_factory)).result()
+                self.start_timestamp = time.perf_counter()
+                track.load_track_plugins(self.config, runner.register_runner, scheduler.register_scheduler)
+                self.drive()
+            elif isinstance(msg, driver.ClockSyncRequest):
+                self.send(sender, driver.ClockSyncResponse(msg.worker_id, msg.master_timestamp))
+            elif isinstance(msg, driver.Drive):
+                logger.debug("Load generator [%d] is continuing its work on [%f]." % (self.worker_id, msg.client_start_timestamp))
+                self.master = sender
+                self.start_driving = True
+                self.wakeupAfter(datetime.timedelta(seconds=max(msg.client_start_timestamp - time.perf_counter(), 0)))
+            elif isinstance(msg, thespian.actors.WakeupMessage):
+                if self.start_driving:
+                    self.start_driving = False
+                    self.drive()
+                else:
+                    self.send_samples()
+                    if self.executor_future is not None:
+                        if self.executor_future.done():
+                            e = self.executor_future.exception(timeout=0)
+                            if e:
+                                self.send(self.master, driver.BenchmarkFailure("Error in load generator [%d]" % self.worker_id, e))
+                            else:
+                                self.executor_future = None
+                                self.join_point_reached()
+                        else:
+                            self.wakeupAfter(datetime.timedelta(seconds=AsyncLoadGenerator.WAKEUP_INTERVAL_SECONDS))
+            elif isinstance(msg, thespian.actors.ActorExitRequest):
+                self.stop_event_loop()
+            else:
+                logger.debug("load generator [%s] received unknown message [%s] (ignoring)." % (str(self.worker_id), str(msg)))
+        except Exception as e:
+            logger.exception("Fatal error in load generator [%s]" % str(self.worker_id))
+            self.send(self.master, driver.BenchmarkFailure("Fatal error in load generator [%s]" % str(self.worker_id), e))
+
+    def start_event_loop(self):
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, name="rally-load-generator-%d" % self.worker_id, daemon=True)
+        self.loop_thread.start()
+
+    def stop_event_loop(self):
+        if self.loop:
+            if self.async_es:
+                self.loop.call_soon_threadsafe(self.async_es.close)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop = None
+        if self.pool:
+            self.pool.shutdown(wait=False)
+            self.pool = None
+
+    def run_in_loop(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    async def create_async_client(self, es_client_factory):
+        return es_client_factory.create_async()
+
+    def drive(self):
+        self.samplers = []
+        self.executor_future = self.run_in_loop(self.run_clients())
+        self.wakeupAfter(datetime.timedelta(seconds=AsyncLoadGenerator.WAKEUP_INTERVAL_SECONDS))
+
+    def join_point_reached(self):
+        self.send_samples(task_finished=True)
+        self.samplers = []
+        # all clients of this load generator have reached the same join point
+        join_point = self.current_join_point
+        logger.info("load generator [%d] reached join point [%s]." % (self.worker_id, join_point))
+        self.send(self.master, driver.JoinPointReached(self.worker_id, join_point))
+
+    @property
+    def current_join_point(self):
+        client_id, current_task = next(iter(self.current_tasks.items()))
+        return self.client_allocations[client_id][current_task - 1]
+
+    async def run_clients(self):
+        await asyncio.gather(*[self.run_client(client_id) for client_id in self.client_allocations.keys()])
+
+    async def run_client(self, client_id):
+        """
+        Runs all tasks of a client until it reaches the next join point.
+        """
+        tasks = self.client_allocations[client_id]
+        while True:
+            task = tasks[self.current_tasks[client_id]]
+            self.current_tasks[client_id] += 1
+            if task is None:
+                continue
+            elif isinstance(task, driver.JoinPoint):
+                logger.debug("client [%d] reached join point [%s]." % (client_id, task))
+                return
+            elif isinstance(task, track.Task):
+                logger.info("Client [%d] is executing [%s]." % (client_id, task))
+                sampler = driver.Sampler(client_id, task, self.start_timestamp)
+                self.samplers.append(sampler)
+                schedule = driver.schedule_for(self.track, task, client_id, asynchronous=True, sampler=sampler)
+                await execute_schedule_async(schedule, self.es, self.async_es, sampler, self.pool)
+            else:
+                raise exceptions.RallyAssertionError("Unknown task type [%s]" % type(task))
+
+    def send_samples(self, task_finished=False):
+        samples = [s for s in (sampler.samples for sampler in self.samplers) if len(s) > 0]
+        histograms = [h for sampler in self.samplers for h in sampler.histograms] if task_finished else []
+        results = [r for sampler in self.samplers for r in sampler.results] if task_finished else []
+        if len(samples) > 0 or len(histograms) > 0 or len(results) > 0:
+            self.send(self.master, driver.UpdateSamples(self.worker_id, samples, histograms, results))
+
+
+async def execute_schedule_async(schedule, es, async_es, sampler, pool):
+    """
+    Executes tasks according to the schedule for a given operation. This is the asynchronous counterpart of ``driver.execute_schedule``.
+
+    If throughput is throttled, each request is issued at its intended start time regardless of whether previous requests of this client
+    have already completed (i.e. the client behaves like an open system). Therefore, a slow response does not delay subsequent requests and
+    latency is always measured against the intended start time.
+
+    :param schedule: The schedule for this operation.
+    :param es: Elasticsearch client that will be used to execute synchronous runners.
+    :param async_es: Asynchronous Elasticsearch client that will be used to execute asynchronous runners.
+    :param sampler: A container to store raw samples.
+    :param pool: A thread pool that is used to execute synchronous runners.
+    """
+    total_start = time.perf_counter()
+    pending = set()
+    failures = []
+
+    def request_done(f):
+        pending.discard(f)
+        if not f.cancelled() and f.exception() is not None:
+            failures.append(f.exception())
+
+    # noinspection PyBroadException
+    try:
+        for entry in schedule:
+            if failures:
+                raise failures[0]
+            if entry is driver.PENDING_REQUESTS_BARRIER:
+                if pending:
+                    await asyncio.wait(pending)
+                continue
+            expected_scheduled_time, sample_type, percent_completed, runner, params = entry
+            absolute_expected_schedule_time = total_start + expected_scheduled_time
+            throughput_throttled = expected_scheduled_time > 0
+            if throughput_throttled:
+                rest = absolute_expected_schedule_time - time.perf_counter()
+                if rest > 0:
+                    await asyncio.sleep(rest)
+                request = asyncio.ensure_future(execute_request_async(runner, es, async_es, params, pool, sampler, sample_type,
+                                                                      percent_completed, total_start, absolute_expected_schedule_time))
+                pending.add(request)
+                request.add_done_callback(request_done)
+            else:
+                await execute_request_async(runner, es, async_es, params, pool, sampler, sample_type, percent_completed, total_start)
+        if pending:
+            await asyncio.wait(pending)
+        if failures:
+            raise failures[0]
+    except BaseException:
+        logger.exception("Could not execute schedule")
+        for request in pending:
+            request.cancel()
+        raise
+
+
+async def execute_request_async(runner, es, async_es, params, pool, sampler, sample_type, percent_completed, total_start,
+                                absolute_expected_schedule_time=None):
+    """
+    Executes a single request and adds its sample to the sampler. If ``absolute_expected_schedule_time`` is provided, latency is measured
+    against this intended start time.
+    """
+    start = time.perf_counter()
+    total_ops, total_ops_unit, request_meta_data = await execute_single_async(runner, es, async_es, params, pool)
+    stop = time.perf_counter()
+
+    service_time = stop - start
+    # Do not calculate latency separately when we don't throttle throughput. This metric is just confusing then.
+    latency = stop - absolute_expected_schedule_time if absolute_expected_schedule_time is not None else service_time
+    sampler.add(sample_type, request_meta_data, convert.seconds_to_ms(latency), convert.seconds_to_ms(service_time), total_ops,
+                total_ops_unit, (stop - total_start), percent_completed)
+
+
+async def execute_single_async(runner_for_op, es, async_es, params, pool):
+    """
+    Invokes the given runner once and provides the runner's return value in a uniform structure. Synchronous runners are executed on the
+    provided thread pool so they do not block the event loop.
+
+    :return: a triple of: total number of operations, unit of operations, a dict of request meta data (may be None).
+    """
+    if not runner.is_async(runner_for_op):
+        return await asyncio.get_event_loop().run_in_executor(pool, driver.execute_single, runner_for_op, es, params)
+    try:
+        with runner_for_op:
+            return_value = await runner_for_op(async_es, params)
+        return driver.runner_result(return_value)
+    except elasticsearch.TransportError as e:
+        return driver.transport_error_result(e)
+    except KeyError as e:
+        raise driver.missing_parameters_error(runner_for_op, params, e)
@@ -1,16 +1,20 @@
+import array
+import bisect
+import collections
 import concurrent.futures
 import datetime
+import heapq
 import json
 import logging
-import queue
 import socket
 import time
 
 import elasticsearch
 import thespian.actors
 from esrally import exceptions, metrics, track, client, PROGRAM_NAME
-from esrally.driver import runner
-from esrally.utils import convert, console, versions, io
+from esrally.driver import runner, scheduler, live_stats
+from esrally.track import params as track_params
+from esrally.utils import convert, console, versions, io, sysstats, histogram
 
 logger = logging.getLogger("rally.driver")
 
@@ -43,19 +47,41 @@ class StartLoadGenerator:
     Starts a load generator.
     """
 
-    def __init__(self, client_id, config, track, tasks):
+    def __init__(self, client_id, local_id, config, track, tasks):
         """
         :param client_id: Client id of the load generator.
+        :param local_id: Id of the load generator among all load generators on the same load driver host.
         :param config: Rally internal configuration object.
         :param track: The track to use.
         :param tasks: Tasks to run.
         """
         self.client_id = client_id
+        self.local_id = local_id
         self.config = config
         self.track = track
         self.tasks = tasks
 
 
+class StartWorker:
+    """
+    Starts a load generator that hosts multiple clients (see ``async_driver.AsyncLoadGenerator``).
+    """
+
+    def __init__(self, worker_id, local_id, config, track, client_allocations):
+        """
+        :param worker_id: Id of this load generator.
+        :param local_id: Id of this load generator among all load generators on the same load driver host.
+        :param config: Rally internal configuration object.
+        :param track: The track to use.
+        :param client_allocations: A dict from client id to the tasks this client should run (a row of the allocation matrix).
+        """
+        self.worker_id = worker_id
+        self.local_id = local_id
+        self.config = config
+        self.track = track
+        self.client_allocations = client_allocations
+
+
 class Drive:
     """
     Tells a load generator to drive (either after a join point or initially).
@@ -70,9 +96,19 @@ class UpdateSamples:
     Used to send samples from a load generator node to the master.
     """
 
-    def __init__(self, client_id, samples):
+    def __init__(self, client_id, samples, histograms=None, results=None):
+        """
+        :param client_id: The id of the client (or load generator) that sends the samples.
+        :param samples: A list of ``SampleBatch``.
+        :param histograms: A list of tuples of: task, sample type, metric name and the corresponding ``Histogram``. Optional. Histograms
+                           are only sent once the client has finished a task.
+        :param results: A list of tuples of: task, metric name, value and unit. Optional. Results are determined by clients once per task
+                        (e.g. the outcome of a throughput search) and are only sent once the client has finished a task.
+        """
         self.client_id = client_id
         self.samples = samples
+        self.histograms = histograms if histograms is not None else []
+        self.results = results if results is not None else []
 
 
 class JoinPointReached:
@@ -80,15 +116,69 @@ class JoinPointReached:
     Tells the master that a load generator has reached a join point. Used for coordination across multiple load generators.
     """
 
-    def __init__(self, client_id, task):
-        self.client_id = client_id
-        self.client_local_timestamp = time.perf_counter()
+    def __init__(self, worker_id, task):
+        """
+        :param worker_id: The id of the load generator. For load generators that host a single client, this is the client id.
+        :param task: The join point that has been reached.
+        """
+        self.worker_id = worker_id
         self.task = task
 
 
+class PrepareTrack:
+    """
+    Tells a load driver host to ensure that all track data are available locally.
+    """
+
+    def __init__(self, config, track, track_revision=None):
+        """
+        :param config: Rally internal configuration object.
+        :param track: The track to prepare.
+        :param track_revision: The revision of the track repository on the coordinator. If provided, the load driver host must use the
+                               same revision. It is only needed for hosts other than the coordinator.
+        """
+        self.config = config
+        self.track = track
+        self.track_revision = track_revision
+
+
+class TrackPrepared:
+    """
+    Tells the master that track data are available on a load driver host.
+    """
+    pass
+
+
+class ClockSyncRequest:
+    """
+    Asks a load generator for its current (monotonic) clock value. Used to determine the clock offset between the master and load
+    generators that may run on other machines.
+    """
+
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.master_timestamp = time.perf_counter()
+
+
+class ClockSyncResponse:
+    def __init__(self, worker_id, master_timestamp):
+        self.worker_id = worker_id
+        self.master_timestamp = master_timestamp
+        self.worker_timestamp = time.perf_counter()
+
+
+class UpdateMetrics:
+    """
+    Used to send a batch of metrics from the master to the benchmark coordinator while the benchmark is running.
+    """
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+
 class BenchmarkComplete:
     """
-    Indicates that the benchmark is complete.
+    Indicates that the benchmark is complete. Contains all metrics that have not been sent with ``UpdateMetrics`` yet.
     """
 
     def __init__(self, metrics):
@@ -107,6 +197,9 @@ class BenchmarkFailure:
 
 class Driver(thespian.actors.Actor):
     WAKEUP_INTERVAL_SECONDS = 1
+    # upper bound for the number of metrics documents that the master keeps in memory before sending them to the benchmark coordinator
+    METRICS_BATCH_SIZE = 10000
+    CLOCK_SYNC_ROUNDS = 10
     """
     Coordinates all worker drivers.
     """
@@ -116,12 +209,23 @@ class Driver(thespian.actors.Actor):
         self.config = None
         self.track = None
         self.challenge = None
+        self.start_msg = None
+        self.load_driver_hosts = None
+        self.track_preparators = []
+        self.hosts_prepared = 0
         # Elasticsearch client
         self.es = None
         self.metrics_store = None
-        self.raw_samples = []
+        self.throughput_calculator = None
+        self.histograms = {}
+        self.results = collections.OrderedDict()
+        # task -> (absolute) start time; only needed to tag throughput samples with the stage of a load profile
+        self.task_start_times = {}
+        self.load_profiles = {}
         self.currently_completed = 0
-        self.clients_completed_current_step = {}
+        self.start_messages = []
+        self.clock_sync_samples = {}
+        self.clock_offsets = {}
         self.current_step = -1
         self.number_of_steps = 0
         self.start_sender = None
@@ -133,11 +237,18 @@ class Driver(thespian.actors.Actor):
         self.progress_counter = 0
         self.quiet = False
         self.most_recent_sample_per_client = {}
+        self.live_stats = None
+        self.live_stats_server = None
+        self.live_stats_console = False
 
     def receiveMessage(self, msg, sender):
         try:
             if isinstance(msg, StartBenchmark):
                 self.start_benchmark(msg, sender)
+            elif isinstance(msg, TrackPrepared):
+                self.track_prepared()
+            elif isinstance(msg, ClockSyncResponse):
+                self.clock_sync_response_received(msg)
             elif isinstance(msg, JoinPointReached):
                 self.joinpoint_reached(msg)
             elif isinstance(msg, UpdateSamples):
@@ -145,35 +256,62 @@ class Driver(thespian.actors.Actor):
             elif isinstance(msg, thespian.actors.WakeupMessage):
                 if not self.finished():
                     self.update_progress_message()
+                    self.store_throughput(self.throughput_calculator.calculate())
+                    self.send_metrics()
                     self.wakeupAfter(datetime.timedelta(seconds=Driver.WAKEUP_INTERVAL_SECONDS))
             elif isinstance(msg, BenchmarkFailure):
                 logger.error("Main driver received a fatal exception from a load generator. Shutting down.")
-                self.metrics_store.close()
-                for driver in self.drivers:
-                    self.send(driver, thespian.actors.ActorExitRequest())
+                self.shutdown()
                 self.send(self.start_sender, msg)
                 self.send(self.myAddress, thespian.actors.ActorExitRequest())
         except Exception as e:
             logger.exception("Main driver encountered a fatal exception. Shutting down.")
-            self.metrics_store.close()
-            for driver in self.drivers:
-                self.send(driver, thespian.actors.ActorExitRequest())
+            self.shutdown()
             self.send(self.start_sender, BenchmarkFailure("Could not execute benchmark", e))
             self.send(self.myAddress, thespian.actors.ActorExitRequest())
 
+    def shutdown(self):
+        self.stop_live_stats()
+        if self.metrics_store:
+            self.metrics_store.close()
+        for actor in self.track_preparators + self.drivers:
+            self.send(actor, thespian.actors.ActorExitRequest())
+
     def start_benchmark(self, msg, sender):
         self.start_sender = sender
+        self.start_msg = msg
         self.config = msg.config
         self.track = msg.track
-
-        logger.info("Preparing track")
-        # TODO #71: Reconsider this in case we distribute drivers. *For now* the driver will only be on a single machine, so we're safe.
-        track.prepare_track(self.track, self.config)
+        self.load_driver_hosts = self.config.opts("driver", "load_driver_hosts", mandatory=False, default_value=["localhost"])
+
+        # track data have to be available on each load driver host
+        logger.info("Preparing track on load driver hosts %s." % self.load_driver_hosts)
+        track_revision = None
+        for host in sorted(set(self.load_driver_hosts)):
+            if is_local_load_driver(host):
+                revision = None
+            else:
+                # remote hosts load track plugins from their own track repository
+                if track_revision is None:
+                    track_revision = track.track_revision(self.config)
+                revision = track_revision
+            preparator = self.create_actor_on(TrackPreparator, host)
+            self.track_preparators.append(preparator)
+            self.send(preparator, PrepareTrack(self.config, self.track, revision))
+
+    def track_prepared(self):
+        self.hosts_prepared += 1
+        if self.hosts_prepared < len(self.track_preparators):
+            return
+        for preparator in self.track_preparators:
+            self.send(preparator, thespian.actors.ActorExitRequest())
+        self.track_preparators = []
 
         logger.info("Benchmark is about to start.")
         self.quiet = self.config.opts("system", "quiet.mode", mandatory=False, default_value=False)
         self.es = client.EsClientFactory(self.config.opts("client", "hosts"), self.config.opts("client", "options")).create()
-        self.metrics_store = metrics.InMemoryMetricsStore(config=self.config, meta_info=msg.metrics_meta_info, lap=msg.lap)
+        self.metrics_store = metrics.InMemoryMetricsStore(config=self.config, meta_info=self.start_msg.metrics_meta_info,
+                                                          lap=self.start_msg.lap)
         invocation = self.config.opts("meta", "time.start")
         expected_cluster_health = self.config.opts("benchmarks", "cluster.health")
         track_name = self.config.opts("benchmarks", "track")
@@ -197,17 +335,94 @@ class Driver(thespian.actors.Actor):
         logger.info("Benchmark consists of [%d] steps executed by (at most) [%d] clients as specified by the allocation matrix:\n%s" %
                     (self.number_of_steps, len(self.allocations), self.allocations))
 
-        for client_id in range(allocator.clients):
-            self.drivers.append(self.createActor(LoadGenerator))
-        for client_id, driver in enumerate(self.drivers):
-            self.send(driver, StartLoadGenerator(client_id, self.config, self.track, self.allocations[client_id]))
-
-        self.update_progress_message()
-        self.wakeupAfter(datetime.timedelta(seconds=Driver.WAKEUP_INTERVAL_SECONDS))
+        hosts = self.load_driver_hosts
+        client_hosts = {}
+        engine = self.config.opts("driver", "engine", mandatory=False, default_value="thread")
+        if engine == "async" and self.config.opts("driver", "params.prefetch.size", mandatory=False, default_value=0) > 0:
+            # clients would wait for parameters on the event loop and thus block all other clients of the same load generator
+            raise exceptions.SystemSetupError("Prefetching parameters is not supported by the 'async' load driver engine.")
+        if engine == "async":
+            # clients run as coroutines within a pool of load generator processes on each load driver host
+            workers = number_of_workers(self.config) * len(hosts)
+            for worker_id, client_allocations in enumerate(allocate_clients_to_workers(self.allocations, workers)):
+                host = hosts[worker_id % len(hosts)]
+                # referenced by name to avoid a circular import
+                worker = self.create_actor_on("esrally.driver.async_driver.AsyncLoadGenerator", host)
+                self.drivers.append(worker)
+                # load generators are spread round-robin across hosts so this is the n-th load generator on its host
+                self.start_messages.append(StartWorker(worker_id, worker_id // len(hosts), self.config, self.track, client_allocations))
+                for client_id in client_allocations.keys():
+                    client_hosts[client_id] = host
+        elif engine == "thread":
+            for client_id in range(allocator.clients):
+                host = hosts[client_id % len(hosts)]
+                worker = self.create_actor_on(LoadGenerator, host)
+                self.drivers.append(worker)
+                self.start_messages.append(StartLoadGenerator(client_id, client_id // len(hosts), self.config, self.track,
+                                                              self.allocations[client_id]))
+                client_hosts[client_id] = host
+        else:
+            raise exceptions.SystemSetupError("Unknown load driver engine [%s]. Use one of 'thread' or 'async'." % engine)
+
+        throughput_series = self.config.opts("reporting", "throughput.series", mandatory=False, default_value=[])
+        for series in throughput_series:
+            if series not in ["client", "host"]:
+                raise exceptions.SystemSetupError("Unknown throughput series [%s]. Use one of 'client' or 'host'." % series)
+        self.throughput_calculator = ThroughputCalculator(
+            bucket_interval_secs=self.config.opts("reporting", "throughput.bucket.interval", mandatory=False, default_value=1),
+            per_client="client" in throughput_series,
+            client_hosts=client_hosts if "host" in throughput_series else None)
+
+        self.start_live_stats()
+
+        # load generators may run on other machines so we need to know their clock offset before we can coordinate them
+        for worker_id, driver in enumerate(self.drivers):
+            self.clock_sync_samples[worker_id] = []
+            self.send(driver, ClockSyncRequest(worker_id))
+
+    def start_live_stats(self):
+        port = int(self.config.opts("reporting", "live.stats.port", mandatory=False, default_value=0))
+        self.live_stats_console = self.config.opts("reporting", "live.stats.console", mandatory=False, default_value=False)
+        if port > 0 or self.live_stats_console:
+            self.live_stats = live_stats.LiveStats()
+        if port > 0:
+            host = self.config.opts("reporting", "live.stats.host", mandatory=False, default_value="localhost")
+            try:
+                self.live_stats_server = live_stats.LiveStatsServer(self.live_stats, host, port)
+            except OSError as e:
+                raise exceptions.SystemSetupError("Cannot serve live stats on [%s:%d]: %s" % (host, port, str(e)))
+            self.live_stats_server.start()
+            console.info("Live stats are available at http://%s:%d/stats" % (host, port), logger=logger)
+
+    def stop_live_stats(self):
+        if self.live_stats_server:
+            self.live_stats_server.close()
+            self.live_stats_server = None
+
+    def create_actor_on(self, actor_class, host):
+        try:
+            return self.createActor(actor_class, targetActorRequirements=load_driver_requirements(host))
+        except thespian.actors.NoCompatibleSystemForActor:
+            raise exceptions.SystemSetupError("Could not start a load driver on [%s]. Please check that %sd is running on this host and "
+                                              "that it has joined the actor system of the coordinator." % (host, PROGRAM_NAME))
+
+    def clock_sync_response_received(self, msg):
+        samples = self.clock_sync_samples[msg.worker_id]
+        samples.append((msg.master_timestamp, msg.worker_timestamp, time.perf_counter()))
+        if len(samples) < Driver.CLOCK_SYNC_ROUNDS:
+            self.send(self.drivers[msg.worker_id], ClockSyncRequest(msg.worker_id))
+        else:
+            self.clock_offsets[msg.worker_id] = estimate_clock_offset(samples)
+            logger.info("Clock offset of load generator [%d] is [%f] seconds." % (msg.worker_id, self.clock_offsets[msg.worker_id]))
+            if len(self.clock_offsets) == len(self.drivers):
+                for driver, start_message in zip(self.drivers, self.start_messages):
+                    self.send(driver, start_message)
+                self.start_messages = []
+                self.update_progress_message()
+                self.wakeupAfter(datetime.timedelta(seconds=Driver.WAKEUP_INTERVAL_SECONDS))
 
     def joinpoint_reached(self, msg):
         self.currently_completed += 1
-        self.clients_completed_current_step[msg.client_id] = (msg.client_local_timestamp, time.perf_counter())
         logger.debug("[%d/%d] drivers reached join point [%d/%d]." %
                      (self.currently_completed, len(self.drivers), self.current_step + 1, self.number_of_steps))
         if self.currently_completed == len(self.drivers):
@@ -215,85 +430,134 @@ class Driver(thespian.actors.Actor):
                         (self.current_step + 1, self.number_of_steps))
             # we can go on to the next step
             self.currently_completed = 0
-            # make a copy and reset early to avoid any race conditions from clients that reach a join point already while we are sending...
-            clients_curr_step = self.clients_completed_current_step
-            self.clients_completed_current_step = {}
             self.update_progress_message(task_finished=True)
+            if self.live_stats:
+                self.live_stats.clear()
+            # all samples of this step have arrived
+            self.store_throughput(self.throughput_calculator.calculate(final=True))
+            self.store_histograms()
+            self.store_results()
             # clear per step
             self.most_recent_sample_per_client = {}
+            self.task_start_times = {}
             self.current_step += 1
             if self.finished():
                 logger.info("All steps completed. Shutting down.")
+                self.stop_live_stats()
                 # we're done here
                 for driver in self.drivers:
                     self.send(driver, thespian.actors.ActorExitRequest())
-                logger.info("Postprocessing samples...")
-                self.post_process_samples()
-                logger.info("Sending benchmark results...")
-                self.send(self.start_sender, BenchmarkComplete(self.metrics_store.to_externalizable()))
+                logger.info("Sending remaining benchmark results...")
+                self.send(self.start_sender, BenchmarkComplete(self.metrics_store.to_externalizable(clear=True)))
                 logger.info("Closing metrics store...")
                 self.metrics_store.close()
                 # immediately clear as we don't need it anymore and it can consume a significant amount of memory
-                del self.metrics_store
+                self.metrics_store = None
                 logger.info("Terminating main driver actor.")
                 self.send(self.myAddress, thespian.actors.ActorExitRequest())
             else:
-                # start the next task in five seconds (relative to master's timestamp)
-                #
-                # Assumption: We don't have a lot of clock skew between reaching the join point and sending the next task
-                #             (it doesn't matter too much if we're a few ms off).
+                # start the next task in five seconds (relative to master's timestamp) and translate this to the clock of each load
+                # generator based on the clock offset that we have determined initially.
+                self.send_metrics()
                 start_next_task = time.perf_counter() + 5.0
-                for client_id, driver in enumerate(self.drivers):
-                    client_ended_task_at, master_received_msg_at = clients_curr_step[client_id]
-                    client_start_timestamp = client_ended_task_at + (start_next_task - master_received_msg_at)
-                    logger.info("Scheduling next task for client id [%d] at their timestamp [%f] (master timestamp [%f])" %
-                                (client_id, client_start_timestamp, start_next_task))
+                for worker_id, driver in enumerate(self.drivers):
+                    client_start_timestamp = start_next_task + self.clock_offsets[worker_id]
+                    logger.info("Scheduling next task for load generator [%d] at their timestamp [%f] (master timestamp [%f])" %
+                                (worker_id, client_start_timestamp, start_next_task))
                     self.send(driver, Drive(client_start_timestamp))
 
     def finished(self):
         return self.current_step == self.number_of_steps
 
     def update_samples(self, msg):
-        self.raw_samples += msg.samples
-        if len(msg.samples) > 0:
-            most_recent = msg.samples[-1]
-            self.most_recent_sample_per_client[most_recent.client_id] = most_recent
-
-    def post_process_samples(self):
-        logger.info("Storing latency and service time... ")
-        for sample in self.raw_samples:
-            meta_data = self.merge(
-                self.track.meta_data,
-                self.challenge.meta_data,
-                sample.operation.meta_data,
-                sample.task.meta_data,
-                sample.request_meta_data)
-
-            self.metrics_store.put_value_cluster_level(name="latency", value=sample.latency_ms, unit="ms", operation=sample.operation.name,
-                                                       operation_type=sample.operation.type, sample_type=sample.sample_type,
-                                                       absolute_time=sample.absolute_time, relative_time=sample.relative_time,
-                                                       meta_data=meta_data)
-
-            self.metrics_store.put_value_cluster_level(name="service_time", value=sample.service_time_ms, unit="ms",
-                                                       operation=sample.operation.name, operation_type=sample.operation.type,
-                                                       sample_type=sample.sample_type, absolute_time=sample.absolute_time,
-                                                       relative_time=sample.relative_time, meta_data=meta_data)
-
-        logger.info("Calculating throughput... ")
-        aggregates = calculate_global_throughput(self.raw_samples)
-        logger.info("Storing throughput... ")
-        for task, samples in aggregates.items():
-            meta_data = self.merge(
-                self.track.meta_data,
-                self.challenge.meta_data,
-                task.operation.meta_data,
-                task.meta_data
-            )
+        for batch in msg.samples:
+            if len(batch) > 0:
+                # a load generator may host multiple clients so we cannot just use the last sample
+                self.most_recent_sample_per_client[batch.client_id] = batch[-1]
+                self.throughput_calculator.add_batch(batch)
+                if batch.task.load_profile:
+                    start_time = batch.absolute_time[0] - batch.time_period[0]
+                    self.task_start_times[batch.task] = min(start_time, self.task_start_times.get(batch.task, start_time))
+                if self.live_stats:
+                    self.live_stats.add_batch(batch)
+        # latency and service time of each client are already recorded in histograms which are merged here
+        for task, sample_type, name, h in msg.histograms:
+            key = (task, sample_type, name)
+            if key in self.histograms:
+                self.histograms[key].add(h)
+            else:
+                self.histograms[key] = h
+        # results of all clients are summed up (e.g. the capacity that each client has determined in a throughput search)
+        for task, name, value, unit in msg.results:
+            key = (task, name)
+            if key in self.results:
+                self.results[key] = (self.results[key][0] + value, unit)
+            else:
+                self.results[key] = (value, unit)
+        if len(self.metrics_store.docs) >= Driver.METRICS_BATCH_SIZE:
+            self.send_metrics()
+
+    def task_meta_data(self, task, *args):
+        return self.merge(
+            self.track.meta_data,
+            self.challenge.meta_data,
+            task.operation.meta_data,
+            task.meta_data,
+            *args
+        )
+
+    def store_histograms(self):
+        for (task, sample_type, name), h in self.histograms.items():
             op = task.operation
-            for absolute_time, relative_time, sample_type, throughput, throughput_unit in samples:
-                self.metrics_store.put_value_cluster_level(name="throughput", value=throughput, unit=throughput_unit,
-                                                           operation=op.name, operation_type=op.type, sample_type=sample_type,
-                                                           absolute_time=absolute_time, relative_time=relative_time, meta_data=meta_data)
+            self.metrics_store.put_histogram_cluster_level(name=name, histogram=h, unit="ms", operation=op.name, operation_type=op.type,
+                                                           sample_type=sample_type, meta_data=self.task_meta_data(task))
+        self.histograms = {}
+
+    def store_results(self):
+        for (task, name), (value, unit) in self.results.items():
+            op = task.operation
+            self.metrics_store.put_value_cluster_level(name=name, value=value, unit=unit, operation=op.name, operation_type=op.type,
+                                                       meta_data=self.task_meta_data(task))
+        self.results = collections.OrderedDict()
+
+    def store_throughput(self, aggregates):
+        for task, samples in aggregates.items():
+            self.put_throughput("throughput", task, samples)
+        # group the series so meta-data are merged only once per client (or host)
+        series = collections.OrderedDict()
+        for name, task, key, absolute_time, relative_time, sample_type, throughput, throughput_unit in \
+                self.throughput_calculator.pop_series():
+            series.setdefault((name, task, key), []).append((absolute_time, relative_time, sample_type, throughput, throughput_unit))
+        for (name, task, key), samples in series.items():
+            self.put_throughput(name, task, samples, {"client_id": key} if name == "client_throughput" else {"load_driver_host": key})
+
+    def put_throughput(self, name, task, samples, meta_data=None):
+        op = task.operation
+        if not task.load_profile or task not in self.task_start_times:
+            self.metrics_store.put_values_batch(name, samples, operation=op.name, operation_type=op.type,
+                                                meta_data=self.task_meta_data(task, meta_data))
+            return
+        # tag each sample with the stage of the load profile in which it has been taken
+        profile = self.load_profiles.get(task)
+        if profile is None:
+            profile = scheduler.LoadProfile(task.load_profile)
+            self.load_profiles[task] = profile
+        start_time = self.task_start_times[task]
+        stages = collections.OrderedDict()
+        for sample in samples:
+            stages.setdefault(profile.stage_name(sample[0] - start_time), []).append(sample)
+        for stage, stage_samples in stages.items():
+            stage_meta_data = {"load_profile_stage": stage} if stage else None
+            self.metrics_store.put_values_batch(name, stage_samples, operation=op.name, operation_type=op.type,
+                                                meta_data=self.task_meta_data(task, meta_data, stage_meta_data))
+
+    def send_metrics(self):
+        """
+        Sends all metrics that have been gathered so far to the benchmark coordinator which stores them in the actual metrics store. Thus,
+        the master's memory usage does not depend on the duration of the benchmark and metrics are persisted while the benchmark is running.
+        """
+        if len(self.metrics_store.docs) > 0:
+            self.send(self.start_sender, UpdateMetrics(self.metrics_store.to_externalizable(clear=True)))
 
     def merge(self, *args):
         result = {}
@@ -311,11 +575,91 @@ class Driver(thespian.actors.Actor):
             else:
                 num_clients = max(len(self.most_recent_sample_per_client), 1)
                 total_progress = sum([s.percent_completed for s in self.most_recent_sample_per_client.values()]) / num_clients
-            self.progress_reporter.print("Running %s" % ops, "[%3d%% done]" % (round(total_progress * 100)))
+            message = "Running %s" % ops
+            if self.live_stats_console and not task_finished:
+                summary = self.live_stats.summary_line()
+                if summary:
+                    message = "%s (%s)" % (message, summary)
+            self.progress_reporter.print(message, "[%3d%% done]" % (round(total_progress * 100)))
             if task_finished:
                 self.progress_reporter.finish()
 
 
+def local_addresses():
+    """
+    :return: The names and IP addresses under which this machine is known to itself.
+    """
+    addresses = {"localhost", "127.0.0.1", "::1"}
+    for name in ["localhost", socket.gethostname()]:
+        try:
+            addresses.update(info[4][0] for info in socket.getaddrinfo(name, None))
+        except socket.gaierror:
+            logger.warning("Could not resolve [%s]." % name)
+    return addresses
+
+
+def is_local_load_driver(host):
+    """
+    :param host: A load driver host (IP address).
+    :return: True iff the load driver runs in the same actor system as the master.
+    """
+    return host in local_addresses()
+
+
+def load_driver_requirements(host):
+    """
+    :param host: A load driver host (IP address).
+    :return: Actor requirements to create an actor on this load driver host.
+    """
+    if is_local_load_driver(host):
+        return None
+    else:
+        return {"ip": host}
+
+
+def load_driver_capability_check(capabilities, requirements):
+    """
+    Checks whether an actor can be created in an actor system. Actors that are bound to a specific load driver host can only be created in
+    the actor system that runs on this host (see ``esrallyd``).
+    """
+    ip = requirements.get("ip") if requirements else None
+    return ip is None or capabilities.get("ip") == ip
+
+
+def estimate_clock_offset(samples):
+    """
+    Estimates the offset between the master's clock and a load generator's clock.
+
+    :param samples: A list of triples of: master timestamp when the request has been sent, load generator timestamp upon receipt of the
+                    request, master timestamp when the response has been received.
+    :return: The clock offset in seconds, i.e. the value that needs to be added to a master timestamp to get the corresponding
+             load generator timestamp.
+    """
+    # the sample with the shortest round trip time has the least uncertainty. We assume that the load generator took its timestamp
+    # right in the middle of the round trip.
+    sent, worker_timestamp, received = min(samples, key=lambda s: s[2] - s[0])
+    return worker_timestamp - (sent + received) / 2
+
+
+class TrackPreparator(thespian.actors.Actor):
+    """
+    Prepares track data on a load driver host.
+    """
+
+    actorSystemCapabilityCheck = staticmethod(load_driver_capability_check)
+
+    def receiveMessage(self, msg, sender):
+        if isinstance(msg, PrepareTrack):
+            try:
+                if msg.track_revision:
+                    track.ensure_track_revision(msg.config, msg.track_revision)
+                track.prepare_track(msg.track, msg.config)
+                self.send(sender, TrackPrepared())
+            except Exception as e:
+                logger.exception("Could not prepare track data.")
+                self.send(sender, BenchmarkFailure("Could not prepare track data on [%s]" % socket.gethostname(), e))
+
+
 class LoadGenerator(thespian.actors.Actor):
     """
     The actual driver that applies load against the cluster.
@@ -325,6 +669,8 @@ class LoadGenerator(thespian.actors.Actor):
 
     WAKEUP_INTERVAL_SECONDS = 5
 
+    actorSystemCapabilityCheck = staticmethod(load_driver_capability_check)
+
     def __init__(self):
         super().__init__()
         self.master = None
@@ -351,15 +697,18 @@ class LoadGenerator(thespian.actors.Actor):
                 self.track = msg.track
                 self.tasks = msg.tasks
                 self.current_task = 0
+                pin_to_cpu(self.config, self.client_id, msg.local_id)
                 self.start_timestamp = time.perf_counter()
-                track.load_track_plugins(self.config, runner.register_runner)
+                track.load_track_plugins(self.config, runner.register_runner, scheduler.register_scheduler)
                 self.drive()
+            elif isinstance(msg, ClockSyncRequest):
+                self.send(sender, ClockSyncResponse(msg.worker_id, msg.master_timestamp))
             elif isinstance(msg, Drive):
                 logger.debug("Client [%d] is continuing its work at task index [%d] on [%f]." %
                              (self.client_id, self.current_task, msg.client_start_timestamp))
                 self.master = sender
                 self.start_driving = True
-                self.wakeupAfter(datetime.timedelta(seconds=time.perf_counter() - msg.client_start_timestamp))
+                self.wakeupAfter(datetime.timedelta(seconds=max(msg.client_start_timestamp - time.perf_counter(), 0)))
             elif isinstance(msg, thespian.actors.WakeupMessage):
                 logger.debug("client [%d] woke up." % self.client_id)
                 # it would be better if we could send ourselves a message at a specific time, simulate this with a boolean...
@@ -396,54 +745,204 @@ class LoadGenerator(thespian.actors.Actor):
             # clients that don't execute tasks don't need to care about waiting
             if self.executor_future is not None:
                 self.executor_future.result()
-            self.send_samples()
+            self.send_samples(task_finished=True)
             self.executor_future = None
             self.sampler = None
             self.send(self.master, JoinPointReached(self.client_id, task))
         elif isinstance(task, track.Task):
             logger.info("Client [%d] is executing [%s]." % (self.client_id, task))
             self.sampler = Sampler(self.client_id, task, self.start_timestamp)
-            schedule = schedule_for(self.track, task, self.client_id)
+            schedule = schedule_for(self.track, task, self.client_id, sampler=self.sampler,
+                                    prefetch_size=self.config.opts("driver", "params.prefetch.size", mandatory=False, default_value=0))
             self.executor_future = self.pool.submit(execute_schedule, schedule, self.es, self.sampler)
             self.wakeupAfter(datetime.timedelta(seconds=LoadGenerator.WAKEUP_INTERVAL_SECONDS))
         else:
             raise exceptions.RallyAssertionError("Unknown task type [%s]" % type(task))
 
-    def send_samples(self):
+    def send_samples(self, task_finished=False):
         if self.sampler:
             samples = self.sampler.samples
-            if len(samples) > 0:
-                self.send(self.master, UpdateSamples(self.client_id, samples))
+            histograms = self.sampler.histograms if task_finished else []
+            results = self.sampler.results if task_finished else []
+            if len(samples) > 0 or len(histograms) > 0 or len(results) > 0:
+                self.send(self.master, UpdateSamples(self.client_id, [samples], histograms, results))
 
 
 class Sampler:
     """
     Encapsulates management of gathered samples.
+
+    Samples are stored column-wise in blocks of typed arrays (see ``SampleBatch``). Exactly one thread (or coroutine) adds samples while
+    another one may retrieve them concurrently. This works without locking: a sample is only published after all of its columns have been
+    written and a block is only removed after it has been filled completely and the writer has already moved on to a new block.
+
+    Additionally, latency and service time are recorded in one histogram per sample type.
     """
 
-    def __init__(self, client_id, task, start_timestamp):
+    def __init__(self, client_id, task, start_timestamp, block_size=4096):
         self.client_id = client_id
         self.task = task
         self.start_timestamp = start_timestamp
-        self.q = queue.Queue(maxsize=16384)
+        self.block_size = block_size
+        self.current_block = SampleBatch(client_id, task)
+        self.blocks = collections.deque([self.current_block])
+        # number of samples that have already been retrieved from the oldest block
+        self.consumed = 0
+        self._histograms = {}
+        self._observers = []
+        self._results = []
+
+    def add_observer(self, observer):
+        """
+        :param observer: A callable that is invoked for each sample with the sample type, request meta data, latency and service time
+                         (both in milliseconds). It is called on the same thread (or coroutine) that adds samples.
+        """
+        self._observers.append(observer)
+
+    def put_result(self, name, value, unit):
+        """
+        Adds a result which is determined once per client and task (e.g. the outcome of a throughput search).
+        """
+        self._results.append((self.task, name, value, unit))
+
+    @property
+    def results(self):
+        """
+        :return: A list of tuples of: task, metric name, value and unit.
+        """
+        return list(self._results)
 
     def add(self, sample_type, request_meta_data, latency_ms, service_time_ms, total_ops, total_ops_unit, time_period, percent_completed):
-        try:
-            self.q.put_nowait(Sample(self.client_id, time.time(), time.perf_counter() - self.start_timestamp, self.task,
-                                     sample_type, request_meta_data, latency_ms, service_time_ms, total_ops, total_ops_unit, time_period,
-                                     percent_completed))
-        except queue.Full:
-            logger.warning("Dropping sample for [%s] due to a full sampling queue." % self.task.operation.name)
+        if len(self.current_block) >= self.block_size:
+            self.current_block = SampleBatch(self.client_id, self.task)
+            self.blocks.append(self.current_block)
+        self.current_block.append(time.time(), time.perf_counter() - self.start_timestamp, sample_type, request_meta_data, latency_ms,
+                                  service_time_ms, total_ops, total_ops_unit, time_period, percent_completed)
+        self._histogram(sample_type, "latency").record_value(latency_ms)
+        self._histogram(sample_type, "service_time").record_value(service_time_ms)
+        for observer in self._observers:
+            observer(sample_type, request_meta_data, latency_ms, service_time_ms)
+
+    def _histogram(self, sample_type, name):
+        key = (sample_type, name)
+        h = self._histograms.get(key)
+        if h is None:
+            h = histogram.Histogram()
+            self._histograms[key] = h
+        return h
+
+    @property
+    def histograms(self):
+        """
+        Must only be called after all samples have been added.
+
+        :return: A list of tuples of: task, sample type, metric name and the corresponding ``Histogram``.
+        """
+        return [(self.task, sample_type, name, h) for (sample_type, name), h in self._histograms.items()]
 
     @property
     def samples(self):
-        samples = []
+        """
+        :return: A ``SampleBatch`` with all samples that have been added since the last invocation.
+        """
+        samples = SampleBatch(self.client_id, self.task)
+        while True:
+            block = self.blocks[0]
+            size = len(block)
+            samples.extend(block, self.consumed, size)
+            # the writer may not have started a new block yet even though the oldest one is full
+            if size >= self.block_size and len(self.blocks) > 1:
+                self.blocks.popleft()
+                self.consumed = 0
+            else:
+                self.consumed = size
+                return samples
+
+
+class SampleBatch:
+    """
+    Stores samples of one client and one task in a compact, columnar representation that is cheap to create and to serialize.
+    """
+
+    def __init__(self, client_id, task):
+        self.client_id = client_id
+        self.task = task
+        self.absolute_time = array.array("d")
+        self.relative_time = array.array("d")
+        self.sample_type = array.array("B")
+        self.latency_ms = array.array("d")
+        self.service_time_ms = array.array("d")
+        self.total_ops = array.array("d")
+        self.total_ops_unit = array.array("H")
+        self.time_period = array.array("d")
+        self.percent_completed = array.array("d")
+        # request meta data are rare (e.g. only for errors), so we only store them for the affected samples
+        self.request_meta_data = {}
+        # interned units
+        self.units = []
+        # number of (completely written) samples
+        self.size = 0
+
+    def append(self, absolute_time, relative_time, sample_type, request_meta_data, latency_ms, service_time_ms, total_ops, total_ops_unit,
+               time_period, percent_completed):
+        if request_meta_data is not None:
+            self.request_meta_data[self.size] = request_meta_data
+        self.absolute_time.append(absolute_time)
+        self.relative_time.append(relative_time)
+        self.sample_type.append(sample_type)
+        self.latency_ms.append(latency_ms)
+        self.service_time_ms.append(service_time_ms)
+        self.total_ops.append(total_ops)
+        self.total_ops_unit.append(self._unit_id(total_ops_unit))
+        self.time_period.append(time_period)
+        self.percent_completed.append(percent_completed)
+        # publish the sample only after all of its properties have been written
+        self.size += 1
+
+    def extend(self, other, start, end):
+        """
+        Appends the samples within [start, end) of another batch of the same client and task.
+        """
+        if start >= end:
+            return
+        offset = self.size - start
+        for idx, meta_data in list(other.request_meta_data.items()):
+            if start <= idx < end:
+                self.request_meta_data[idx + offset] = meta_data
+        self.absolute_time.extend(other.absolute_time[start:end])
+        self.relative_time.extend(other.relative_time[start:end])
+        self.sample_type.extend(other.sample_type[start:end])
+        self.latency_ms.extend(other.latency_ms[start:end])
+        self.service_time_ms.extend(other.service_time_ms[start:end])
+        self.total_ops.extend(other.total_ops[start:end])
+        self.total_ops_unit.extend(self._unit_id(other.units[unit]) for unit in other.total_ops_unit[start:end])
+        self.time_period.extend(other.time_period[start:end])
+        self.percent_completed.extend(other.percent_completed[start:end])
+        self.size += end - start
+
+    def _unit_id(self, unit):
         try:
-            while True:
-                samples.append(self.q.get_nowait())
-        except queue.Empty:
-            pass
-        return samples
+            return self.units.index(unit)
+        except ValueError:
+            self.units.append(unit)
+            return len(self.units) - 1
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self.size
+        if not 0 <= idx < self.size:
+            raise IndexError("sample index [%d] out of range" % idx)
+        return Sample(self.client_id, self.absolute_time[idx], self.relative_time[idx], self.task,
+                      metrics.SampleType(self.sample_type[idx]), self.request_meta_data.get(idx), self.latency_ms[idx],
+                      self.service_time_ms[idx], self.total_ops[idx], self.units[self.total_ops_unit[idx]], self.time_period[idx],
+                      self.percent_completed[idx])
+
+    def __iter__(self):
+        for idx in range(self.size):
+            yield self[idx]
 
 
 class Sample:
@@ -467,6 +966,46 @@ class Sample:
         return self.task.operation
 
 
+def number_of_workers(cfg):
+    """
+    :return: The number of load generator processes that host the clients of the asynchronous engine.
+    """
+    workers = cfg.opts("driver", "worker.processes", mandatory=False, default_value=None)
+    if workers is None:
+        workers = sysstats.physical_cpu_cores() or sysstats.logical_cpu_cores() or 1
+    return workers
+
+
+def allocate_clients_to_workers(allocations, workers):
+    """
+    Distributes clients round-robin across load generator processes.
+
+    :param allocations: The allocation matrix as calculated by the ``Allocator``.
+    :param workers: The maximum number of load generator processes. At most one process per client is used.
+    :return: A list with one dict per load generator process that maps client ids to their row in the allocation matrix.
+    """
+    clients_per_worker = [{} for _ in range(min(workers, len(allocations)))]
+    for client_id, allocation in enumerate(allocations):
+        clients_per_worker[client_id % len(clients_per_worker)][client_id] = allocation
+    return clients_per_worker
+
+
+def pin_to_cpu(cfg, worker_id, local_id):
+    """
+    Pins the current load generator process to a CPU core if the user has requested it.
+
+    :param cfg: Rally internal configuration object.
+    :param worker_id: Id of the load generator.
+    :param local_id: Id of the load generator among all load generators on the same load driver host. It determines the CPU core.
+    """
+    if cfg.opts("driver", "cpu.affinity", mandatory=False, default_value=False):
+        core = sysstats.pin_to_cpu(local_id)
+        if core is None:
+            logger.warning("Could not pin load generator [%d] to a CPU core as CPU affinity is not supported on this platform." % worker_id)
+        else:
+            logger.info("Pinned load generator [%d] to CPU core [%d]." % (worker_id, core))
+
+
 def select_challenge(config, t):
     selected_challenge = config.opts("benchmarks", "challenge")
     for challenge in t.challenges:
@@ -576,49 +1115,237 @@ def calculate_global_throughput(samples, bucket_interval_secs=1):
     :param bucket_interval_secs: The bucket interval for aggregations.
     :return: A global view of throughput samples.
     """
-    samples_per_task = {}
-    # first we group all warmup / measurement samples by operation.
-    for sample in samples:
-        k = sample.task
-        if k not in samples_per_task:
-            samples_per_task[k] = []
-        samples_per_task[k].append(sample)
-
-    global_throughput = {}
-    # with open("raw_samples.csv", "w") as sample_log:
-    #    print("client_id,absolute_time,relative_time,operation,sample_type,total_ops,time_period", file=sample_log)
-    for k, v in samples_per_task.items():
-        task = k
-        if task not in global_throughput:
-            global_throughput[task] = []
-        # sort all samples by time
-        current_samples = sorted(v, key=lambda s: s.absolute_time)
-
-        total_count = 0
-        interval = 0
-        current_bucket = 0
-        current_sample_type = current_samples[0].sample_type
-        start_time = current_samples[0].absolute_time - current_samples[0].time_period
-        for sample in current_samples:
-            # print("%d,%f,%f,%s,%s,%d,%f" %
-            # (sample.client_id, sample.absolute_time, sample.relative_time, sample.operation, sample.sample_type,
-            #  sample.total_ops, sample.time_period), file=sample_log)
+    calculator = ThroughputCalculator(bucket_interval_secs)
+    calculator.add(sorted(samples, key=lambda s: s.absolute_time))
+    return calculator.calculate(final=True)
 
-            # once we have seen a new sample type, we stick to it.
-            if current_sample_type < sample.sample_type:
-                current_sample_type = sample.sample_type
 
-            total_count += sample.total_ops
-            interval = max(sample.absolute_time - start_time, interval)
+class ThroughputCalculator:
+    """
+    Calculates global throughput incrementally while samples from multiple load generators arrive.
+
+    Throughput samples are based on all samples of a task in the order of their (absolute) time stamp. As load generators report their
+    samples independently of each other, a sample is only considered once each client of the task has reported a sample that is at least as
+    recent (or when the caller indicates that no more samples will arrive). Hence, the calculator needs to keep only those samples in memory
+    that could still be overtaken by samples of another client.
+
+    Samples are kept column-wise per task and client. As each client reports its samples in chronological order, the calculator only needs
+    to merge the (already sorted) samples of all clients instead of sorting all samples.
+
+    Optionally, the calculator also determines throughput per client and per load driver host. These series are based on fixed time buckets
+    (i.e. they represent the throughput within a bucket and not the average throughput since the start of the task).
+    """
+
+    class ClientSamples:
+        """
+        Unprocessed samples of one client for one task in chronological order.
+        """
+
+        def __init__(self):
+            self.absolute_time = array.array("d")
+            self.relative_time = array.array("d")
+            self.sample_type = array.array("B")
+            self.total_ops = array.array("d")
+            self.total_ops_unit = array.array("H")
+            self.time_period = array.array("d")
+            # time stamp of the most recent sample (processed or not)
+            self.latest = None
+
+        def append(self, absolute_time, relative_time, sample_type, total_ops, total_ops_unit, time_period):
+            self.absolute_time.append(absolute_time)
+            self.relative_time.append(relative_time)
+            self.sample_type.append(sample_type)
+            self.total_ops.append(total_ops)
+            self.total_ops_unit.append(total_ops_unit)
+            self.time_period.append(time_period)
+            self.latest = absolute_time
+
+        def take(self, end):
+            """
+            Removes the first ``end`` samples.
+
+            :return: The removed samples as a list of tuples in chronological order.
+            """
+            taken = list(zip(self.absolute_time[:end], self.relative_time[:end], self.sample_type[:end], self.total_ops[:end],
+                             self.total_ops_unit[:end], self.time_period[:end]))
+            for column in [self.absolute_time, self.relative_time, self.sample_type, self.total_ops, self.total_ops_unit,
+                           self.time_period]:
+                del column[:end]
+            return taken
+
+    class TaskStats:
+        def __init__(self, start_time, relative_start_time, sample_type):
+            self.start_time = start_time
+            # relative time that corresponds to the start time
+            self.relative_start_time = relative_start_time
+            self.sample_type = sample_type
+            self.total_count = 0
+            self.interval = 0
+            self.current_bucket = 0
+            # key -> bucket -> [sample type, total ops, unit id]
+            self.client_buckets = {}
+            self.host_buckets = {}
+
+    def __init__(self, bucket_interval_secs=1, per_client=False, client_hosts=None):
+        """
+        :param bucket_interval_secs: The bucket interval for aggregations in seconds. Default: 1.
+        :param per_client: Whether to calculate throughput per client. Default: ``False``.
+        :param client_hosts: A dict that maps client ids to load driver hosts. If it is provided, throughput is also calculated per load
+                             driver host. Default: ``None``.
+        """
+        self.bucket_interval_secs = bucket_interval_secs
+        self.per_client = per_client
+        self.client_hosts = client_hosts
+        # task -> client id -> ClientSamples
+        self.unprocessed = {}
+        self.task_stats = {}
+        # interned units
+        self.units = []
+        self.series = []
+
+    def _unit_id(self, unit):
+        try:
+            return self.units.index(unit)
+        except ValueError:
+            self.units.append(unit)
+            return len(self.units) - 1
+
+    def _client_samples(self, task, client_id):
+        clients = self.unprocessed.get(task)
+        if clients is None:
+            clients = {}
+            self.unprocessed[task] = clients
+        c = clients.get(client_id)
+        if c is None:
+            c = ThroughputCalculator.ClientSamples()
+            clients[client_id] = c
+        return c
+
+    def add(self, samples):
+        """
+        :param samples: Samples to add. Samples of each client need to be added in chronological order.
+        """
+        for s in samples:
+            self._client_samples(s.task, s.client_id).append(s.absolute_time, s.relative_time, s.sample_type, s.total_ops,
+                                                             self._unit_id(s.total_ops_unit), s.time_period)
+
+    def add_batch(self, batch):
+        """
+        :param batch: A ``SampleBatch`` to add. Batches of each client need to be added in chronological order.
+        """
+        if len(batch) == 0:
+            return
+        c = self._client_samples(batch.task, batch.client_id)
+        c.absolute_time.extend(batch.absolute_time[:batch.size])
+        c.relative_time.extend(batch.relative_time[:batch.size])
+        c.sample_type.extend(batch.sample_type[:batch.size])
+        c.total_ops.extend(batch.total_ops[:batch.size])
+        unit_ids = [self._unit_id(unit) for unit in batch.units]
+        c.total_ops_unit.extend(unit_ids[unit] for unit in batch.total_ops_unit[:batch.size])
+        c.time_period.extend(batch.time_period[:batch.size])
+        c.latest = batch.absolute_time[batch.size - 1]
+
+    def calculate(self, final=False):
+        """
+        Calculates throughput for all samples that cannot be overtaken by samples of other clients anymore.
 
+        :param final: ``True`` iff no more samples will be added for the current tasks (e.g. because all clients have reached a join point).
+        In that case, all remaining samples are considered.
+        :return: A dict with tasks as keys and a (possibly empty) list of new throughput samples as values. Throughput series per client
+        and per host can be retrieved afterwards with ``pop_series()``.
+        """
+        global_throughput = {}
+        for task, clients in self.unprocessed.items():
+            if final:
+                watermark = None
+            else:
+                # we can only be sure about the order of samples once all clients of this task have reported samples.
+                if len(clients) < task.clients:
+                    continue
+                watermark = min(c.latest for c in clients.values())
+            streams = {}
+            for client_id, c in clients.items():
+                end = len(c.absolute_time) if watermark is None else bisect.bisect_right(c.absolute_time, watermark)
+                if end > 0:
+                    streams[client_id] = c.take(end)
+            if not streams:
+                continue
+            stats = self.task_stats.get(task)
+            if stats is None:
+                first = min((s[0] for s in streams.values()), key=lambda sample: sample[0])
+                start_time = first[0] - first[5]
+                stats = ThroughputCalculator.TaskStats(start_time, first[1] - first[5], first[2])
+                self.task_stats[task] = stats
+            global_throughput[task] = self._global_throughput(stats, streams)
+            if self.per_client or self.client_hosts:
+                self._bucket(task, stats, streams, watermark)
+        if final:
+            self.unprocessed = {}
+            self.task_stats = {}
+        return global_throughput
+
+    def _global_throughput(self, stats, streams):
+        result = []
+        bucket_interval_secs = self.bucket_interval_secs
+        start_time = stats.start_time
+        sample_type = stats.sample_type
+        total_count = stats.total_count
+        interval = stats.interval
+        current_bucket = stats.current_bucket
+        samples = next(iter(streams.values())) if len(streams) == 1 else heapq.merge(*streams.values())
+        for absolute_time, relative_time, st, total_ops, unit, _ in samples:
+            # once we have seen a new sample type, we stick to it.
+            if sample_type < st:
+                sample_type = st
+            total_count += total_ops
+            interval = max(absolute_time - start_time, interval)
             # avoid division by zero
             if interval > 0 and interval >= current_bucket:
                 current_bucket = int(interval) + bucket_interval_secs
-                throughput = (total_count / interval)
                 # we calculate throughput per second
-                global_throughput[task].append(
-                    (sample.absolute_time, sample.relative_time, current_sample_type, throughput, "%s/s" % sample.total_ops_unit))
-    return global_throughput
+                result.append((absolute_time, relative_time, metrics.SampleType(sample_type), total_count / interval,
+                               "%s/s" % self.units[unit]))
+        stats.sample_type = sample_type
+        stats.total_count = total_count
+        stats.interval = interval
+        stats.current_bucket = current_bucket
+        return result
+
+    def _bucket(self, task, stats, streams, watermark):
+        width = self.bucket_interval_secs
+        for client_id, samples in streams.items():
+            targets = []
+            if self.per_client:
+                targets.append(stats.client_buckets.setdefault(client_id, {}))
+            if self.client_hosts:
+                targets.append(stats.host_buckets.setdefault(self.client_hosts[client_id], {}))
+            for absolute_time, _, st, total_ops, unit, _ in samples:
+                bucket = int((absolute_time - stats.start_time) / width)
+                for buckets in targets:
+                    b = buckets.get(bucket)
+                    if b is None:
+                        buckets[bucket] = [st, total_ops, unit]
+                    else:
+                        b[0] = max(b[0], st)
+                        b[1] += total_ops
+        # buckets that end before the watermark are complete
+        complete = None if watermark is None else int((watermark - stats.start_time) / width)
+        for name, all_buckets in [("client_throughput", stats.client_buckets), ("host_throughput", stats.host_buckets)]:
+            for key, buckets in all_buckets.items():
+                for bucket in sorted(b for b in buckets if complete is None or b < complete):
+                    st, total_ops, unit = buckets.pop(bucket)
+                    offset = (bucket + 1) * width
+                    self.series.append((name, task, key, stats.start_time + offset, stats.relative_start_time + offset,
+                                        metrics.SampleType(st), total_ops / width, "%s/s" % self.units[unit]))
+
+    def pop_series(self):
+        """
+        :return: A list of throughput samples per client and per load driver host that have been calculated so far. Each sample is a tuple
+                 of: metric name, task, client id or host, absolute time, relative time, sample type, throughput and throughput unit.
+        """
+        series = self.series
+        self.series = []
+        return series
 
 
 def execute_schedule(schedule, es, sampler):
@@ -632,7 +1359,11 @@ def execute_schedule(schedule, es, sampler):
     total_start = time.perf_counter()
     # noinspection PyBroadException
     try:
-        for expected_scheduled_time, sample_type, percent_completed, runner, params in schedule:
+        for entry in schedule:
+            if entry is PENDING_REQUESTS_BARRIER:
+                # requests are executed one after another so none of them is pending
+                continue
+            expected_scheduled_time, sample_type, percent_completed, runner, params = entry
             absolute_expected_schedule_time = total_start + expected_scheduled_time
             throughput_throttled = expected_scheduled_time > 0
             if throughput_throttled:
@@ -644,7 +1375,9 @@ def execute_schedule(schedule, es, sampler):
             stop = time.perf_counter()
 
             service_time = stop - start
-            # Do not calculate latency separately when we don't throttle throughput. This metric is just confusing then.
+            # Do not calculate latency separately when we don't throttle throughput. This metric is just confusing then. Otherwise, we
+            # measure against the intended start time so any delay caused by previous (slow) requests is included (i.e. we avoid
+            # coordinated omission).
             latency = stop - absolute_expected_schedule_time if throughput_throttled else service_time
             sampler.add(sample_type, request_meta_data, convert.seconds_to_ms(latency), convert.seconds_to_ms(service_time), total_ops,
                         total_ops_unit, (stop - total_start), percent_completed)
@@ -662,32 +1395,46 @@ def execute_single(runner, es, params):
     try:
         with runner:
             return_value = runner(es, params)
-        if isinstance(return_value, tuple) and len(return_value) == 2:
-            total_ops, total_ops_unit = return_value
-            request_meta_data = None
-        elif isinstance(return_value, dict):
-            total_ops = return_value.pop("weight", 1)
-            total_ops_unit = return_value.pop("unit", "ops")
-            request_meta_data = return_value
-        else:
-            total_ops = 1
-            total_ops_unit = "ops"
-            request_meta_data = None
+        return runner_result(return_value)
     except elasticsearch.TransportError as e:
-        total_ops = 0
-        total_ops_unit = "ops"
-        request_meta_data = {
-            "http_status": e.status_code,
-            "error_description": e.error
-        }
+        return transport_error_result(e)
     except KeyError as e:
-        logger.exception("Cannot execute runner [%s]; most likely due to missing parameters." % str(runner))
-        msg = "Cannot execute [%s]. Provided parameters are: %s. Error: [%s]." % (str(runner), str(params.keys()), str(e))
-        raise exceptions.SystemSetupError(msg)
+        raise missing_parameters_error(runner, params, e)
+
 
+def runner_result(return_value):
+    """
+    Converts the return value of a runner to a triple of: total number of operations, unit of operations, a dict of request meta data
+    (may be None).
+    """
+    if isinstance(return_value, tuple) and len(return_value) == 2:
+        total_ops, total_ops_unit = return_value
+        request_meta_data = None
+    elif isinstance(return_value, dict):
+        total_ops = return_value.pop("weight", 1)
+        total_ops_unit = return_value.pop("unit", "ops")
+        request_meta_data = return_value
+    else:
+        total_ops = 1
+        total_ops_unit = "ops"
+        request_meta_data = None
     return total_ops, total_ops_unit, request_meta_data
 
 
+def transport_error_result(e):
+    request_meta_data = {
+        "http_status": e.status_code,
+        "error_description": e.error
+    }
+    return 0, "ops", request_meta_data
+
+
+def missing_parameters_error(runner, params, e):
+    logger.exception("Cannot execute runner [%s]; most likely due to missing parameters." % str(runner))
+    msg = "Cannot execute [%s]. Provided parameters are: %s. Error: [%s]." % (str(runner), str(params.keys()), str(e))
+    return exceptions.SystemSetupError(msg)
+
+
 class JoinPoint:
     def __init__(self, id):
         self.id = id
@@ -814,79 +1561,306 @@ class Allocator:
 
 # Runs a concrete schedule on one worker client
 # Needs to determine the runners and concrete iterations per client.
-def schedule_for(current_track, task, client_index):
+def schedule_for(current_track, task, client_index, asynchronous=False, sampler=None, prefetch_size=0):
     """
     Calculates a client's schedule for a given task.
 
     :param current_track: The current track.
     :param task: The task that should be executed.
     :param client_index: The current client index.  Must be in the range [0, `task.clients').
+    :param asynchronous: True iff the schedule is executed by the asynchronous load generator (and may thus contain asynchronous runners).
+    :param sampler: The sampler of this client. Only needed for schedules that adapt to measured latencies (i.e. a throughput search) or
+                    if parameters are prefetched.
+    :param prefetch_size: The number of parameters that are prepared ahead of time on a background thread. Default: 0 (disabled). Not
+                          supported for asynchronous schedules.
     :return: A generator for the operations the given client needs to perform for this task.
     """
     op = task.operation
+    runner_for_op = runner.runner_for(op.type, asynchronous=asynchronous)
+    params_for_op = track.operation_parameters(current_track, op).partition(client_index, task.clients)
+    if prefetch_size > 0:
+        if asynchronous:
+            raise exceptions.RallyAssertionError("Prefetching parameters for [%s] is not supported for asynchronous schedules." % op)
+        if sampler is None:
+            raise exceptions.RallyAssertionError("Prefetching parameters for [%s] requires a sampler." % op)
+        logger.info("Prefetching up to [%d] parameters for client [%d] of [%s]." % (prefetch_size, client_index, op))
+        prefetching_params = track_params.PrefetchingParamSource(params_for_op, prefetch_size)
+        return prefetched(schedule_with(task, client_index, runner_for_op, prefetching_params, sampler), prefetching_params, sampler)
+    else:
+        return schedule_with(task, client_index, runner_for_op, params_for_op, sampler)
+
+
+def schedule_with(task, client_index, runner_for_op, params_for_op, sampler=None):
+    """
+    Calculates a client's schedule for a given task based on its runner and its (partitioned) parameter source.
+    """
+    op = task.operation
     num_clients = task.clients
     target_throughput = task.target_throughput / num_clients if task.target_throughput else None
-    runner_for_op = runner.runner_for(op.type)
-    params_for_op = track.operation_parameters(current_track, op).partition(client_index, num_clients)
+    if task.throughput_search:
+        if sampler is None:
+            raise exceptions.RallyAssertionError("A throughput search for [%s] requires a sampler." % op)
+        search = ThroughputSearch(task.throughput_search, num_clients)
+        sampler.add_observer(search.record)
+        logger.info("Creating throughput search schedule for [%s] for client [%d]." % (op, client_index))
+        return throughput_search_based(search, task.schedule, op.params, runner_for_op, params_for_op, sampler)
+    elif target_throughput:
+        scheduler_params = dict(op.params)
+        scheduler_params["target-throughput"] = target_throughput
+        sched = scheduler.scheduler_for(task.schedule, scheduler_params)
+        if task.load_profile:
+            sched = scheduler.ProfiledScheduler(sched, scheduler.LoadProfile(task.load_profile))
+        logger.info("Using [%s] with a target throughput of [%s] ops/s for client [%d] of [%s]." %
+                    (sched, str(target_throughput), client_index, op))
+    else:
+        sched = None
 
     if task.warmup_time_period is not None or task.time_period is not None:
         warmup_time_period = task.warmup_time_period if task.warmup_time_period else 0
         logger.info("Creating time-period based schedule for [%s] with a warmup period of [%s] seconds and a time period of [%s] seconds."
                     % (op, str(warmup_time_period), str(task.time_period)))
-        return time_period_based(target_throughput, warmup_time_period, task.time_period, runner_for_op, params_for_op)
+        return time_period_based(sched, warmup_time_period, task.time_period, runner_for_op, params_for_op)
     else:
         logger.info("Creating iteration-count based schedule for [%s] with [%d] warmup iterations and [%d] iterations." %
                     (op, task.warmup_iterations, task.iterations))
-        return iteration_count_based(target_throughput, task.warmup_iterations // num_clients, task.iterations // num_clients,
+        return iteration_count_based(sched, task.warmup_iterations // num_clients, task.iterations // num_clients,
                                      runner_for_op, params_for_op)
 
 
-def time_period_based(target_throughput, warmup_time_period, time_period, runner, params):
+def prefetched(schedule, prefetching_params, sampler):
+    """
+    Stops prefetching parameters once the schedule has finished and reports how often the client had to wait for parameters (metric
+    ``parameter_underruns``).
+    """
+    try:
+        yield from schedule
+        sampler.put_result("parameter_underruns", prefetching_params.underruns, "")
+    finally:
+        prefetching_params.close()
+
+
+class ThroughputSearch:
+    """
+    Searches the highest throughput at which a latency percentile still meets a service level objective (SLO).
+
+    The search runs in steps of a fixed duration. Starting from the minimum throughput, the target throughput is multiplied by the ramp
+    factor after each step that meets the SLO. As soon as a step violates the SLO, the search continues as a binary search between the
+    highest throughput that has met the SLO and the lowest one that has violated it until both are sufficiently close.
+
+    A throughput search is only supported with a single client (see ``loader.TrackSpecificationReader``). A step is only evaluated after all
+    of its requests have completed and it has at least one (non-warmup) sample.
+    """
+
+    def __init__(self, params, clients=1):
+        """
+        :param params: The ``throughput-search`` properties of a task. Throughput values are specified over all clients.
+        :param clients: The number of clients that execute this task.
+        """
+        try:
+            self.min_throughput = params["min-throughput"] / clients
+            self.max_throughput = params["max-throughput"] / clients
+            self.slo = params["latency-slo"]
+        except KeyError as e:
+            raise exceptions.SystemSetupError("Throughput search requires the property %s." % str(e))
+        self.percentile = params.get("percentile", 99.0)
+        self.metric = params.get("metric", "latency")
+        if self.metric not in ["latency", "service_time"]:
+            raise exceptions.SystemSetupError("Unknown throughput search metric [%s]. Use one of 'latency' or 'service_time'." %
+                                              self.metric)
+        self.step_duration = params.get("step-duration", 30)
+        self.step_warmup_time_period = params.get("step-warmup-time-period", 0)
+        self.ramp_factor = params.get("ramp-factor", 2)
+        self.precision = params.get("precision", 0.05)
+        self.max_error_rate = params.get("max-error-rate", 0.01)
+        self.max_steps = params.get("max-steps", 20)
+        self.target_throughput = self.min_throughput
+        self.highest_met = None
+        self.lowest_violated = None
+        self.steps = 0
+        self.finished = False
+        # number of requests that have been issued and that have completed across all steps
+        self.issued = 0
+        self.completed = 0
+        self._reset()
+
+    def _reset(self):
+        self.histogram = histogram.Histogram()
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, sample_type, request_meta_data, latency_ms, service_time_ms):
+        """
+        Records a sample of the current step. Warmup samples are ignored.
+        """
+        self.completed += 1
+        if sample_type == metrics.SampleType.Normal:
+            self.histogram.record_value(max(latency_ms if self.metric == "latency" else service_time_ms, 0))
+            self.requests += 1
+            if live_stats.is_error(request_meta_data):
+                self.errors += 1
+
+    def next_step(self):
+        """
+        Evaluates the current step and determines the target throughput of the next one.
+
+        :return: True iff the search continues with another step.
+        """
+        value = self.histogram.value_at_percentile(self.percentile)
+        error_rate = self.errors / self.requests if self.requests > 0 else 0
+        met = value is not None and value <= self.slo and error_rate <= self.max_error_rate
+        logger.info("Throughput search step [%d] at [%f] ops/s: %sth percentile %s is [%s] ms (SLO [%s] ms), error rate [%f]: SLO is %s." %
+                    (self.steps + 1, self.target_throughput, str(self.percentile), self.metric, str(value), str(self.slo), error_rate,
+                     "met" if met else "violated"))
+        if met:
+            self.highest_met = self.target_throughput
+        else:
+            self.lowest_violated = self.target_throughput
+        self.steps += 1
+        self._reset()
+
+        if self.lowest_violated is None:
+            if self.target_throughput >= self.max_throughput:
+                self.finished = True
+            else:
+                self.target_throughput = min(self.target_throughput * self.ramp_factor, self.max_throughput)
+        elif self.highest_met is None or self.lowest_violated - self.highest_met <= self.precision * self.lowest_violated:
+            self.finished = True
+        else:
+            self.target_throughput = (self.highest_met + self.lowest_violated) / 2
+        if self.steps >= self.max_steps:
+            self.finished = True
+        return not self.finished
+
+    @property
+    def pending(self):
+        """
+        :return: The number of requests that have been issued but have not completed yet.
+        """
+        return self.issued - self.completed
+
+    @property
+    def capacity(self):
+        """
+        :return: The highest throughput (per client) that has met the SLO or zero if not even the minimum throughput has met it.
+        """
+        return self.highest_met if self.highest_met is not None else 0
+
+
+# A schedule yields this entry to wait until all requests that it has issued so far have completed. Only open-loop executors (see
+# ``async_driver.execute_schedule_async``) can have pending requests; all other executors skip it.
+PENDING_REQUESTS_BARRIER = (0, None, 0, None, None)
+
+
+def throughput_search_based(search, scheduler_name, scheduler_params, runner, params, sampler):
+    """
+    Calculates the schedule for a throughput search.
+
+    :param search: A ``ThroughputSearch`` that receives all samples of this client.
+    :param scheduler_name: The name of the scheduler that determines the arrival process within each step.
+    :param scheduler_params: The parameters of the operation which are passed to the scheduler.
+    :param runner: The runner for a given operation.
+    :param params: The parameter source for a given operation.
+    :param sampler: The sampler of this client. The capacity that the search has determined is stored as a result.
+    :return: A generator for the corresponding parameters.
+    """
+    def create_scheduler():
+        sched_params = dict(scheduler_params)
+        sched_params["target-throughput"] = search.target_throughput
+        return scheduler.scheduler_for(scheduler_name, sched_params)
+
+    start = time.perf_counter()
+    sched = create_scheduler()
+    step_start = 0
+    next_scheduled = 0
+    while True:
+        # a step without any measured sample cannot be evaluated so it continues until there is one
+        if next_scheduled >= step_start + search.step_duration and (search.requests > 0 or search.pending > 0):
+            if search.pending > 0:
+                # with an open-loop executor, responses of this step may still be outstanding
+                yield PENDING_REQUESTS_BARRIER
+                # the next step starts when the previous one has completed
+                next_scheduled = max(next_scheduled, time.perf_counter() - start)
+                continue
+            if not search.next_step():
+                break
+            step_start = next_scheduled
+            sched = create_scheduler()
+        in_warmup = next_scheduled - step_start < search.step_warmup_time_period
+        sample_type = metrics.SampleType.Warmup if in_warmup else metrics.SampleType.Normal
+        percent_completed = min((search.steps + (next_scheduled - step_start) / search.step_duration) / search.max_steps, 1.0)
+        search.issued += 1
+        yield (next_scheduled, sample_type, percent_completed, runner, params.params())
+        next_scheduled = sched.next(next_scheduled)
+    logger.info("Throughput search has finished after [%d] steps with a capacity of [%f] ops/s." % (search.steps, search.capacity))
+    sampler.put_result("throughput_capacity", search.capacity, "ops/s")
+
+
+def first_scheduled(sched):
+    """
+    :param sched: The scheduler that determines the intended start time of each request or None if throughput should not be limited.
+    :return: The intended start time of the first request. Schedulers may delay it (e.g. to follow a load profile); by default it is zero.
+    """
+    first = getattr(sched, "first", None)
+    return first() if first is not None else 0
+
+
+def time_period_based(sched, warmup_time_period, time_period, runner, params):
     """
     Calculates the necessary schedule for time period based operations.
 
-    :param target_throughput: The desired target throughput in operations / second or None if throughput should not be limited.
+    :param sched: The scheduler that determines the intended start time of each request or None if throughput should not be limited.
     :param warmup_time_period: The time period in seconds that is considered for warmup. Must not be None; provide zero instead.
     :param time_period: The time period in seconds that is considered for measurement. May be None.
     :param runner: The runner for a given operation.
     :param params: The parameter source for a given operation.
     :return: A generator for the corresponding parameters.
     """
-    wait_time = 1 / target_throughput if target_throughput else 0
+    next_scheduled = first_scheduled(sched)
     start = time.perf_counter()
     if time_period is None:
         iterations = params.size()
+        if iterations is None:
+            # the parameter source does not know its size upfront so we run until it is exhausted
+            while True:
+                sample_type = metrics.SampleType.Warmup if time.perf_counter() - start < warmup_time_period else metrics.SampleType.Normal
+                try:
+                    current_params = params.params()
+                except StopIteration:
+                    return
+                yield (next_scheduled, sample_type, params.percent_completed, runner, current_params)
+                next_scheduled = sched.next(next_scheduled) if sched else 0
         for it in range(0, iterations):
             sample_type = metrics.SampleType.Warmup if time.perf_counter() - start < warmup_time_period else metrics.SampleType.Normal
             percent_completed = (it + 1) / iterations
-            yield (wait_time * it, sample_type, percent_completed, runner, params.params())
+            yield (next_scheduled, sample_type, percent_completed, runner, params.params())
+            next_scheduled = sched.next(next_scheduled) if sched else 0
     else:
         end = start + warmup_time_period + time_period
-        it = 0
         while time.perf_counter() < end:
             now = time.perf_counter()
             sample_type = metrics.SampleType.Warmup if now - start < warmup_time_period else metrics.SampleType.Normal
             percent_completed = (now - start) / (warmup_time_period + time_period)
-            yield (wait_time * it, sample_type, percent_completed, runner, params.params())
-            it += 1
+            yield (next_scheduled, sample_type, percent_completed, runner, params.params())
+            next_scheduled = sched.next(next_scheduled) if sched else 0
 
 
-def iteration_count_based(target_throughput, warmup_iterations, iterations, runner, params):
+def iteration_count_based(sched, warmup_iterations, iterations, runner, params):
     """
     Calculates the necessary schedule based on a given number of iterations.
 
-    :param target_throughput: The desired target throughput in operations / second or None if throughput should not be limited.
+    :param sched: The scheduler that determines the intended start time of each request or None if throughput should not be limited.
     :param warmup_iterations: The number of warmup iterations to run. 0 if no warmup should be performed.
     :param iterations: The number of measurement iterations to run.
     :param runner: The runner for a given operation.
     :param params: The parameter source for a given operation.
     :return: A generator for the corresponding parameters.
     """
-    wait_time = 1 / target_throughput if target_throughput else 0
+    next_scheduled = first_scheduled(sched)
     total_iterations = warmup_iterations + iterations
     if total_iterations == 0:
         raise exceptions.RallyAssertionError("Operation must run at least for one iteration.")
     for it in range(0, total_iterations):
         sample_type = metrics.SampleType.Warmup if it < warmup_iterations else metrics.SampleType.Normal
         percent_completed = (it + 1) / total_iterations
-        yield (wait_time * it, sample_type, percent_completed, runner, params.params())
+        yield (next_scheduled, sample_type, percent_completed, runner, params.params())
+        next_scheduled = sched.next(next_scheduled) if sched else 0
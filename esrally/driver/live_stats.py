@@ -0,0 +1,212 @@
+import collections
+import http.server
+import json
+import logging
+import socketserver
+import threading
+
+from esrally import metrics
+from esrally.utils import histogram
+
+logger = logging.getLogger("rally.driver")
+
+
+def is_error(request_meta_data):
+    """
+    :param request_meta_data: The request meta data of a sample (may be None).
+    :return: True iff the corresponding request has failed.
+    """
+    return request_meta_data is not None and (request_meta_data.get("success", True) is False or "error_description" in request_meta_data)
+
+
+class LiveStats:
+    """
+    Maintains rolling statistics of all currently running tasks based on the raw samples that the master receives from load generators
+    while the benchmark is running.
+
+    Samples are aggregated into buckets of one second so memory consumption does not depend on the number of requests. All methods are
+    thread-safe because statistics are served from a separate thread (see ``LiveStatsServer``).
+    """
+
+    PERCENTILES = [50.0, 90.0, 99.0, 100.0]
+
+    class Bucket:
+        def __init__(self):
+            self.ops = 0
+            self.ops_unit = None
+            self.requests = 0
+            self.errors = 0
+            self.latency = histogram.Histogram()
+            self.service_time = histogram.Histogram()
+            self.clients = set()
+
+    class TaskStats:
+        def __init__(self, task):
+            self.task = task
+            # second -> bucket
+            self.buckets = {}
+            self.first_time = None
+            self.latest_time = None
+            self.sample_type = None
+            # client id -> percent completed
+            self.percent_completed = {}
+
+    def __init__(self, window_secs=10):
+        """
+        :param window_secs: The number of most recent seconds that are considered for statistics.
+        """
+        self.window_secs = window_secs
+        self.lock = threading.Lock()
+        self.tasks = collections.OrderedDict()
+
+    def add_batch(self, batch):
+        """
+        Adds all samples of a ``SampleBatch``.
+        """
+        with self.lock:
+            stats = self.tasks.get(batch.task)
+            if stats is None:
+                stats = LiveStats.TaskStats(batch.task)
+                self.tasks[batch.task] = stats
+            for idx in range(len(batch)):
+                absolute_time = batch.absolute_time[idx]
+                second = int(absolute_time)
+                bucket = stats.buckets.get(second)
+                if bucket is None:
+                    bucket = LiveStats.Bucket()
+                    stats.buckets[second] = bucket
+                bucket.ops += batch.total_ops[idx]
+                bucket.ops_unit = batch.units[batch.total_ops_unit[idx]]
+                bucket.requests += 1
+                if is_error(batch.request_meta_data.get(idx)):
+                    bucket.errors += 1
+                bucket.latency.record_value(max(batch.latency_ms[idx], 0))
+                bucket.service_time.record_value(max(batch.service_time_ms[idx], 0))
+                bucket.clients.add(batch.client_id)
+                if stats.first_time is None or absolute_time < stats.first_time:
+                    stats.first_time = absolute_time
+                if stats.latest_time is None or absolute_time >= stats.latest_time:
+                    stats.latest_time = absolute_time
+                    stats.sample_type = metrics.SampleType(batch.sample_type[idx])
+            if len(batch) > 0:
+                stats.percent_completed[batch.client_id] = batch.percent_completed[len(batch) - 1]
+                # expire buckets that have left the window
+                oldest = int(stats.latest_time) - self.window_secs
+                for second in [s for s in stats.buckets if s <= oldest]:
+                    del stats.buckets[second]
+
+    def clear(self):
+        """
+        Removes the statistics of all tasks (e.g. after they have finished).
+        """
+        with self.lock:
+            self.tasks = collections.OrderedDict()
+
+    def snapshot(self):
+        """
+        :return: A list with one dict of rolling statistics per running task.
+        """
+        with self.lock:
+            return [self._task_snapshot(stats) for stats in self.tasks.values()]
+
+    def _task_snapshot(self, stats):
+        ops = 0
+        ops_unit = None
+        requests = 0
+        errors = 0
+        latency = histogram.Histogram()
+        service_time = histogram.Histogram()
+        clients = set()
+        for bucket in stats.buckets.values():
+            ops += bucket.ops
+            ops_unit = bucket.ops_unit
+            requests += bucket.requests
+            errors += bucket.errors
+            latency.add(bucket.latency)
+            service_time.add(bucket.service_time)
+            clients.update(bucket.clients)
+        duration = min(self.window_secs, stats.latest_time - stats.first_time) if stats.latest_time is not None else 0
+        return {
+            "task": str(stats.task),
+            "operation": stats.task.operation.name,
+            "sample-type": stats.sample_type.name.lower() if stats.sample_type else None,
+            "throughput": {
+                "value": ops / duration if duration > 0 else None,
+                "unit": "%s/s" % ops_unit if ops_unit else None
+            },
+            "latency": self._percentiles(latency),
+            "service_time": self._percentiles(service_time),
+            "error_rate": errors / requests if requests > 0 else 0.0,
+            "active_clients": len(clients),
+            "percent_completed": sum(stats.percent_completed.values()) / len(stats.percent_completed) if stats.percent_completed else 0.0
+        }
+
+    def _percentiles(self, h):
+        return collections.OrderedDict((str(p), h.value_at_percentile(p)) for p in LiveStats.PERCENTILES)
+
+    def summary_line(self):
+        """
+        :return: A short human-readable summary of the current statistics that is suitable for the console.
+        """
+        parts = []
+        for s in self.snapshot():
+            throughput = s["throughput"]
+            p99 = s["latency"]["99.0"]
+            if throughput["value"] is not None and p99 is not None:
+                parts.append("%.0f %s, p99 %.1f ms, %.1f%% errors" % (throughput["value"], throughput["unit"], p99, s["error_rate"] * 100))
+        return "; ".join(parts)
+
+
+class LiveStatsServer:
+    """
+    Serves the current statistics of a ``LiveStats`` instance as JSON via HTTP (``GET /stats``) on a background thread.
+    """
+
+    def __init__(self, live_stats, host="localhost", port=0):
+        """
+        :param live_stats: A ``LiveStats`` instance.
+        :param host: The host name or IP address to bind to. Default: "localhost".
+        :param port: The port to bind to. Default: 0 (any free port).
+        """
+        self.live_stats = live_stats
+        self.server = _ThreadingHTTPServer((host, port), self._handler_class())
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def _handler_class(self):
+        live_stats = self.live_stats
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") in ["", "/stats"]:
+                    body = json.dumps({"tasks": live_stats.snapshot()}).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                else:
+                    self.send_error(404)
+
+            def log_message(self, fmt, *args):
+                logger.debug("Live stats request: %s" % (fmt % args))
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="rally-live-stats", daemon=True)
+        self.thread.start()
+        logger.info("Serving live stats on port [%d]." % self.port)
+
+    def close(self):
+        if self.thread:
+            self.server.shutdown()
+            self.thread = None
+        self.server.server_close()
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
@@ -1,3 +1,4 @@
+import asyncio
 import types
 import logging
 
@@ -9,23 +10,55 @@ logger = logging.getLogger("rally.driver")
 
 # Mapping from operation type to specific runner
 __RUNNERS = {}
+# Mapping from operation type to a runner that can be awaited by the asynchronous load generator
+__ASYNC_RUNNERS = {}
 
 
-def runner_for(operation_type):
+def runner_for(operation_type, asynchronous=False):
+    """
+    :param operation_type: The operation type for which a runner is requested.
+    :param asynchronous: True iff the caller can await asynchronous runners. In that case an asynchronous runner is preferred but we
+                         fall back to a synchronous one if there is none for this operation type.
+    :return: The runner for this operation type.
+    """
+    if asynchronous and operation_type in __ASYNC_RUNNERS:
+        return __ASYNC_RUNNERS[operation_type]
     try:
         return __RUNNERS[operation_type]
     except KeyError:
+        if operation_type in __ASYNC_RUNNERS:
+            raise exceptions.SystemSetupError("The runner for operation type [%s] is asynchronous and requires the async load driver "
+                                              "engine." % operation_type)
         raise exceptions.RallyError("No runner available for operation type [%s]" % operation_type)
 
 
 def register_runner(operation_type, runner):
+    # A synchronous runner replaces a previously registered asynchronous one so that (plugin) overrides of built-in runners are honored
+    # by all load driver engines. The reverse is not true as the thread-based engine can only execute synchronous runners.
+    #
     # we'd rather use callable() but this will erroneously also classify a class as callable...
     if isinstance(runner, types.FunctionType):
-        logger.debug("Registering function [%s] for [%s]." % (str(runner), str(operation_type)))
-        __RUNNERS[operation_type] = DelegatingRunner(runner)
+        if asyncio.iscoroutinefunction(runner):
+            logger.debug("Registering asynchronous function [%s] for [%s]." % (str(runner), str(operation_type)))
+            __ASYNC_RUNNERS[operation_type] = AsyncDelegatingRunner(runner)
+        else:
+            logger.debug("Registering function [%s] for [%s]." % (str(runner), str(operation_type)))
+            __RUNNERS[operation_type] = DelegatingRunner(runner)
+            __ASYNC_RUNNERS.pop(operation_type, None)
+    elif is_async(runner):
+        logger.debug("Registering asynchronous object [%s] for [%s]." % (str(runner), str(operation_type)))
+        __ASYNC_RUNNERS[operation_type] = runner
     else:
         logger.debug("Registering object [%s] for [%s]." % (str(runner), str(operation_type)))
         __RUNNERS[operation_type] = runner
+        __ASYNC_RUNNERS.pop(operation_type, None)
+
+
+def is_async(runner):
+    """
+    :return: True iff the provided runner needs to be awaited.
+    """
+    return asyncio.iscoroutinefunction(runner.__call__)
 
 
 class Runner:
@@ -63,6 +96,17 @@ class DelegatingRunner(Runner):
         return "user-defined runner for [%s]" % self.runnable.__name__
 
 
+class AsyncDelegatingRunner(Runner):
+    def __init__(self, runnable):
+        self.runnable = runnable
+
+    async def __call__(self, *args):
+        return await self.runnable(*args)
+
+    def __repr__(self, *args, **kwargs):
+        return "user-defined asynchronous runner for [%s]" % self.runnable.__name__
+
+
 class BulkIndex(Runner):
     """
     Bulk indexes the given documents.
@@ -74,19 +118,42 @@ class BulkIndex(Runner):
         super().__init__()
 
     def __call__(self, es, params):
+        bulk_params = self.bulk_params(params)
+
+        if is_encoded(params["body"]):
+            # the body is ready to send, so bypass the client's serialization (see ``client.EsClientFactory``)
+            _, response = es.transport.perform_request("POST", self.bulk_path(params), params=bulk_params, body=params["body"])
+        elif params["action_metadata_present"]:
+            response = es.bulk(body=params["body"], params=bulk_params)
+        else:
+            response = es.bulk(body=params["body"], index=params["index"], doc_type=params["type"], params=bulk_params)
+        return self.bulk_result(params, response)
+
+    def bulk_path(self, params):
+        if params["action_metadata_present"]:
+            return "/_bulk"
+        else:
+            return "/%s/%s/_bulk" % (params["index"], params["type"])
+
+    def bulk_params(self, params):
         bulk_params = {}
         if "pipeline" in params:
             bulk_params["pipeline"] = params["pipeline"]
+        return bulk_params
 
-        with_action_metadata = params["action_metadata_present"]
-
-        if with_action_metadata:
-            # only half of the lines are documents
-            bulk_size = len(params["body"]) // 2
-            response = es.bulk(body=params["body"], params=bulk_params)
+    def bulk_result(self, params, response):
+        if "bulk-size" in params:
+            bulk_size = params["bulk-size"]
         else:
-            bulk_size = len(params["body"])
-            response = es.bulk(body=params["body"], index=params["index"], doc_type=params["type"], params=bulk_params)
+            if is_encoded(params["body"]):
+                lines = bytes(params["body"]).count(b"\n")
+            else:
+                lines = len(params["body"])
+            if params["action_metadata_present"]:
+                # only half of the lines are documents
+                bulk_size = lines // 2
+            else:
+                bulk_size = lines
 
         bulk_error_count = 0
         if response["errors"]:
@@ -107,6 +174,30 @@ class BulkIndex(Runner):
         return "bulk-index"
 
 
+def is_encoded(body):
+    """
+    :return: True iff the given request body is already encoded (i.e. it is ready to send and must not be serialized again).
+    """
+    return isinstance(body, (bytes, bytearray, memoryview))
+
+
+class AsyncBulkIndex(BulkIndex):
+    """
+    Bulk indexes the given documents with an asynchronous client (see ``client.AsyncEsClient``).
+    """
+    async def __call__(self, es, params):
+        bulk_params = self.bulk_params(params)
+
+        if params["action_metadata_present"]:
+            response = await es.bulk(body=params["body"], params=bulk_params)
+        else:
+            response = await es.bulk(body=params["body"], index=params["index"], doc_type=params["type"], params=bulk_params)
+        return self.bulk_result(params, response)
+
+    def __repr__(self, *args, **kwargs):
+        return "async-bulk-index"
+
+
 class ForceMerge(Runner):
     """
     Runs a force merge operation against Elasticsearch.
@@ -215,10 +306,55 @@ class Query(Runner):
         return "query"
 
 
+class AsyncQuery(Runner):
+    """
+    Runs a request body search with an asynchronous client (see ``client.AsyncEsClient``). It expects the same parameters as ``Query``.
+
+    As one instance is shared by all clients of a load generator process, scroll state is kept per call and not per instance.
+    """
+
+    async def __call__(self, es, params):
+        if "pages" in params and "items_per_page" in params:
+            return await self.scroll_query(es, params)
+        else:
+            return await self.request_body_query(es, params)
+
+    async def request_body_query(self, es, params):
+        await es.search(index=params["index"], doc_type=params["type"], request_cache=params["use_request_cache"], body=params["body"])
+        return 1, "ops"
+
+    async def scroll_query(self, es, params):
+        r = await es.search(
+            index=params["index"],
+            doc_type=params["type"],
+            body=params["body"],
+            sort="_doc",
+            scroll="10s",
+            size=params["items_per_page"],
+            request_cache=params["use_request_cache"])
+        scroll_id = r["_scroll_id"]
+        try:
+            total_pages = params["pages"]
+            # Note that starting with ES 2.0, the initial call to search() returns already the first result page
+            # so we have to retrieve one page less
+            for page in range(total_pages - 1):
+                hit_count = len(r["hits"]["hits"])
+                if hit_count == 0:
+                    # We're done prematurely. Even if we are on page index zero, we still made one call.
+                    return page + 1, "ops"
+                r = await es.scroll(scroll_id=scroll_id, scroll="10s")
+            return total_pages, "ops"
+        finally:
+            await es.clear_scroll(scroll_id=scroll_id)
+
+    def __repr__(self, *args, **kwargs):
+        return "async-query"
+
+
 register_runner(track.OperationType.Index.name, BulkIndex())
 register_runner(track.OperationType.ForceMerge.name, ForceMerge())
 register_runner(track.OperationType.IndicesStats.name, IndicesStats())
 register_runner(track.OperationType.NodesStats.name, NodeStats())
 register_runner(track.OperationType.Search.name, Query())
-
-
+register_runner(track.OperationType.Index.name, AsyncBulkIndex())
+register_runner(track.OperationType.Search.name, AsyncQuery())
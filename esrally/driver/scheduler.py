@@ -0,0 +1,252 @@
+import logging
+import math
+import random
+
+from esrally import exceptions
+
+logger = logging.getLogger("rally.driver")
+
+__SCHEDULERS = {}
+
+
+def scheduler_for(name, params):
+    """
+    Creates a scheduler that determines the intended start time of each request of a task.
+
+    :param name: The name of the scheduler. Either one of Rally's built-in schedulers or a scheduler registered by a track plugin.
+    :param params: A dict of parameters for the scheduler. It contains at least the key ``target-throughput`` (per client) in ops/s.
+    :return: A new scheduler instance.
+    """
+    try:
+        s = __SCHEDULERS[name]
+    except KeyError:
+        raise exceptions.SystemSetupError("No scheduler available for name [%s]" % name)
+    return s(params)
+
+
+def register_scheduler(name, scheduler):
+    """
+    Registers a new scheduler.
+
+    :param name: The name of the scheduler as it is referenced in the ``schedule`` property of a task.
+    :param scheduler: A class (or any callable) that creates a scheduler when invoked with a dict of parameters. The scheduler needs to
+    provide a method ``next(current)`` that returns the next intended start time (in seconds relative to the start of the task) based on
+    the current intended start time. It may provide a method ``first()`` that returns the intended start time of the first request.
+    Otherwise, the first request is issued immediately.
+    """
+    logger.info("Registering scheduler for name [%s]." % name)
+    __SCHEDULERS[name] = scheduler
+
+
+class DeterministicScheduler:
+    """
+    Schedules the next request exactly after the mean waiting time (i.e. requests arrive at a constant rate).
+    """
+
+    def __init__(self, params):
+        self.wait_time = 1 / params["target-throughput"]
+
+    def next(self, current):
+        return current + self.wait_time
+
+    def __str__(self):
+        return "deterministic scheduler"
+
+
+class PoissonScheduler:
+    """
+    Schedules requests according to a Poisson process, i.e. waiting times are exponentially distributed around the target throughput.
+    This models independent arrivals as we would see them from many independent users (see also
+    https://en.wikipedia.org/wiki/Poisson_point_process).
+    """
+
+    def __init__(self, params):
+        self.rate = params["target-throughput"]
+
+    def next(self, current):
+        return current + random.expovariate(self.rate)
+
+    def __str__(self):
+        return "Poisson scheduler"
+
+
+class UniformScheduler:
+    """
+    Schedules requests with waiting times that are uniformly distributed in the interval [0, 2 * mean waiting time].
+    """
+
+    def __init__(self, params):
+        self.wait_time = 1 / params["target-throughput"]
+
+    def next(self, current):
+        return current + random.uniform(0, 2 * self.wait_time)
+
+    def __str__(self):
+        return "uniform scheduler"
+
+
+register_scheduler("deterministic", DeterministicScheduler)
+register_scheduler("poisson", PoissonScheduler)
+register_scheduler("uniform", UniformScheduler)
+
+
+class LoadProfile:
+    """
+    Varies the target throughput of a task over time. A load profile consists of consecutive stages and each stage determines a factor
+    that is applied to the target throughput (e.g. 0.5 means half of the target throughput) at any point in time during the stage. After the
+    last stage has finished, the task continues at its target throughput.
+    """
+
+    def __init__(self, stages):
+        """
+        :param stages: A list of stage definitions (the ``load-profile`` property of a task).
+        """
+        if not stages:
+            raise exceptions.SystemSetupError("A load profile requires at least one stage.")
+        self.stages = []
+        start = 0
+        for idx, spec in enumerate(stages):
+            stage_type = spec.get("type")
+            try:
+                stage_class = LoadProfile.STAGE_TYPES[stage_type]
+            except KeyError:
+                raise exceptions.SystemSetupError("Unknown load profile stage type [%s]. Use one of %s." %
+                                                  (stage_type, ", ".join(sorted(LoadProfile.STAGE_TYPES.keys()))))
+            try:
+                duration = spec["duration"]
+            except KeyError:
+                raise exceptions.SystemSetupError("Load profile stage [%d] requires the property 'duration'." % (idx + 1))
+            if duration <= 0:
+                raise exceptions.SystemSetupError("The duration of load profile stage [%d] must be positive but is [%s]." %
+                                                  (idx + 1, str(duration)))
+            name = spec.get("name", "%s-%d" % (stage_type, idx + 1))
+            self.stages.append((start, start + duration, name, stage_class(spec, duration)))
+            start += duration
+        self.duration = start
+
+    def _stage(self, t):
+        for start, end, name, stage in self.stages:
+            if start <= t < end:
+                return start, name, stage
+        return None
+
+    def factor(self, t):
+        """
+        :param t: The time in seconds relative to the start of the task.
+        :return: The factor that is applied to the target throughput at this point in time.
+        """
+        stage = self._stage(t)
+        if stage is None:
+            return 1.0
+        start, _, s = stage
+        return max(s.factor(t - start), 0.0)
+
+    def stage_name(self, t):
+        """
+        :param t: The time in seconds relative to the start of the task.
+        :return: The name of the stage at this point in time or ``None`` if the load profile has already finished.
+        """
+        stage = self._stage(t)
+        return stage[1] if stage else None
+
+    class Constant:
+        def __init__(self, spec, duration):
+            self.value = spec.get("factor", 1.0)
+
+        def factor(self, t):
+            return self.value
+
+    class Ramp:
+        def __init__(self, spec, duration):
+            self.start = spec.get("from", 0.0)
+            self.end = spec.get("to", 1.0)
+            self.duration = duration
+
+        def factor(self, t):
+            return self.start + (self.end - self.start) * t / self.duration
+
+    class Steps:
+        def __init__(self, spec, duration):
+            self.start = spec.get("from", 0.0)
+            self.end = spec.get("to", 1.0)
+            self.steps = spec.get("steps", 5)
+            if self.steps < 1:
+                raise exceptions.SystemSetupError("A load profile with steps requires at least one step but got [%s]." % str(self.steps))
+            self.duration = duration
+
+        def factor(self, t):
+            if self.steps == 1:
+                return self.end
+            step = min(int(t * self.steps / self.duration), self.steps - 1)
+            return self.start + (self.end - self.start) * step / (self.steps - 1)
+
+    class Sine:
+        def __init__(self, spec, duration):
+            self.mean = spec.get("mean", 1.0)
+            self.amplitude = spec.get("amplitude", 0.5)
+            self.period = spec.get("period", duration)
+
+        def factor(self, t):
+            return self.mean + self.amplitude * math.sin(2 * math.pi * t / self.period)
+
+    class Spike:
+        def __init__(self, spec, duration):
+            self.base = spec.get("factor", 1.0)
+            try:
+                self.peak = spec["peak"]
+            except KeyError:
+                raise exceptions.SystemSetupError("A load profile stage with a spike requires the property 'peak'.")
+            self.at = spec.get("at", 0)
+            self.spike_duration = spec.get("spike-duration", duration / 10)
+
+        def factor(self, t):
+            return self.peak if self.at <= t < self.at + self.spike_duration else self.base
+
+    STAGE_TYPES = {
+        "constant": Constant,
+        "ramp": Ramp,
+        "steps": Steps,
+        "sine": Sine,
+        "spike": Spike
+    }
+
+
+class ProfiledScheduler:
+    """
+    Applies a load profile to another scheduler. The waiting time that the other scheduler determines at the (nominal) target throughput is
+    stretched or compressed according to the load profile while it elapses. Thus, the arrival process (e.g. Poisson) is retained but its rate
+    follows the load profile.
+    """
+
+    # time resolution in seconds at which the load profile is evaluated for long waiting times
+    RESOLUTION = 0.1
+
+    def __init__(self, scheduler, profile):
+        """
+        :param scheduler: A scheduler for the target throughput of the task.
+        :param profile: A ``LoadProfile``.
+        """
+        self.scheduler = scheduler
+        self.profile = profile
+
+    def first(self):
+        # Start at a random phase within the first waiting time so clients do not all issue a request at once at the start of the task
+        # (e.g. for a ramp from zero). The phase is in (0, 1] as a request at time zero would ignore the load profile.
+        return self._advance(0, (1.0 - random.random()) * self.scheduler.next(0))
+
+    def next(self, current):
+        # the waiting time at the nominal target throughput
+        return self._advance(current, self.scheduler.next(current) - current)
+
+    def _advance(self, current, remaining):
+        t = current
+        # advance until the load profile has accumulated the same "work". This terminates because the factor is 1 after the profile.
+        while True:
+            f = self.profile.factor(t)
+            if f * ProfiledScheduler.RESOLUTION >= remaining:
+                return t + remaining / f if f > 0 else t
+            remaining -= f * ProfiledScheduler.RESOLUTION
+            t += ProfiledScheduler.RESOLUTION
+
+    def __str__(self):
+        return "%s with a load profile" % self.scheduler
@@ -1,10 +1,16 @@
 import collections
+import concurrent.futures
 import datetime
+import glob
+import json
 import logging
 import math
+import os
 import pickle
+import sqlite3
 import statistics
 import sys
+import threading
 import zlib
 from enum import Enum, IntEnum
 
@@ -13,7 +19,7 @@ import elasticsearch
 import elasticsearch.helpers
 import tabulate
 from esrally import time, exceptions, config
-from esrally.utils import console
+from esrally.utils import console, histogram, io
 
 logger = logging.getLogger("rally.metrics")
 
@@ -23,8 +29,9 @@ class EsClient:
     Provides a stripped-down client interface that is easier to exchange for testing
     """
 
-    def __init__(self, client):
+    def __init__(self, client, bulk_flusher=None):
         self._client = client
+        self._bulk_flusher = bulk_flusher if bulk_flusher else BulkFlusher(client)
 
     def put_template(self, name, template):
         return self.guarded(self._client.indices.put_template, name, template)
@@ -40,7 +47,7 @@ class EsClient:
         return self.guarded(self._client.indices.refresh, index=index)
 
     def bulk_index(self, index, doc_type, items):
-        self.guarded(elasticsearch.helpers.bulk, self._client, items, index=index, doc_type=doc_type)
+        self.guarded(self._bulk_flusher.bulk_index, index=index, doc_type=doc_type, items=items)
 
     def index(self, index, doc_type, item):
         self.guarded(self._client.index, index=index, doc_type=doc_type, body=item)
@@ -48,6 +55,17 @@ class EsClient:
     def search(self, index, doc_type, body):
         return self.guarded(self._client.search, index=index, doc_type=doc_type, body=body)
 
+    def scan(self, index, doc_type, body):
+        """
+        Retrieves all hits of a query (not just the first page of search results).
+
+        :return: A list of all hits.
+        """
+        return self.guarded(self._scan, index=index, doc_type=doc_type, body=body)
+
+    def _scan(self, index, doc_type, body):
+        return list(elasticsearch.helpers.scan(self._client, query=body, index=index, doc_type=doc_type))
+
     def guarded(self, target, *args, **kwargs):
         try:
             return target(*args, **kwargs)
@@ -104,9 +122,147 @@ class EsClientFactory:
         logger.info("Creating connection to metrics store at %s:%s" % (host, port))
         self._client = elasticsearch.Elasticsearch(hosts=[{"host": host, "port": port}],
                                                    use_ssl=secure, http_auth=auth, verify_certs=True, ca_certs=certifi.where())
+        root_dir = self._config.opts("system", "root.dir", mandatory=False)
+        default_spool_dir = "%s/metrics-spool" % root_dir if root_dir else None
+        self._bulk_flusher = BulkFlusher(
+            self._client,
+            chunk_size=int(self._config.opts("reporting", "datastore.bulk.size", mandatory=False, default_value=5000)),
+            concurrency=int(self._config.opts("reporting", "datastore.bulk.concurrency", mandatory=False, default_value=2)),
+            max_retries=int(self._config.opts("reporting", "datastore.bulk.max.retries", mandatory=False, default_value=5)),
+            initial_backoff=float(self._config.opts("reporting", "datastore.bulk.retry.backoff", mandatory=False, default_value=1)),
+            spool_dir=self._config.opts("reporting", "datastore.spool.dir", mandatory=False, default_value=default_spool_dir))
 
     def create(self):
-        return EsClient(self._client)
+        return EsClient(self._client, self._bulk_flusher)
+
+
+class BulkFlusher:
+    """
+    Sends documents to the metrics store in chunks with multiple concurrent bulk requests.
+
+    Documents that have been rejected (e.g. because the metrics store is overloaded) or could not be sent due to connection problems are
+    retried with exponential backoff. If documents still cannot be indexed after all retries, they are spooled to a local file (provided that
+    a spool directory is configured) and sent again after the next successful flush. Once documents have exhausted all retries, the
+    metrics store is considered unavailable for the rest of the flush so remaining documents are spooled without further attempts.
+    """
+
+    # bulk item failures with these status codes are worth a retry. Failed requests (e.g. due to connection errors) have status "N/A".
+    RETRYABLE_STATUS = [429, 502, 503, 504, "N/A"]
+
+    def __init__(self, client, chunk_size=5000, concurrency=2, max_retries=5, initial_backoff=1, spool_dir=None):
+        """
+        :param client: The Elasticsearch client.
+        :param chunk_size: The number of documents per bulk request.
+        :param concurrency: The number of concurrent bulk requests.
+        :param max_retries: The maximum number of retries for failed documents.
+        :param initial_backoff: The time to wait in seconds before the first retry. It is doubled for each subsequent retry.
+        :param spool_dir: A directory to which documents are written if they cannot be sent. Optional. If no directory is provided, a
+                          failure to send documents is an error.
+        """
+        self.client = client
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.spool_dir = spool_dir
+        self.unavailable = threading.Event()
+        self.spool_files = 0
+
+    def bulk_index(self, index, doc_type, items):
+        self.unavailable.clear()
+        actions = [{"_index": index, "_type": doc_type, "_source": item} for item in items]
+        failed = self.send(actions)
+        if failed:
+            self.spool(failed)
+        else:
+            # only replay spooled documents once the metrics store is known to be available again
+            self.replay_spool()
+
+    def send(self, actions):
+        """
+        :param actions: A list of bulk actions.
+        :return: A list of all actions that could not be sent (despite retries).
+        """
+        failed = []
+        in_flight = set()
+        # at most two chunks per worker are buffered so we do not queue up the whole list of actions at once
+        max_in_flight = 2 * self.concurrency
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for offset in range(0, len(actions), self.chunk_size):
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for f in done:
+                        failed.extend(f.result())
+                in_flight.add(pool.submit(self._send_chunk, actions[offset:offset + self.chunk_size]))
+            for f in concurrent.futures.as_completed(in_flight):
+                failed.extend(f.result())
+        return failed
+
+    def _send_chunk(self, chunk):
+        if self.unavailable.is_set():
+            # another chunk has already exhausted all retries
+            return chunk
+        backoff = self.initial_backoff
+        attempt = 0
+        while True:
+            retryable = []
+            for action, (ok, item) in zip(chunk, elasticsearch.helpers.streaming_bulk(self.client, chunk, chunk_size=len(chunk),
+                                                                                      raise_on_error=False, raise_on_exception=False)):
+                if not ok:
+                    info = next(iter(item.values()))
+                    if isinstance(info.get("exception"), (elasticsearch.exceptions.AuthenticationException,
+                                                          elasticsearch.exceptions.AuthorizationException)):
+                        # retrying won't help; let the caller report a proper error
+                        raise info["exception"]
+                    if info.get("status") in BulkFlusher.RETRYABLE_STATUS:
+                        retryable.append(action)
+                    else:
+                        logger.error("Could not index metrics document in index [%s]: [%s]. Dropping it." %
+                                     (action["_index"], info.get("error")))
+            if not retryable:
+                return retryable
+            if attempt >= self.max_retries or self.unavailable.is_set():
+                self.unavailable.set()
+                return retryable
+            attempt += 1
+            logger.warning("[%d] metrics documents could not be indexed. Retrying in [%s] seconds (attempt [%d/%d])." %
+                           (len(retryable), backoff, attempt, self.max_retries))
+            time.sleep(backoff)
+            backoff *= 2
+            chunk = retryable
+
+    def spool(self, actions):
+        if not self.spool_dir:
+            raise exceptions.RallyError("Could not send [%d] documents to the metrics store." % len(actions))
+        os.makedirs(self.spool_dir, exist_ok=True)
+        # flushes may happen in quick succession while the metrics store is unavailable so the timestamp alone is not unique
+        self.spool_files += 1
+        spool_file = os.path.join(self.spool_dir, "metrics-%d-%d-%06d.json" % (time.to_epoch_millis(time.Clock.now()), os.getpid(),
+                                                                               self.spool_files))
+        with open(spool_file, "wt", encoding="utf-8") as f:
+            for action in actions:
+                f.write(json.dumps(action))
+                f.write("\n")
+        console.warn("Could not send [%d] documents to the metrics store. They have been written to [%s] and will be sent on the next "
+                     "attempt." % (len(actions), spool_file), logger=logger)
+
+    def replay_spool(self):
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return
+        for spool_file in sorted(glob.glob(os.path.join(self.spool_dir, "metrics-*.json"))):
+            logger.info("Replaying spooled metrics documents from [%s]." % spool_file)
+            with open(spool_file, "rt", encoding="utf-8") as f:
+                actions = [json.loads(line) for line in f if line.strip()]
+            failed = self.send(actions)
+            if failed:
+                logger.warning("[%d] spooled metrics documents in [%s] could still not be sent." % (len(failed), spool_file))
+                # the metrics store is still not available. Keep the remaining documents for the next attempt.
+                with open(spool_file, "wt", encoding="utf-8") as f:
+                    for action in failed:
+                        f.write(json.dumps(action))
+                        f.write("\n")
+                return
+            os.remove(spool_file)
 
 
 class IndexTemplateProvider:
@@ -150,9 +306,13 @@ def metrics_store(config, read_only=True, invocation=None, track=None, challenge
     :param read_only: Whether to open the metrics store only for reading (Default: True).
     :return: A metrics store implementation.
     """
-    if config.opts("reporting", "datastore.type") == "elasticsearch":
+    data_store_type = config.opts("reporting", "datastore.type")
+    if data_store_type == "elasticsearch":
         logger.info("Creating ES metrics store")
         store = EsMetricsStore(config)
+    elif data_store_type == "sqlite":
+        logger.info("Creating SQLite metrics store")
+        store = SqliteMetricsStore(config)
     else:
         logger.info("Creating in-memory metrics store")
         store = InMemoryMetricsStore(config)
@@ -373,8 +533,28 @@ class MetricsStore:
         self._put(MetaInfoScope.node, node_name, name, value, unit, operation, operation_type, sample_type, absolute_time, relative_time,
                   meta_data)
 
+    def put_histogram_cluster_level(self, name, histogram, unit, operation=None, operation_type=None, sample_type=SampleType.Normal,
+                                    absolute_time=None, relative_time=None, meta_data=None):
+        """
+        Adds a new cluster level histogram metric. Instead of one metrics record per value, all values are stored in a single record.
+
+        :param name: The name of the metric.
+        :param histogram: A ``Histogram`` containing all values of this metric.
+        :param unit: The unit of the histogram's values (e.g. ms).
+        :param operation The operation name to which these values apply. Optional. Defaults to None.
+        :param operation_type The operation type to which these values apply. Optional. Defaults to None.
+        :param sample_type Whether these are warmup or normal measurement samples. Defaults to SampleType.Normal.
+        :param absolute_time The absolute timestamp in seconds since epoch when this metric record is stored. Defaults to None. The metrics
+               store will derive the timestamp automatically.
+        :param relative_time The relative timestamp in seconds since the start of the benchmark when this metric record is stored.
+               Defaults to None. The metrics store will derive the timestamp automatically.
+        :param meta_data: A dict, containing additional key-value pairs. Defaults to None.
+        """
+        self._put(MetaInfoScope.cluster, None, name, None, unit, operation, operation_type, sample_type, absolute_time, relative_time,
+                  meta_data, histogram)
+
     def _put(self, level, level_key, name, value, unit, operation, operation_type, sample_type, absolute_time=None, relative_time=None,
-             meta_data=None):
+             meta_data=None, histogram=None):
         if level == MetaInfoScope.cluster:
             meta = self._meta_info[MetaInfoScope.cluster].copy()
         elif level == MetaInfoScope.node:
@@ -390,9 +570,50 @@ class MetricsStore:
         if relative_time is None:
             relative_time = self._stop_watch.split_time()
 
+        doc = self._doc_template(name, unit, operation, operation_type, meta)
+        doc["@timestamp"] = time.to_epoch_millis(absolute_time)
+        doc["relative-time"] = int(relative_time * 1000 * 1000)
+        doc["value"] = value
+        doc["sample-type"] = sample_type.name.lower()
+        if histogram:
+            doc["histogram"] = histogram.encode()
+
+        assert self.lap is not None, "Attempting to store [%s] without a lap." % doc
+        self._add(doc)
+
+    def put_values_batch(self, name, samples, operation=None, operation_type=None, meta_data=None):
+        """
+        Adds many cluster level values of the same metric at once. Meta-data are merged only once and all documents of the batch share the
+        same (read-only) meta-data dict.
+
+        :param name: The name of the metric.
+        :param samples: An iterable of tuples of: absolute time (seconds since epoch), relative time (seconds since the start of the
+               benchmark), sample type, value and unit.
+        :param operation The operation name to which these values apply. Optional. Defaults to None.
+        :param operation_type The operation type to which these values apply. Optional. Defaults to None.
+        :param meta_data: A dict, containing additional key-value pairs that are shared by all documents. Defaults to None.
+        """
+        assert self.lap is not None, "Attempting to store [%s] without a lap." % name
+        meta = self._meta_info[MetaInfoScope.cluster].copy()
+        if meta_data:
+            meta.update(meta_data)
+        template = self._doc_template(name, None, operation, operation_type, meta)
+        sample_type_names = {}
+        for absolute_time, relative_time, sample_type, value, unit in samples:
+            sample_type_name = sample_type_names.get(sample_type)
+            if sample_type_name is None:
+                sample_type_name = sample_type.name.lower()
+                sample_type_names[sample_type] = sample_type_name
+            doc = template.copy()
+            doc["@timestamp"] = time.to_epoch_millis(absolute_time)
+            doc["relative-time"] = int(relative_time * 1000 * 1000)
+            doc["value"] = value
+            doc["unit"] = unit
+            doc["sample-type"] = sample_type_name
+            self._add(doc)
+
+    def _doc_template(self, name, unit, operation, operation_type, meta):
         doc = {
-            "@timestamp": time.to_epoch_millis(absolute_time),
-            "relative-time": int(relative_time * 1000 * 1000),
             "trial-timestamp": self._invocation,
             "environment": self._environment_name,
             "track": self._track,
@@ -400,18 +621,14 @@ class MetricsStore:
             "challenge": self._challenge,
             "car": self._car,
             "name": name,
-            "value": value,
             "unit": unit,
-            "sample-type": sample_type.name.lower(),
             "meta": meta
         }
         if operation:
             doc["operation"] = operation
         if operation_type:
             doc["operation-type"] = operation_type
-
-        assert self.lap is not None, "Attempting to store [%s] without a lap." % doc
-        self._add(doc)
+        return doc
 
     def bulk_add(self, docs):
         """
@@ -522,6 +739,44 @@ class MetricsStore:
         """
         raise NotImplementedError("abstract method")
 
+    def get_histogram(self, name, operation=None, operation_type=None, sample_type=None, lap=None):
+        """
+        Retrieves all histograms for the given metric and merges them.
+
+        :param name: The metric name to query.
+        :param operation The operation name to query. Optional.
+        :param operation_type The operation type to query. Optional.
+        :param sample_type The sample type to query. Optional. By default, all samples are considered.
+        :param lap The lap to query. Optional. By default, all laps are considered.
+        :return: A ``Histogram`` or None if no histogram has been stored for this metric (e.g. because it consists of raw values).
+        """
+        merged = None
+        for encoded in self._get(name, operation, operation_type, sample_type, lap, lambda doc: doc.get("histogram")):
+            if encoded:
+                h = histogram.Histogram.decode(encoded)
+                if merged is None:
+                    merged = h
+                else:
+                    merged.add(h)
+        return merged
+
+    @staticmethod
+    def histogram_stats(h):
+        return {
+            "count": h.total_count,
+            "min": h.min,
+            "max": h.max,
+            "avg": h.mean,
+            "sum": h.sum
+        }
+
+    @staticmethod
+    def histogram_percentiles(h, percentiles):
+        result = collections.OrderedDict()
+        for percentile in sorted(percentiles, key=float):
+            result[percentile] = h.value_at_percentile(float(percentile))
+        return result
+
     def get_median(self, name, operation=None, operation_type=None, sample_type=None, lap=None):
         """
         Retrieves median value of the given metric.
@@ -537,6 +792,170 @@ class MetricsStore:
         percentiles = self.get_percentiles(name, operation, operation_type, sample_type, lap, percentiles=[median])
         return percentiles[median] if percentiles else None
 
+    def get_summary(self, lap=None):
+        """
+        Retrieves statistics for all metrics of the current race at once. This is intended for reports which need statistics for many
+        different metrics and avoids one round-trip to the metrics store per metric.
+
+        :param lap The lap to query. Optional. By default, all laps are considered.
+        :return: A ``MetricsSummary``.
+        """
+        raise NotImplementedError("abstract method")
+
+
+class MetricsSummary:
+    """
+    Statistics for all metrics of a race that have been retrieved at once from a metrics store (see ``MetricsStore#get_summary()``).
+
+    Statistics are kept per metric name, operation and sample type. An operation or sample type of ``None`` denotes the statistics across
+    all operations or all sample types respectively.
+    """
+    # all percentiles that reports may ask for
+    PERCENTILES = [50.0, 90.0, 99.0, 99.9, 99.99, 100.0]
+
+    def __init__(self):
+        self._entries = {}
+
+    @staticmethod
+    def from_docs(docs):
+        """
+        Creates a summary based on raw metrics records.
+
+        :param docs: An iterable of metrics records.
+        :return: A ``MetricsSummary``.
+        """
+        summary = MetricsSummary()
+        values = {}
+        units = {}
+        for doc in docs:
+            name = doc["name"]
+            operation = doc.get("operation")
+            sample_type = doc["sample-type"]
+            encoded = doc.get("histogram")
+            if encoded:
+                summary.add_histogram(name, operation, sample_type, histogram.Histogram.decode(encoded))
+            units.setdefault((name, None), doc["unit"])
+            units.setdefault((name, operation), doc["unit"])
+            if doc["value"] is not None:
+                for key in MetricsSummary._keys(name, operation, sample_type):
+                    values.setdefault(key, []).append(doc["value"])
+        for (name, operation), unit in units.items():
+            summary._entry(name, operation, None)["unit"] = unit
+        for (name, operation, sample_type), key_values in values.items():
+            sorted_values = sorted(key_values)
+            stats = {
+                "count": len(sorted_values),
+                "min": sorted_values[0],
+                "max": sorted_values[-1],
+                "avg": statistics.mean(sorted_values),
+                "sum": sum(sorted_values)
+            }
+            percentiles = {p: InMemoryMetricsStore.percentile_value(sorted_values, p) for p in MetricsSummary.PERCENTILES}
+            summary.put(name, operation, sample_type, stats, percentiles)
+        return summary
+
+    @staticmethod
+    def _keys(name, operation, sample_type):
+        # a set because operation may be None in which case the keys coincide
+        return {(name, None, None), (name, None, sample_type), (name, operation, None), (name, operation, sample_type)}
+
+    def _entry(self, name, operation, sample_type):
+        key = (name, operation, sample_type)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = {"stats": None, "percentiles": None, "histogram": None, "unit": None}
+            self._entries[key] = entry
+        return entry
+
+    def put(self, name, operation, sample_type, stats, percentiles, unit=None):
+        """
+        Adds statistics of raw values.
+
+        :param name: The metric name.
+        :param operation: The operation name. ``None`` for statistics across all operations.
+        :param sample_type: The sample type as stored in metrics records (e.g. "normal"). ``None`` for statistics across all sample types.
+        :param stats: A dict with the keys ``count``, ``min``, ``max``, ``avg`` and ``sum``.
+        :param percentiles: A dict of percentile (as float) to value for (at least) all percentiles in ``MetricsSummary.PERCENTILES``.
+        :param unit: The unit of this metric. Optional.
+        """
+        entry = self._entry(name, operation, sample_type)
+        entry["stats"] = stats
+        entry["percentiles"] = percentiles
+        if unit is not None:
+            self._entry(name, operation, None)["unit"] = unit
+
+    def add_histogram(self, name, operation, sample_type, h):
+        """
+        Merges a histogram into the statistics of all matching combinations of operation and sample type.
+        """
+        for key in MetricsSummary._keys(name, operation, sample_type):
+            entry = self._entry(*key)
+            if entry["histogram"] is None:
+                entry["histogram"] = histogram.Histogram(h.significant_figures, h.highest_trackable_value, h.scale)
+            entry["histogram"].add(h)
+
+    def _lookup(self, name, operation, sample_type):
+        return self._entries.get((name, operation, sample_type.name.lower() if sample_type is not None else None))
+
+    def get_stats(self, name, operation=None, sample_type=None):
+        """
+        :return: A dict with the keys ``count``, ``min``, ``max``, ``avg`` and ``sum`` or ``None`` if there are no values.
+        """
+        entry = self._lookup(name, operation, sample_type)
+        if entry is None:
+            return None
+        elif entry["histogram"] is not None:
+            return MetricsStore.histogram_stats(entry["histogram"])
+        elif entry["stats"] is not None:
+            # callers may modify the result
+            return dict(entry["stats"])
+        else:
+            return None
+
+    def get_count(self, name, operation=None, sample_type=None):
+        stats = self.get_stats(name, operation, sample_type)
+        return stats["count"] if stats else 0
+
+    def get_sum(self, name, operation=None, sample_type=None):
+        stats = self.get_stats(name, operation, sample_type)
+        return stats["sum"] if stats else None
+
+    def get_one(self, name, operation=None, sample_type=None):
+        """
+        :return: One value for the given metric name (intended for metrics that have only one value).
+        """
+        stats = self.get_stats(name, operation, sample_type)
+        return stats["max"] if stats else None
+
+    def get_percentiles(self, name, operation=None, sample_type=None, percentiles=None):
+        """
+        :param percentiles: A list of percentiles that is a subset of ``MetricsSummary.PERCENTILES``. Default: 99th, 99.9th and 100th.
+        :return: An ordered dictionary of the requested percentiles to their values or ``None`` if there are no values.
+        """
+        if percentiles is None:
+            percentiles = [99, 99.9, 100]
+        entry = self._lookup(name, operation, sample_type)
+        if entry is None:
+            return None
+        elif entry["histogram"] is not None:
+            return MetricsStore.histogram_percentiles(entry["histogram"], percentiles)
+        elif entry["percentiles"] is not None:
+            result = collections.OrderedDict()
+            for percentile in sorted(percentiles, key=float):
+                result[percentile] = entry["percentiles"].get(float(percentile))
+            return result
+        else:
+            return None
+
+    def get_median(self, name, operation=None, sample_type=None):
+        median = 50.0
+        percentiles = self.get_percentiles(name, operation, sample_type, percentiles=[median])
+        return percentiles[median] if percentiles else None
+
+    def get_unit(self, name, operation=None):
+        entry = self._entries.get((name, operation, None))
+        return entry["unit"] if entry else None
+
 
 def index_name(ts):
     return "rally-%04d" % ts.year
@@ -547,6 +966,8 @@ class EsMetricsStore(MetricsStore):
     A metrics store backed by Elasticsearch.
     """
     METRICS_DOC_TYPE = "metrics"
+    # upper bound for the number of distinct metric names and operations in a summary
+    SUMMARY_TERMS_SIZE = 1000
 
     def __init__(self,
                  config,
@@ -599,9 +1020,9 @@ class EsMetricsStore(MetricsStore):
             "query": self._query_by_name(name, operation, operation_type, sample_type, lap)
         }
         logger.debug("Issuing get against index=[%s], doc_type=[%s], query=[%s]" % (self._index, EsMetricsStore.METRICS_DOC_TYPE, query))
-        result = self._client.search(index=self._index, doc_type=EsMetricsStore.METRICS_DOC_TYPE, body=query)
-        logger.debug("Metrics query produced [%s] results." % result["hits"]["total"])
-        return [mapper(v["_source"]) for v in result["hits"]["hits"]]
+        hits = self._client.scan(index=self._index, doc_type=EsMetricsStore.METRICS_DOC_TYPE, body=query)
+        logger.debug("Metrics query produced [%s] results." % len(hits))
+        return [mapper(v["_source"]) for v in hits]
 
     def get_stats(self, name, operation=None, operation_type=None, sample_type=None, lap=None):
         """
@@ -623,7 +1044,13 @@ class EsMetricsStore(MetricsStore):
         logger.debug("Issuing get_stats against index=[%s], doc_type=[%s], query=[%s]" %
                      (self._index, EsMetricsStore.METRICS_DOC_TYPE, query))
         result = self._client.search(index=self._index, doc_type=EsMetricsStore.METRICS_DOC_TYPE, body=query)
-        return result["aggregations"]["metric_stats"]
+        stats = result["aggregations"]["metric_stats"]
+        # there are no raw values but the metric might have been stored as a histogram
+        if stats.get("count") == 0:
+            h = self.get_histogram(name, operation, operation_type, sample_type, lap)
+            if h:
+                return self.histogram_stats(h)
+        return stats
 
     def get_percentiles(self, name, operation=None, operation_type=None, sample_type=None, lap=None, percentiles=None):
         if percentiles is None:
@@ -646,10 +1073,107 @@ class EsMetricsStore(MetricsStore):
         logger.debug("get_percentiles produced %d hits" % hits)
         if hits > 0:
             raw = result["aggregations"]["percentile_stats"]["values"]
+            # there are no raw values but the metric might have been stored as a histogram
+            if all(v is None or v == "NaN" for v in raw.values()):
+                h = self.get_histogram(name, operation, operation_type, sample_type, lap)
+                if h:
+                    return self.histogram_percentiles(h, percentiles)
             return collections.OrderedDict(sorted(raw.items(), key=lambda t: float(t[0])))
         else:
             return None
 
+    def get_summary(self, lap=None):
+        """
+        Retrieves statistics for all metrics with one aggregation query. Metrics that are stored as histograms are retrieved with a second
+        query and merged client-side.
+        """
+        summary = MetricsSummary()
+        query = {
+            "query": self._query_by_name(None, None, None, None, lap),
+            "size": 0,
+            "aggs": {
+                "names": {
+                    "terms": {
+                        "field": "name",
+                        "size": EsMetricsStore.SUMMARY_TERMS_SIZE
+                    },
+                    "aggs": self._summary_aggs(by_operation=True)
+                }
+            }
+        }
+        logger.debug("Issuing get_summary against index=[%s], doc_type=[%s], query=[%s]" %
+                     (self._index, EsMetricsStore.METRICS_DOC_TYPE, query))
+        result = self._client.search(index=self._index, doc_type=EsMetricsStore.METRICS_DOC_TYPE, body=query)
+        for name_bucket in result["aggregations"]["names"]["buckets"]:
+            name = name_bucket["key"]
+            self._put_summary(summary, name, None, name_bucket)
+            for operation_bucket in name_bucket["operations"]["buckets"]:
+                self._put_summary(summary, name, operation_bucket["key"], operation_bucket)
+
+        # histogram records have no value
+        histogram_query = {
+            "query": self._query_by_name(None, None, None, None, lap),
+            "_source": ["name", "operation", "sample-type", "histogram"]
+        }
+        histogram_query["query"]["bool"]["must_not"] = {"exists": {"field": "value"}}
+        for hit in self._client.scan(index=self._index, doc_type=EsMetricsStore.METRICS_DOC_TYPE, body=histogram_query):
+            doc = hit["_source"]
+            if doc.get("histogram"):
+                summary.add_histogram(doc["name"], doc.get("operation"), doc["sample-type"], histogram.Histogram.decode(doc["histogram"]))
+        return summary
+
+    def _summary_aggs(self, by_operation=False):
+        aggs = {
+            "metric_stats": {
+                "stats": {
+                    "field": "value"
+                }
+            },
+            "percentile_stats": {
+                "percentiles": {
+                    "field": "value",
+                    "percents": MetricsSummary.PERCENTILES
+                }
+            },
+            "units": {
+                "terms": {
+                    "field": "unit",
+                    "size": 1
+                }
+            }
+        }
+        if by_operation:
+            aggs["sample_types"] = {
+                "terms": {
+                    "field": "sample-type"
+                },
+                "aggs": self._summary_aggs()
+            }
+            operation_aggs = self._summary_aggs()
+            operation_aggs["sample_types"] = aggs["sample_types"]
+            aggs["operations"] = {
+                "terms": {
+                    "field": "operation",
+                    "size": EsMetricsStore.SUMMARY_TERMS_SIZE
+                },
+                "aggs": operation_aggs
+            }
+        return aggs
+
+    def _put_summary(self, summary, name, operation, bucket):
+        units = bucket["units"]["buckets"]
+        self._put_summary_stats(summary, name, operation, None, bucket, units[0]["key"] if units else None)
+        for sample_type_bucket in bucket["sample_types"]["buckets"]:
+            self._put_summary_stats(summary, name, operation, sample_type_bucket["key"], sample_type_bucket)
+
+    def _put_summary_stats(self, summary, name, operation, sample_type, bucket, unit=None):
+        stats = bucket["metric_stats"]
+        if stats.get("count", 0) > 0:
+            percentiles = {float(k): v for k, v in bucket["percentile_stats"]["values"].items()}
+            summary.put(name, operation, sample_type, stats, percentiles, unit)
+        elif unit is not None:
+            summary.put(name, operation, sample_type, None, None, unit)
+
     def _query_by_name(self, name, operation, operation_type, sample_type, lap):
         q = {
             "bool": {
@@ -678,15 +1202,16 @@ class EsMetricsStore(MetricsStore):
                         "term": {
                             "car": self._car
                         }
-                    },
-                    {
-                        "term": {
-                            "name": name
-                        }
                     }
                 ]
             }
         }
+        if name:
+            q["bool"]["filter"].append({
+                "term": {
+                    "name": name
+                }
+            })
         if operation:
             q["bool"]["filter"].append({
                 "term": {
@@ -715,6 +1240,14 @@ class EsMetricsStore(MetricsStore):
 
 
 class InMemoryMetricsStore(MetricsStore):
+    """
+    A metrics store that keeps all metrics records in memory.
+
+    Records are indexed by metric name and by the combination of operation, operation type, sample type and lap, so a query only needs to
+    consider the records with the respective name and key. Sorted values (and the derived statistics) are cached per query until new
+    records for this metric name are added.
+    """
+
     def __init__(self, config, clock=time.Clock, meta_info=None, lap=None):
         """
 
@@ -727,23 +1260,70 @@ class InMemoryMetricsStore(MetricsStore):
         """
         super().__init__(config=config, clock=clock, meta_info=meta_info, lap=lap)
         self.docs = []
+        # name -> (operation, operation type, sample type, lap) -> docs
+        self._index = {}
+        # name -> query -> cached results
+        self._cache = {}
 
     def __del__(self):
         """
         Deletes the metrics store instance.
         """
         del self.docs
+        del self._index
+        del self._cache
 
     def _add(self, doc):
         self.docs.append(doc)
+        name = doc["name"]
+        key = (doc.get("operation"), doc.get("operation-type"), doc["sample-type"], doc["lap"])
+        by_key = self._index.get(name)
+        if by_key is None:
+            by_key = {}
+            self._index[name] = by_key
+        docs = by_key.get(key)
+        if docs is None:
+            docs = []
+            by_key[key] = docs
+        docs.append(doc)
+        self._cache.pop(name, None)
+
+    def _clear(self):
+        self.docs = []
+        self._index = {}
+        self._cache = {}
+
+    def _cached(self, name, operation, operation_type, sample_type, lap):
+        """
+        :return: A (mutable) dict with cached results for the given query.
+        """
+        return self._cache.setdefault(name, {}).setdefault((operation, operation_type, sample_type, lap), {})
+
+    def _sorted_values(self, name, operation, operation_type, sample_type, lap):
+        cached = self._cached(name, operation, operation_type, sample_type, lap)
+        if "sorted_values" not in cached:
+            cached["sorted_values"] = sorted(self.get(name, operation, operation_type, sample_type, lap))
+        return cached["sorted_values"]
+
+    def get_histogram(self, name, operation=None, operation_type=None, sample_type=None, lap=None):
+        cached = self._cached(name, operation, operation_type, sample_type, lap)
+        if "histogram" not in cached:
+            cached["histogram"] = super().get_histogram(name, operation, operation_type, sample_type, lap)
+        return cached["histogram"]
 
     def flush(self):
         pass
 
-    def to_externalizable(self):
+    def to_externalizable(self, clear=False):
+        """
+        :param clear: If ``True``, all documents are removed from this metrics store after they have been externalized. Default: ``False``.
+        :return: All documents of this metrics store in a compact, serializable representation (see #bulk_add()).
+        """
         compressed = zlib.compress(pickle.dumps(self.docs))
         logger.info("Compression changed size of metric store from [%d] bytes to [%d] bytes" %
                     (sys.getsizeof(self.docs), sys.getsizeof(compressed)))
+        if clear:
+            self._clear()
         return compressed
 
     def bulk_add(self, docs):
@@ -756,10 +1336,12 @@ class InMemoryMetricsStore(MetricsStore):
     def get_percentiles(self, name, operation=None, operation_type=None, sample_type=None, lap=None, percentiles=None):
         if percentiles is None:
             percentiles = [99, 99.9, 100]
+        h = self.get_histogram(name, operation, operation_type, sample_type, lap)
+        if h:
+            return self.histogram_percentiles(h, percentiles)
         result = collections.OrderedDict()
-        values = self.get(name, operation, operation_type, sample_type, lap)
-        if len(values) > 0:
-            sorted_values = sorted(values)
+        sorted_values = self._sorted_values(name, operation, operation_type, sample_type, lap)
+        if len(sorted_values) > 0:
             for percentile in percentiles:
                 result[percentile] = self.percentile_value(sorted_values, percentile)
         return result
@@ -787,28 +1369,197 @@ class InMemoryMetricsStore(MetricsStore):
             return lower_score + (higher_score - lower_score) * fr
 
     def get_stats(self, name, operation=None, operation_type=None, sample_type=SampleType.Normal, lap=None):
-        values = self.get(name, operation, operation_type, sample_type, lap)
-        sorted_values = sorted(values)
-        if len(sorted_values) > 0:
+        h = self.get_histogram(name, operation, operation_type, sample_type, lap)
+        if h:
+            return self.histogram_stats(h)
+        cached = self._cached(name, operation, operation_type, sample_type, lap)
+        if "stats" not in cached:
+            sorted_values = self._sorted_values(name, operation, operation_type, sample_type, lap)
+            if len(sorted_values) > 0:
+                cached["stats"] = {
+                    "count": len(sorted_values),
+                    "min": sorted_values[0],
+                    "max": sorted_values[-1],
+                    "avg": statistics.mean(sorted_values),
+                    "sum": sum(sorted_values)
+                }
+            else:
+                cached["stats"] = None
+        # callers may modify the result
+        return dict(cached["stats"]) if cached["stats"] else None
+
+    def get_summary(self, lap=None):
+        return MetricsSummary.from_docs(doc for by_key in self._index.values() for (_, _, _, l), docs in by_key.items()
+                                        if lap is None or l == lap for doc in docs)
+
+    def _get(self, name, operation, operation_type, sample_type, lap, mapper):
+        operation_type_name = operation_type.name if operation_type is not None else None
+        sample_type_name = sample_type.name.lower() if sample_type is not None else None
+        result = []
+        for (op, op_type, st, l), docs in self._index.get(name, {}).items():
+            if (operation is None or op == operation) and \
+                    (operation_type is None or op_type == operation_type_name) and \
+                    (sample_type is None or st == sample_type_name) and \
+                    (lap is None or l == lap):
+                result.extend(mapper(doc) for doc in docs)
+        return result
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS races (
+  environment TEXT NOT NULL,
+  trial_timestamp TEXT NOT NULL,
+  doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS races_by_timestamp ON races (environment, trial_timestamp);
+CREATE TABLE IF NOT EXISTS metrics (
+  environment TEXT NOT NULL,
+  trial_timestamp TEXT NOT NULL,
+  track TEXT,
+  challenge TEXT,
+  car TEXT,
+  lap INTEGER,
+  name TEXT NOT NULL,
+  operation TEXT,
+  operation_type TEXT,
+  sample_type TEXT,
+  value REAL,
+  unit TEXT,
+  histogram TEXT,
+  doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS metrics_by_name ON metrics (environment, trial_timestamp, track, challenge, car, name);
+"""
+
+
+def sqlite_connection(config):
+    """
+    Opens the SQLite database which is used by the SQLite metrics and race store and creates all tables if necessary.
+
+    :param config: Config object. Mandatory.
+    :return: A ``sqlite3.Connection``.
+    """
+    path = config.opts("reporting", "datastore.sqlite.path", mandatory=False)
+    if not path:
+        path = "%s/rally.db" % config.opts("system", "root.dir")
+    path = io.normalize_path(path)
+    io.ensure_dir(io.dirname(path))
+    logger.info("Opening SQLite database [%s]." % path)
+    connection = sqlite3.connect(path)
+    connection.executescript(SQLITE_SCHEMA)
+    return connection
+
+
+class SqliteMetricsStore(MetricsStore):
+    """
+    A metrics store that is backed by a local SQLite database (see ``sqlite_connection()``). Metrics records are kept in a table that is
+    indexed by race and metric name so statistics and percentiles can be determined without an external metrics cluster.
+    """
+
+    def __init__(self, config, connection=None, clock=time.Clock, meta_info=None, lap=None):
+        """
+        Creates a new metrics store.
+
+        :param config: The config object. Mandatory.
+        :param connection: This parameter is optional and needed for testing.
+        :param clock: This parameter is optional and needed for testing.
+        :param meta_info: This parameter is optional and intended for creating a metrics store with a previously serialized meta-info.
+        :param lap: This parameter is optional and intended for creating a metrics store with a previously serialized lap.
+        """
+        super().__init__(config=config, clock=clock, meta_info=meta_info, lap=lap)
+        self._connection = connection if connection else sqlite_connection(config)
+        self._docs = []
+
+    def flush(self):
+        rows = []
+        for doc in self._docs:
+            operation_type = doc.get("operation-type")
+            rows.append((doc["environment"], doc["trial-timestamp"], doc["track"], doc["challenge"], doc["car"], doc["lap"], doc["name"],
+                         doc.get("operation"), operation_type.name if isinstance(operation_type, Enum) else operation_type,
+                         doc["sample-type"], doc["value"], doc["unit"], doc.get("histogram"),
+                         json.dumps(doc, default=lambda o: o.name if isinstance(o, Enum) else str(o))))
+        with self._connection:
+            self._connection.executemany("INSERT INTO metrics (environment, trial_timestamp, track, challenge, car, lap, name, operation, "
+                                         "operation_type, sample_type, value, unit, histogram, doc) "
+                                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        logger.info("Successfully added %d metrics records for invocation=[%s], track=[%s], challenge=[%s], car=[%s]." %
+                    (len(rows), self._invocation, self._track, self._challenge, self._car))
+        self._docs = []
+
+    def _add(self, doc):
+        self._docs.append(doc)
+
+    def _query(self, columns, name, operation, operation_type, sample_type, lap, condition=None, order_by=None):
+        clauses = ["environment = ?", "trial_timestamp = ?", "track = ?", "challenge = ?", "car = ?"]
+        params = [self._environment_name, self._invocation, self._track, self._challenge, self._car]
+        if name:
+            clauses.append("name = ?")
+            params.append(name)
+        if operation:
+            clauses.append("operation = ?")
+            params.append(operation)
+        if operation_type:
+            clauses.append("operation_type = ?")
+            params.append(operation_type.name)
+        if sample_type:
+            clauses.append("sample_type = ?")
+            params.append(sample_type.name.lower())
+        if lap is not None:
+            clauses.append("lap = ?")
+            params.append(lap)
+        if condition:
+            clauses.append(condition)
+        statement = "SELECT %s FROM metrics WHERE %s" % (columns, " AND ".join(clauses))
+        if order_by:
+            statement += " ORDER BY %s" % order_by
+        logger.debug("Issuing query [%s] with parameters [%s]." % (statement, params))
+        return self._connection.execute(statement, params)
+
+    def _get(self, name, operation, operation_type, sample_type, lap, mapper):
+        return [mapper(json.loads(doc)) for doc, in self._query("doc", name, operation, operation_type, sample_type, lap)]
+
+    def get_histogram(self, name, operation=None, operation_type=None, sample_type=None, lap=None):
+        merged = None
+        for encoded, in self._query("histogram", name, operation, operation_type, sample_type, lap, condition="histogram IS NOT NULL"):
+            h = histogram.Histogram.decode(encoded)
+            if merged is None:
+                merged = h
+            else:
+                merged.add(h)
+        return merged
+
+    def get_stats(self, name, operation=None, operation_type=None, sample_type=None, lap=None):
+        count, min_value, max_value, avg, total = self._query("COUNT(value), MIN(value), MAX(value), AVG(value), SUM(value)",
+                                                              name, operation, operation_type, sample_type, lap).fetchone()
+        if count > 0:
             return {
-                "count": len(sorted_values),
-                "min": sorted_values[0],
-                "max": sorted_values[-1],
-                "avg": statistics.mean(sorted_values),
-                "sum": sum(sorted_values)
+                "count": count,
+                "min": min_value,
+                "max": max_value,
+                "avg": avg,
+                "sum": total
             }
-        else:
-            return None
+        # there are no raw values but the metric might have been stored as a histogram
+        h = self.get_histogram(name, operation, operation_type, sample_type, lap)
+        return self.histogram_stats(h) if h else None
 
-    def _get(self, name, operation, operation_type, sample_type, lap, mapper):
-        return [mapper(doc)
-                for doc in self.docs
-                if doc["name"] == name and
-                (operation is None or doc["operation"] == operation) and
-                (operation_type is None or doc["operation-type"] == operation_type.name) and
-                (sample_type is None or doc["sample-type"] == sample_type.name.lower()) and
-                (lap is None or doc["lap"] == lap)
-                ]
+    def get_percentiles(self, name, operation=None, operation_type=None, sample_type=None, lap=None, percentiles=None):
+        if percentiles is None:
+            percentiles = [99, 99.9, 100]
+        sorted_values = [v for v, in self._query("value", name, operation, operation_type, sample_type, lap, condition="value IS NOT NULL",
+                                                 order_by="value")]
+        if len(sorted_values) == 0:
+            h = self.get_histogram(name, operation, operation_type, sample_type, lap)
+            return self.histogram_percentiles(h, percentiles) if h else None
+        result = collections.OrderedDict()
+        for percentile in sorted(percentiles, key=float):
+            result[percentile] = InMemoryMetricsStore.percentile_value(sorted_values, percentile)
+        return result
+
+    def get_summary(self, lap=None):
+        cursor = self._query("name, operation, sample_type, unit, value, histogram", None, None, None, None, lap)
+        return MetricsSummary.from_docs({"name": name, "operation": operation, "sample-type": sample_type, "unit": unit, "value": value,
+                                         "histogram": encoded} for name, operation, sample_type, unit, value, encoded in cursor)
 
 
 def race_store(config):
@@ -817,9 +1568,13 @@ def race_store(config):
     :param config: Config object. Mandatory.
     :return: A race store implementation.
     """
-    if config.opts("reporting", "datastore.type") == "elasticsearch":
+    data_store_type = config.opts("reporting", "datastore.type")
+    if data_store_type == "elasticsearch":
         logger.info("Creating ES race store")
         return EsRaceStore(config)
+    elif data_store_type == "sqlite":
+        logger.info("Creating SQLite race store")
+        return SqliteRaceStore(config)
     else:
         logger.info("Creating in-memory race store")
         return InMemoryRaceStore(config)
@@ -838,6 +1593,35 @@ def list_races(cfg):
         console.println("No recent races found.")
 
 
+def race_doc(config, t):
+    """
+    :param config: Config object. Mandatory.
+    :param t: The track of the current race.
+    :return: A dict describing the current race as it is stored by race stores.
+    """
+    selected_challenge = {}
+    for challenge in t.challenges:
+        if challenge.name == config.opts("benchmarks", "challenge"):
+            selected_challenge["name"] = challenge.name
+            selected_challenge["operations"] = []
+            for tasks in challenge.schedule:
+                for task in tasks:
+                    selected_challenge["operations"].append(task.operation.name)
+    return {
+        "environment": config.opts("system", "env.name"),
+        "trial-timestamp": time.to_iso8601(config.opts("meta", "time.start")),
+        "pipeline": config.opts("system", "pipeline"),
+        "revision": config.opts("source", "revision"),
+        "distribution-version": config.opts("source", "distribution.version"),
+        "laps": config.opts("benchmarks", "laps"),
+        "track": t.name,
+        "selected-challenge": selected_challenge,
+        "car": config.opts("benchmarks", "car"),
+        "target-hosts": ["%s:%s" % (i["host"], i["port"]) for i in config.opts("launcher", "external.target.hosts")],
+        "user-tag": config.opts("system", "user.tag")
+    }
+
+
 class InMemoryRaceStore:
     def __init__(self, config):
         self.config = config
@@ -873,32 +1657,8 @@ class EsRaceStore:
     def store_race(self, t):
         # always update the mapping to the latest version
         self.client.put_template("rally", self.index_template_provider.template())
-
         trial_timestamp = self.config.opts("meta", "time.start")
-        laps = self.config.opts("benchmarks", "laps")
-
-        selected_challenge = {}
-        for challenge in t.challenges:
-            if challenge.name == self.config.opts("benchmarks", "challenge"):
-                selected_challenge["name"] = challenge.name
-                selected_challenge["operations"] = []
-                for tasks in challenge.schedule:
-                    for task in tasks:
-                        selected_challenge["operations"].append(task.operation.name)
-        doc = {
-            "environment": self.environment_name,
-            "trial-timestamp": time.to_iso8601(trial_timestamp),
-            "pipeline": self.config.opts("system", "pipeline"),
-            "revision": self.config.opts("source", "revision"),
-            "distribution-version": self.config.opts("source", "distribution.version"),
-            "laps": laps,
-            "track": t.name,
-            "selected-challenge": selected_challenge,
-            "car": self.config.opts("benchmarks", "car"),
-            "target-hosts": ["%s:%s" % (i["host"], i["port"]) for i in self.config.opts("launcher", "external.target.hosts")],
-            "user-tag": self.config.opts("system", "user.tag")
-        }
-        self.client.index(index_name(trial_timestamp), EsRaceStore.RACE_DOC_TYPE, doc)
+        self.client.index(index_name(trial_timestamp), EsRaceStore.RACE_DOC_TYPE, race_doc(self.config, t))
 
     def list(self):
         filters = [{
@@ -954,6 +1714,43 @@ class EsRaceStore:
             return None
 
 
+class SqliteRaceStore:
+    """
+    A race store that is backed by a local SQLite database (see ``sqlite_connection()``).
+    """
+
+    def __init__(self, config, connection=None):
+        """
+        Creates a new race store.
+
+        :param config: The config object. Mandatory.
+        :param connection: This parameter is optional and needed for testing.
+        """
+        self.config = config
+        self.environment_name = config.opts("system", "env.name")
+        self.connection = connection if connection else sqlite_connection(config)
+
+    def store_race(self, t):
+        doc = race_doc(self.config, t)
+        with self.connection:
+            self.connection.execute("INSERT INTO races (environment, trial_timestamp, doc) VALUES (?, ?, ?)",
+                                    (doc["environment"], doc["trial-timestamp"], json.dumps(doc)))
+
+    def list(self):
+        cursor = self.connection.execute("SELECT doc FROM races WHERE environment = ? ORDER BY trial_timestamp DESC LIMIT ?",
+                                         (self.environment_name, int(self.config.opts("system", "list.races.max_results"))))
+        return [Race(json.loads(doc)) for doc, in cursor]
+
+    def find_by_timestamp(self, timestamp):
+        cursor = self.connection.execute("SELECT doc FROM races WHERE environment = ? AND trial_timestamp = ?",
+                                         (self.environment_name, timestamp))
+        docs = cursor.fetchall()
+        if len(docs) == 1:
+            return Race(json.loads(docs[0][0]))
+        else:
+            return None
+
+
 class Race:
     def __init__(self, source):
         self.environment = source["environment"]
@@ -68,6 +68,12 @@ class Benchmark:
         self.mechanic.on_benchmark_start()
         result = self.actor_system.ask(main_driver,
                                        driver.StartBenchmark(self.cfg, self.track, self.metrics_store.meta_info, self.metrics_store.lap))
+        # the driver sends metrics in batches while the benchmark is running
+        while isinstance(result, driver.UpdateMetrics):
+            logger.info("Adding batch of metrics data to metrics store.")
+            self.metrics_store.bulk_add(result.metrics)
+            self.metrics_store.flush()
+            result = self.actor_system.listen()
         if isinstance(result, driver.BenchmarkComplete):
             logger.info("Benchmark is complete.")
             self.mechanic.on_benchmark_stop()
@@ -8,7 +8,7 @@ import time
 
 import pkg_resources
 import thespian.actors
-from esrally import config, paths, racecontrol, reporter, metrics, track, exceptions, PROGRAM_NAME, DOC_LINK
+from esrally import config, paths, racecontrol, reporter, metrics, track, driver, exceptions, PROGRAM_NAME, DOC_LINK
 from esrally.utils import io, convert, git, process, console, net
 from esrally.mechanic import car, telemetry
 
@@ -283,6 +283,11 @@ def parse_args():
             help="define the challenge to use. List possible challenges for tracks with `%s list tracks`"
                  " (default: append-no-conflicts)." % PROGRAM_NAME,
             default="append-no-conflicts")  # optimized for local usage
+        p.add_argument(
+            "--read-compressed-data",
+            help="read documents directly from compressed track data instead of decompressing them first (default: false).",
+            default=False,
+            action="store_true")
         p.add_argument(
             "--car",
             help="define the car to use. List possible cars with `%s list cars` (default: defaults)." % PROGRAM_NAME,
@@ -312,6 +317,27 @@ def parse_args():
             "--report-file",
             help="write the command line report also to the provided file",
             default="")
+        p.add_argument(
+            "--throughput-bucket-interval",
+            type=positive_number,
+            help="define the interval in seconds in which throughput samples are stored (default: 1).",
+            default=1)
+        p.add_argument(
+            "--throughput-series",
+            help="define a comma-separated list of additional throughput series that should be stored. Possible values are 'client' "
+                 "(throughput per client) and 'host' (throughput per load driver host) (default: none).",
+            default="")
+        p.add_argument(
+            "--live-stats-port",
+            help="serve rolling throughput, latency, error rate and active clients of running tasks as JSON via HTTP on this port while "
+                 "the benchmark is running (default: 0, i.e. disabled).",
+            type=int,
+            default=0)
+        p.add_argument(
+            "--live-stats-console",
+            help="show rolling throughput, latency and error rate of running tasks on the console (default: false).",
+            default=False,
+            action="store_true")
         p.add_argument(
             "--quiet",
             help="suppress as much as output as possible (default: false).",
@@ -322,6 +348,33 @@ def parse_args():
             type=positive_number,
             help="number of laps that the benchmark should run (default: 1).",
             default=1)
+        p.add_argument(
+            "--load-driver-engine",
+            help="define how Rally's load generator runs its clients: 'thread' runs each client in a dedicated process, 'async' runs "
+                 "clients as coroutines in a pool of processes (default: thread).",
+            choices=["thread", "async"],
+            default="thread")
+        p.add_argument(
+            "--load-driver-hosts",
+            help="define a comma-separated list of hosts which should generate load (default: localhost). All hosts except localhost "
+                 "need to run %sd." % PROGRAM_NAME,
+            default="localhost")
+        p.add_argument(
+            "--load-driver-processes",
+            type=positive_number,
+            help="define the number of load generator processes for the 'async' load driver engine "
+                 "(default: number of physical CPU cores).",
+            default=None)
+        p.add_argument(
+            "--load-driver-cpu-affinity",
+            help="pin each load generator process to a dedicated CPU core (default: false).",
+            default=False,
+            action="store_true")
+        p.add_argument(
+            "--param-prefetch-size",
+            type=positive_number,
+            help="prepare up to this many requests per client ahead of time on a background thread (default: disabled).",
+            default=None)
         # undocumented for the time being...
         p.add_argument(
             "--test-mode",
@@ -530,8 +583,11 @@ def convert_hosts(configured_host_list):
         raise exceptions.SystemSetupError(msg)
 
 
-def bootstrap_actor_system(cfg, system_base="multiprocTCPBase"):
+def bootstrap_actor_system(cfg, system_base="multiprocTCPBase", try_join=False):
     try:
+        if try_join:
+            # join the actor system that has been started by esrallyd so we can reach load drivers on other machines
+            return thespian.actors.ActorSystem(system_base)
         return thespian.actors.ActorSystem(system_base, logDefs=configure_actor_logging(cfg))
     except thespian.actors.ActorSystemException:
         logger.exception("Could not initialize internal actor system. Terminating.")
@@ -575,8 +631,16 @@ def main():
     cfg.add(config.Scope.applicationOverride, "benchmarks", "track", args.track)
     cfg.add(config.Scope.applicationOverride, "benchmarks", "challenge", args.challenge)
     cfg.add(config.Scope.applicationOverride, "benchmarks", "car", args.car)
+    cfg.add(config.Scope.applicationOverride, "benchmarks", "read.compressed.data", args.read_compressed_data)
     cfg.add(config.Scope.applicationOverride, "benchmarks", "cluster.health", args.cluster_health)
     cfg.add(config.Scope.applicationOverride, "benchmarks", "laps", args.laps)
+    cfg.add(config.Scope.applicationOverride, "driver", "engine", args.load_driver_engine)
+    cfg.add(config.Scope.applicationOverride, "driver", "load_driver_hosts", csv_to_list(args.load_driver_hosts))
+    if args.load_driver_processes is not None:
+        cfg.add(config.Scope.applicationOverride, "driver", "worker.processes", args.load_driver_processes)
+    cfg.add(config.Scope.applicationOverride, "driver", "cpu.affinity", args.load_driver_cpu_affinity)
+    if args.param_prefetch_size is not None:
+        cfg.add(config.Scope.applicationOverride, "driver", "params.prefetch.size", args.param_prefetch_size)
     cfg.add(config.Scope.applicationOverride, "benchmarks", "test.mode", args.test_mode)
     cfg.add(config.Scope.applicationOverride, "provisioning", "datapaths", csv_to_list(args.data_paths))
     cfg.add(config.Scope.applicationOverride, "provisioning", "install.preserve", convert.to_bool(args.preserve_install))
@@ -584,6 +648,10 @@ def main():
     cfg.add(config.Scope.applicationOverride, "launcher", "client.options", kv_to_map(csv_to_list(args.client_options)))
     cfg.add(config.Scope.applicationOverride, "report", "reportformat", args.report_format)
     cfg.add(config.Scope.applicationOverride, "report", "reportfile", args.report_file)
+    cfg.add(config.Scope.applicationOverride, "reporting", "throughput.bucket.interval", args.throughput_bucket_interval)
+    cfg.add(config.Scope.applicationOverride, "reporting", "throughput.series", csv_to_list(args.throughput_series))
+    cfg.add(config.Scope.applicationOverride, "reporting", "live.stats.port", args.live_stats_port)
+    cfg.add(config.Scope.applicationOverride, "reporting", "live.stats.console", args.live_stats_console)
     if args.override_src_dir is not None:
         cfg.add(config.Scope.applicationOverride, "source", "local.src.dir", args.override_src_dir)
 
@@ -614,8 +682,10 @@ def main():
     except BaseException:
         logger.exception("Could not terminate potentially running Rally instances correctly. Attempting to go on anyway.")
 
+    # if we use remote load drivers, esrallyd manages the actor system's lifecycle
+    distributed = not all(driver.is_local_load_driver(host) for host in cfg.opts("driver", "load_driver_hosts"))
     try:
-        actors = bootstrap_actor_system(cfg)
+        actors = bootstrap_actor_system(cfg, try_join=distributed)
     except RuntimeError as e:
         logger.exception("Could not bootstrap actor system.")
         if str(e) == "Unable to determine valid external socket address.":
@@ -628,7 +698,7 @@ def main():
     try:
         success = dispatch_sub_command(cfg, sub_command)
     finally:
-        shutdown_complete = False
+        shutdown_complete = distributed
         times_interrupted = 0
         while not shutdown_complete and times_interrupted < 2:
             try:
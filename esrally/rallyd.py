@@ -0,0 +1,90 @@
+import argparse
+import logging
+import sys
+
+import thespian.actors
+from esrally import PROGRAM_NAME
+from esrally.utils import console
+
+logger = logging.getLogger("rally.daemon")
+
+DEFAULT_ADMIN_PORT = 1900
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="%sd" % PROGRAM_NAME,
+                                     description="Starts or stops the actor system that is needed to run Rally's load generators on "
+                                                 "multiple machines.")
+    subparsers = parser.add_subparsers(title="subcommands", dest="subcommand", help="")
+
+    start_parser = subparsers.add_parser("start", help="Starts the actor system on this machine and joins the coordinator's actor system.")
+    start_parser.add_argument(
+        "--node-ip",
+        help="the IP address of this machine as it should be referenced in --load-driver-hosts.",
+        required=True)
+    start_parser.add_argument(
+        "--coordinator-ip",
+        help="the IP address of the machine on which %s is invoked." % PROGRAM_NAME,
+        required=True)
+    start_parser.add_argument(
+        "--coordinator-port",
+        type=int,
+        help="the admin port of the actor system on the coordinator machine (default: %d)." % DEFAULT_ADMIN_PORT,
+        default=DEFAULT_ADMIN_PORT)
+
+    stop_parser = subparsers.add_parser("stop", help="Stops the actor system on this machine.")
+
+    for p in [start_parser, stop_parser]:
+        # This option is intended to run multiple actor systems on one machine (e.g. on different loopback addresses for testing)
+        p.add_argument(
+            "--admin-port",
+            type=int,
+            help=argparse.SUPPRESS,
+            default=DEFAULT_ADMIN_PORT)
+
+    return parser.parse_args()
+
+
+def capabilities(node_ip, coordinator_ip, coordinator_port=DEFAULT_ADMIN_PORT, admin_port=DEFAULT_ADMIN_PORT):
+    """
+    :return: The actor system capabilities of a load driver host.
+    """
+    caps = {
+        # load generators and track preparators check this capability to run on the correct host
+        "ip": node_ip,
+        "Admin Port": admin_port,
+        "Convention Address.IPv4": "%s:%d" % (coordinator_ip, coordinator_port)
+    }
+    if node_ip == coordinator_ip and admin_port == coordinator_port:
+        caps["coordinator"] = True
+    return caps
+
+
+def start(args):
+    caps = capabilities(args.node_ip, args.coordinator_ip, args.coordinator_port, args.admin_port)
+    logger.info("Starting actor system with capabilities [%s]." % caps)
+    thespian.actors.ActorSystem("multiprocTCPBase", capabilities=caps)
+    console.info("Started actor system on [%s] (coordinator: [%s])." % (args.node_ip, args.coordinator_ip))
+
+
+def stop(args):
+    logger.info("Stopping actor system on admin port [%d]." % args.admin_port)
+    thespian.actors.ActorSystem("multiprocTCPBase", capabilities={"Admin Port": args.admin_port}).shutdown()
+    console.info("Stopped actor system.")
+
+
+def main():
+    console.init()
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    if args.subcommand == "start":
+        start(args)
+    elif args.subcommand == "stop":
+        stop(args)
+    else:
+        console.error("Please specify one of the subcommands 'start' or 'stop'.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
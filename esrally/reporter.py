@@ -36,7 +36,8 @@ def print_header(message):
 
 class Stats:
     def __init__(self, store, challenge, lap=None):
-        self.store = store
+        # retrieve everything that is needed for the report at once instead of querying the metrics store per metric
+        self.summary = store.get_summary(lap=lap)
         self.op_metrics = collections.OrderedDict()
         self.lap = lap
         for tasks in challenge.schedule:
@@ -81,19 +82,15 @@ class Stats:
         self.segment_count = int(median_segment_count) if median_segment_count is not None else median_segment_count
 
     def sum(self, metric_name):
-        values = self.store.get(metric_name, lap=self.lap)
-        if values:
-            return sum(values)
-        else:
-            return None
+        return self.summary.get_sum(metric_name)
 
     def one(self, metric_name):
-        return self.store.get_one(metric_name, lap=self.lap)
+        return self.summary.get_one(metric_name)
 
     def summary_stats(self, metric_name, operation_name):
-        median = self.store.get_median(metric_name, operation=operation_name, sample_type=metrics.SampleType.Normal, lap=self.lap)
-        unit = self.store.get_unit(metric_name, operation=operation_name)
-        stats = self.store.get_stats(metric_name, operation=operation_name, sample_type=metrics.SampleType.Normal, lap=self.lap)
+        median = self.summary.get_median(metric_name, operation=operation_name, sample_type=metrics.SampleType.Normal)
+        unit = self.summary.get_unit(metric_name, operation=operation_name)
+        stats = self.summary.get_stats(metric_name, operation=operation_name, sample_type=metrics.SampleType.Normal)
         if median and stats:
             return stats["min"], median, stats["max"], unit
         else:
@@ -118,19 +115,17 @@ class Stats:
     def has_disk_usage_stats(self):
         return self.index_size and self.bytes_written
 
-    def median(self, metric_name, operation_name=None, operation_type=None, sample_type=None):
-        return self.store.get_median(metric_name, operation=operation_name, operation_type=operation_type, sample_type=sample_type,
-                                     lap=self.lap)
+    def median(self, metric_name, operation_name=None, sample_type=None):
+        return self.summary.get_median(metric_name, operation=operation_name, sample_type=sample_type)
 
     def single_latency(self, operation, metric_name="latency"):
         sample_type = metrics.SampleType.Normal
-        sample_size = self.store.get_count(metric_name, operation=operation, sample_type=sample_type, lap=self.lap)
+        sample_size = self.summary.get_count(metric_name, operation=operation, sample_type=sample_type)
         if sample_size > 0:
-            return self.store.get_percentiles(metric_name,
-                                              operation=operation,
-                                              sample_type=sample_type,
-                                              percentiles=self.percentiles_for_sample_size(sample_size),
-                                              lap=self.lap)
+            return self.summary.get_percentiles(metric_name,
+                                                operation=operation,
+                                                sample_type=sample_type,
+                                                percentiles=self.percentiles_for_sample_size(sample_size))
         else:
             return {}
 
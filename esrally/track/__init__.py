@@ -1,4 +1,5 @@
-from .loader import list_tracks, load_track, load_track_plugins, prepare_track, operation_parameters
+from .loader import list_tracks, load_track, load_track_plugins, prepare_track, operation_parameters, track_revision, \
+    ensure_track_revision
 
 # expose the complete track API
 from .track import *
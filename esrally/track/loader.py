@@ -1,7 +1,9 @@
+import concurrent.futures
 import importlib.machinery
 import json
 import logging
 import os
+import socket
 import sys
 import urllib.error
 
@@ -77,11 +79,41 @@ def load_track(cfg):
                                           (track_name, PROGRAM_NAME))
 
 
-def load_track_plugins(cfg, register_runner):
+def track_revision(cfg):
+    """
+    :param cfg: The config object.
+    :return: The revision of the track repository that is checked out on this machine or ``None`` if it cannot be determined.
+    """
+    repo = TrackRepository(cfg, fetch=False)
+    try:
+        return git.head_revision(repo.tracks_dir)
+    except IndexError:
+        # e.g. a repository without any commits
+        logger.warning("Could not determine revision of track repository [%s]." % repo.tracks_dir)
+        return None
+
+
+def ensure_track_revision(cfg, revision):
+    """
+    Ensures that the track repository on this machine is at the provided revision. Load drivers on other machines than the coordinator load
+    track plugins from their own track repository so it needs to be the same as on the coordinator.
+
+    :param cfg: The config object.
+    :param revision: The revision of the track repository on the coordinator.
+    """
+    local_revision = track_revision(cfg)
+    if local_revision != revision:
+        raise exceptions.SystemSetupError("The track repository on [%s] is at revision [%s] but the coordinator uses revision [%s]. Please "
+                                          "check out the same revision of the track repository on all load driver hosts." %
+                                          (socket.gethostname(), local_revision, revision))
+    logger.info("Track repository is at revision [%s] as on the coordinator." % revision)
+
+
+def load_track_plugins(cfg, register_runner, register_scheduler=None):
     track_name = cfg.opts("benchmarks", "track")
-    # TODO #71: If we distribute drivers we need to ensure that the correct branch in the track repo is checked out
+    # the track repository has the same revision on all load driver hosts (see ``ensure_track_revision``)
     repo = TrackRepository(cfg, fetch=False)
-    plugin_reader = TrackPluginReader(register_runner)
+    plugin_reader = TrackPluginReader(register_runner, register_scheduler)
 
     track_plugin_path = repo.track_dir(track_name)
     if plugin_reader.can_load(track_plugin_path):
@@ -149,44 +181,71 @@ def prepare_track(track, cfg):
 
         return True
 
-    def decompress(data_set_path, expected_size_in_bytes):
+    def decompress(data_set_path, expected_size_in_bytes, offset_table_stride):
         # we assume that track data are always compressed and try to decompress them before running the benchmark
         basename, extension = io.splitext(data_set_path)
-        decompressed = False
         if not os.path.isfile(basename) or os.path.getsize(basename) != expected_size_in_bytes:
-            decompressed = True
-            if type.uncompressed_size_in_bytes:
-                console.info("Decompressing track data from [%s] to [%s] (resulting size: %.2f GB) ... " %
-                             (data_set_path, basename, convert.bytes_to_gb(type.uncompressed_size_in_bytes)),
-                             end='', flush=True, logger=logger)
+            if expected_size_in_bytes:
+                console.info("Decompressing track data from [%s] to [%s] (resulting size: %.2f GB)." %
+                             (data_set_path, basename, convert.bytes_to_gb(expected_size_in_bytes)), logger=logger)
             else:
-                console.info("Decompressing track data from [%s] to [%s] ... " % (data_set_path, basename), end='',
-                             flush=True, logger=logger)
+                console.info("Decompressing track data from [%s] to [%s]." % (data_set_path, basename), logger=logger)
 
-            io.decompress(data_set_path, io.dirname(data_set_path))
-            console.println("[OK]")
+            if extension in [".bz2", ".gz"]:
+                # this also builds the file offset table in the same pass
+                io.decompress_and_index(data_set_path, stride=offset_table_stride)
+            else:
+                io.decompress(data_set_path, io.dirname(data_set_path))
             extracted_bytes = os.path.getsize(basename)
             if expected_size_in_bytes is not None and extracted_bytes != expected_size_in_bytes:
                 raise exceptions.DataError("[%s] is corrupt. Extracted [%d] bytes but [%d] bytes are expected." %
                                            (basename, extracted_bytes, expected_size_in_bytes))
-        return basename, decompressed
+        # this is a no-op if the file offset table is still valid
+        io.prepare_file_offset_table(basename, stride=offset_table_stride)
+        return basename
+
+    def index_archive(data_set_path, expected_size_in_bytes, offset_table_stride):
+        # documents are read directly from the archive so we only need to know where its compressed blocks start
+        console.info("Indexing compressed track data in [%s]." % data_set_path, logger=logger)
+        uncompressed_bytes = io.prepare_block_index(data_set_path, stride=offset_table_stride)
+        if expected_size_in_bytes is not None and uncompressed_bytes != expected_size_in_bytes:
+            raise exceptions.DataError("[%s] is corrupt. It contains [%d] uncompressed bytes but [%d] bytes are expected." %
+                                       (data_set_path, uncompressed_bytes, expected_size_in_bytes))
+        return data_set_path
+
+    def prepare_data(data_set_path, expected_size_in_bytes, offset_table_stride):
+        if read_compressed and io.splitext(data_set_path)[1] in [".bz2", ".gz"]:
+            return index_archive(data_set_path, expected_size_in_bytes, offset_table_stride)
+        else:
+            return decompress(data_set_path, expected_size_in_bytes, offset_table_stride)
 
     if not track.source_root_url:
         logger.info("Track [%s] does not specify a source root URL. Assuming data are available locally." % track.name)
 
+    offset_table_stride = int(cfg.opts("benchmarks", "offset.table.stride", mandatory=False,
+                                       default_value=io.DEFAULT_OFFSET_TABLE_STRIDE))
+    read_compressed = cfg.opts("benchmarks", "read.compressed.data", mandatory=False, default_value=False)
+
+    # key: path to the archive, value: expected uncompressed size in bytes
+    archives = {}
     for index in track.indices:
         for type in index.types:
             if type.document_archive:
                 if track.source_root_url:
                     data_url = "%s/%s" % (track.source_root_url, os.path.basename(type.document_archive))
                     download(cfg, data_url, type.document_archive, type.compressed_size_in_bytes)
-                decompressed_file_path, was_decompressed = decompress(type.document_archive, type.uncompressed_size_in_bytes)
-                # just rebuild the file every time for the time being. Later on, we might check the data file fingerprint to avoid it
-                io.prepare_file_offset_table(decompressed_file_path)
+                archives[type.document_archive] = type.uncompressed_size_in_bytes
             else:
                 logger.info("Type [%s] in index [%s] does not define a document archive. No data are indexed from a file for this type." %
                             (type.name, index.name))
 
+    if archives:
+        # decompression is CPU bound but the decompressors release the GIL (or run in a separate process) so threads are sufficient
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(archives), os.cpu_count() or 1)) as pool:
+            decompressions = [pool.submit(prepare_data, path, size, offset_table_stride) for path, size in archives.items()]
+            for decompression in decompressions:
+                decompression.result()
+
 
 class TrackRepository:
     """
@@ -345,8 +404,9 @@ class TrackPluginReader:
     """
     Loads track plugins
     """
-    def __init__(self, runner_registry):
+    def __init__(self, runner_registry, scheduler_registry=None):
         self.runner_registry = runner_registry
+        self.scheduler_registry = scheduler_registry
 
     def _modules(self, plugins_dirs, plugin_name, plugin_root_path):
         for path in plugins_dirs:
@@ -397,6 +457,10 @@ class TrackPluginReader:
     def register_runner(self, name, runner):
         self.runner_registry(name, runner)
 
+    def register_scheduler(self, name, scheduler):
+        if self.scheduler_registry:
+            self.scheduler_registry(name, scheduler)
+
 
 class TrackSpecificationReader:
     """
@@ -559,13 +623,29 @@ class TrackSpecificationReader:
                           warmup_time_period=self._r(task_spec, "warmup-time-period", error_ctx=op_name, mandatory=False),
                           time_period=self._r(task_spec, "time-period", error_ctx=op_name, mandatory=False),
                           clients=self._r(task_spec, "clients", error_ctx=op_name, mandatory=False, default_value=1),
-                          target_throughput=self._r(task_spec, "target-throughput", error_ctx=op_name, mandatory=False))
+                          target_throughput=self._r(task_spec, "target-throughput", error_ctx=op_name, mandatory=False),
+                          schedule=self._r(task_spec, "schedule", error_ctx=op_name, mandatory=False, default_value="deterministic"),
+                          throughput_search=self._r(task_spec, "throughput-search", error_ctx=op_name, mandatory=False),
+                          load_profile=self._r(task_spec, "load-profile", error_ctx=op_name, mandatory=False))
         if task.warmup_iterations != default_warmup_iterations and task.time_period is not None:
             self._error("Operation '%s' in challenge '%s' mixes warmup iterations with time periods. Please do not mix time periods and "
                         "iterations." % (op_name, challenge_name))
         elif task.warmup_time_period is not None and task.iterations != default_iterations:
             self._error("Operation '%s' in challenge '%s' mixes warmup time period with iterations. Please do not mix time periods and "
                         "iterations." % (op_name, challenge_name))
+        elif task.throughput_search is not None and task.target_throughput is not None:
+            self._error("Operation '%s' in challenge '%s' defines a target throughput and a throughput search. Please define only one of "
+                        "them." % (op_name, challenge_name))
+        elif task.throughput_search is not None and task.clients > 1:
+            # clients would search independently and influence each other's latency so their results would not add up to a capacity
+            self._error("Operation '%s' in challenge '%s' defines a throughput search with [%d] clients. A throughput search is only "
+                        "supported with one client." % (op_name, challenge_name, task.clients))
+        elif task.load_profile is not None and task.target_throughput is None:
+            self._error("Operation '%s' in challenge '%s' defines a load profile but no target throughput. Please define a "
+                        "'target-throughput' for this operation." % (op_name, challenge_name))
+        elif task.schedule != "deterministic" and task.target_throughput is None and task.throughput_search is None:
+            self._error("Operation '%s' in challenge '%s' defines a '%s' schedule but no target throughput. Please define a "
+                        "'target-throughput' for this operation." % (op_name, challenge_name, task.schedule))
 
         return task
 
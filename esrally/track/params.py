@@ -1,5 +1,18 @@
+import array
+import bisect
+import calendar
+import collections
+import concurrent.futures
+import datetime
+import hashlib
+import itertools
+import json
 import logging
+import mmap
+import os
 import random
+import struct
+import threading
 import time
 import types
 from enum import Enum
@@ -88,9 +101,11 @@ class ParamSource:
         * It can run until the parameter source is exhausted.
 
         In the former case, return just 1. In the latter case, you should determine the number of times that `#params()` will be invoked.
-        With that number, Rally can show the progress made so far to the user.
+        With that number, Rally can show the progress made so far to the user. If this number cannot be determined cheaply upfront, return
+        `None` instead. Rally then invokes `#params()` until it raises `StopIteration` and reads the progress from the property
+        `percent_completed` (a number in the range [0, 1]).
 
-        :return:  The "size" of this parameter source.
+        :return:  The "size" of this parameter source or `None` if it is unknown.
         """
         return 1
 
@@ -111,6 +126,119 @@ class DelegatingParamSource(ParamSource):
         return self.delegate(self.indices, self._params)
 
 
+class PrefetchingParamSource(ParamSource):
+    """
+    Wraps the parameter source of a client and produces its parameters ahead of time into a bounded buffer. Thus, expensive parameter
+    preparation (e.g. reading and formatting bulk bodies) does not happen between two timed requests.
+
+    Parameters are produced by a small pool of producer threads that is shared by all prefetching parameter sources of a process (see
+    ``PRODUCER_THREADS``). A producer refills the buffer of one parameter source at a time until it is full.
+
+    ``underruns`` counts how often the buffer has been empty when parameters were requested, i.e. how often the client had to wait for
+    parameter preparation. The first call is not considered an underrun as the buffer starts empty.
+    """
+
+    # the number of producer threads per process
+    PRODUCER_THREADS = 4
+
+    _producers = None
+    _producers_pid = None
+    _producers_lock = threading.Lock()
+
+    @classmethod
+    def producers(cls):
+        with cls._producers_lock:
+            # threads do not survive a fork so a forked process needs its own producers
+            if cls._producers is None or cls._producers_pid != os.getpid():
+                cls._producers = concurrent.futures.ThreadPoolExecutor(max_workers=cls.PRODUCER_THREADS)
+                cls._producers_pid = os.getpid()
+            return cls._producers
+
+    def __init__(self, delegate, buffer_size):
+        """
+        :param delegate: The (partitioned) parameter source of a client. It must not be accessed by anyone else afterwards.
+        :param buffer_size: The maximum number of parameters that are produced ahead of time.
+        """
+        # parameter sources of track plugins do not necessarily inherit from ParamSource
+        super().__init__(getattr(delegate, "indices", None), {})
+        self.delegate = delegate
+        # determined upfront as the delegate must not be accessed concurrently to a producer
+        size = getattr(delegate, "size", None)
+        self._defines_size = size is not None
+        self._size = size() if size is not None else None
+        self.buffer_size = buffer_size
+        self.buffer = collections.deque()
+        self.available = threading.Condition()
+        self.filling = False
+        self.exhausted = False
+        self.stopped = False
+        self.underruns = 0
+        self.calls = 0
+        self.error = None
+        with self.available:
+            self._request_fill()
+
+    def _request_fill(self):
+        # must be called while holding the lock of ``available``
+        if not self.filling and not self.exhausted and not self.stopped and len(self.buffer) < self.buffer_size:
+            self.filling = True
+            PrefetchingParamSource.producers().submit(self._fill)
+
+    def _fill(self):
+        while True:
+            with self.available:
+                if self.exhausted or self.stopped or len(self.buffer) >= self.buffer_size:
+                    self.filling = False
+                    return
+            # noinspection PyBroadException
+            try:
+                item = (self.delegate.params(), None)
+            except BaseException as e:
+                # also propagates StopIteration when the parameter source is exhausted
+                item = (None, e)
+            with self.available:
+                self.buffer.append(item)
+                self.exhausted = item[1] is not None
+                self.available.notify()
+
+    def partition(self, partition_index, total_partitions):
+        raise exceptions.RallyError("Cannot partition a PrefetchingParamSource")
+
+    def size(self):
+        if not self._defines_size:
+            raise exceptions.RallyAssertionError("Parameter source [%s] does not define its size." % self.delegate)
+        return self._size
+
+    @property
+    def percent_completed(self):
+        # only a progress estimate as it also considers parameters that have been produced but not consumed yet
+        return self.delegate.percent_completed
+
+    def params(self):
+        if self.error is not None:
+            raise self.error
+        with self.available:
+            self.calls += 1
+            if not self.buffer and self.calls > 1:
+                self.underruns += 1
+            while not self.buffer:
+                self.available.wait()
+            p, error = self.buffer.popleft()
+            self._request_fill()
+        if error is not None:
+            self.error = error
+            raise error
+        return p
+
+    def close(self):
+        """
+        Stops producing parameters. Parameters that have been produced but not consumed are discarded.
+        """
+        with self.available:
+            self.stopped = True
+            self.buffer.clear()
+
+
 class SearchParamSource(ParamSource):
     def __init__(self, indices, params):
         super().__init__(indices, params)
@@ -196,6 +324,30 @@ class BulkIndexParamSource(ParamSource):
             raise exceptions.InvalidSyntax("Cannot generate id conflicts [%s] when 'action-and-meta-data' is [%s]." %
                                            (id_conflicts, action_metadata))
 
+        self.bulk_cache = params.get("bulk-cache", False)
+        if self.bulk_cache and self.id_conflicts != IndexIdConflict.NoConflicts:
+            raise exceptions.InvalidSyntax("Cannot use a bulk cache when simulating id conflicts [%s]." % id_conflicts)
+
+        reader = params.get("reader", "file")
+        if reader not in ["file", "mmap"]:
+            raise exceptions.InvalidSyntax("Unknown 'reader' setting [%s]" % reader)
+        self.memory_mapped = reader == "mmap"
+        if self.memory_mapped and self.bulk_cache:
+            raise exceptions.InvalidSyntax("Cannot use a bulk cache together with the 'mmap' reader.")
+
+        partitioning = params.get("partitioning", "lines")
+        if partitioning not in ["lines", "bytes"]:
+            raise exceptions.InvalidSyntax("Unknown 'partitioning' setting [%s]" % partitioning)
+        self.byte_ranges = partitioning == "bytes"
+        if self.byte_ranges:
+            # with byte ranges, clients do not know the number of the first document in their partition
+            if self.action_metadata == ActionMetaData.SourceFile:
+                raise exceptions.InvalidSyntax("Cannot partition by bytes when 'action-and-meta-data' is [%s]." % action_metadata)
+            if self.id_conflicts != IndexIdConflict.NoConflicts:
+                raise exceptions.InvalidSyntax("Cannot partition by bytes when simulating id conflicts [%s]." % id_conflicts)
+            if self.bulk_cache:
+                raise exceptions.InvalidSyntax("Cannot use a bulk cache when partitioning by bytes.")
+
         self.pipeline = params.get("pipeline", None)
         try:
             self.bulk_size = int(params["bulk-size"])
@@ -219,7 +371,8 @@ class BulkIndexParamSource(ParamSource):
 
     def partition(self, partition_index, total_partitions):
         return PartitionBulkIndexParamSource(self.indices, partition_index, total_partitions, self.action_metadata,
-                                             self.batch_size, self.bulk_size, self.id_conflicts, self.pipeline)
+                                             self.batch_size, self.bulk_size, self.id_conflicts, self.pipeline, self.bulk_cache,
+                                             self.memory_mapped, self.byte_ranges)
 
     def params(self):
         raise exceptions.RallyError("Do not use a BulkIndexParamSource without partitioning")
@@ -230,7 +383,7 @@ class BulkIndexParamSource(ParamSource):
 
 class PartitionBulkIndexParamSource(ParamSource):
     def __init__(self, indices, partition_index, total_partitions, action_metadata, batch_size, bulk_size, id_conflicts=None,
-                 pipeline=None):
+                 pipeline=None, bulk_cache=False, memory_mapped=False, byte_ranges=False):
         """
 
         :param indices: Specification of affected indices.
@@ -241,6 +394,9 @@ class PartitionBulkIndexParamSource(ParamSource):
         :param bulk_size: The size of bulk index operations (number of documents per bulk).
         :param id_conflicts: The type of id conflicts.
         :param pipeline: The name of the ingest pipeline to run.
+        :param bulk_cache: True iff bulk bodies should be read from (or written to) a bulk cache file as ready-to-send bytes.
+        :param memory_mapped: True iff bulk bodies should be read directly from a memory-mapped data file.
+        :param byte_ranges: True iff the data file should be split between clients by byte ranges instead of by number of documents.
         """
         super().__init__(indices, {})
         self.partition_index = partition_index
@@ -250,8 +406,27 @@ class PartitionBulkIndexParamSource(ParamSource):
         self.id_conflicts = id_conflicts
         self.pipeline = pipeline
         self.action_metadata = action_metadata
+        self.bulk_cache = bulk_cache
+        self.memory_mapped = memory_mapped
+        self.byte_ranges = byte_ranges
+        self.bulks = None
+        # the readers of all byte ranges along with the size of their range in bytes
+        self.byte_range_readers = []
+        if byte_ranges:
+            create_byte_range_reader_for = create_byte_range_mmap_reader if memory_mapped else create_byte_range_reader
+
+            def create_reader(index, type, start, end, *args):
+                reader = create_byte_range_reader_for(index, type, start, end, *args)
+                self.byte_range_readers.append((reader, end - start))
+                return reader
+        elif bulk_cache:
+            create_reader = create_cached_reader
+        elif memory_mapped:
+            create_reader = create_mmap_reader
+        else:
+            create_reader = create_default_reader
         self.internal_params = bulk_data_based(total_partitions, partition_index, indices, action_metadata, batch_size,
-                                               bulk_size, id_conflicts, pipeline)
+                                               bulk_size, id_conflicts, pipeline, create_reader=create_reader, byte_ranges=byte_ranges)
 
     def partition(self, partition_index, total_partitions):
         raise exceptions.RallyError("Cannot partition a PartitionBulkIndexParamSource further")
@@ -260,12 +435,26 @@ class PartitionBulkIndexParamSource(ParamSource):
         return next(self.internal_params)
 
     def size(self):
-        return self.number_of_bulks()
+        # counting the documents in a byte range would require to read all of it before the first bulk request
+        return None if self.byte_ranges else self.number_of_bulks()
+
+    @property
+    def percent_completed(self):
+        """
+        :return: The share of bytes that have been read from the client's byte ranges. Only supported when partitioning by bytes.
+        """
+        # readers are created when the first bulk is requested
+        total_bytes = sum(size for _, size in self.byte_range_readers)
+        if total_bytes == 0:
+            return 0.0
+        return min(sum(reader.bytes_read for reader, _ in self.byte_range_readers) / total_bytes, 1.0)
 
     def number_of_bulks(self):
         """
         :return: The number of bulk operations that the given client will issue.
         """
+        if self.bulks is not None:
+            return self.bulks
         bulks = 0
         for index in self.indices:
             for type in index.types:
@@ -274,21 +463,96 @@ class PartitionBulkIndexParamSource(ParamSource):
                 bulks += complete_bulks
                 if rest > 0:
                     bulks += 1
+        self.bulks = bulks
         return bulks
 
 
-def build_conflicting_ids(conflicts, docs_to_index, offset, rand=random.randint):
+def build_conflicting_ids(conflicts, docs_to_index, offset, rand=None):
+    """
+    :param conflicts: The type of id conflicts.
+    :param docs_to_index: The number of documents that the client will index.
+    :param offset: The id of the first document of the client.
+    :param rand: A function that returns a random integer in a closed interval (like ``random.randint``). It is only used for random
+                 conflicts. If it is provided, all random ids are drawn upfront. By default, random ids are derived on demand.
+    :return: A sequence of document ids (formatted as ``"%10d"``) or ``None`` if there are no id conflicts.
+    """
     if conflicts is None or conflicts == IndexIdConflict.NoConflicts:
         return None
     logger.info("building ids with id conflicts of type [%s]" % conflicts)
-    all_ids = [0] * docs_to_index
-    for i in range(docs_to_index):
-        # always consider the offset as each client will index its own range and we don't want uncontrolled conflicts across clients
-        if conflicts == IndexIdConflict.SequentialConflicts:
-            all_ids[i] = "%10d" % (offset + i)
-        else:  # RandomConflicts
-            all_ids[i] = "%10d" % rand(offset, offset + docs_to_index)
-    return all_ids
+    return ConflictingIds(conflicts, docs_to_index, offset, rand)
+
+
+class ConflictingIds:
+    """
+    An immutable sequence of document ids for bulk indexing with id conflicts. Ids are only formatted when they are accessed so the
+    sequence needs (almost) no memory for sequential conflicts and for random conflicts based on the default random number generator. Ids
+    that are drawn with a custom random function are stored compactly in an array.
+
+    Each client considers its offset as it indexes its own range and we don't want uncontrolled conflicts across clients.
+    """
+
+    _MASK = (1 << 64) - 1
+
+    def __init__(self, conflicts, docs_to_index, offset, rand=None):
+        self.conflicts = conflicts
+        self.docs_to_index = docs_to_index
+        self.offset = offset
+        self.seed = None
+        self.ids = None
+        if conflicts == IndexIdConflict.RandomConflicts:
+            if rand is None:
+                # every id is derived from this seed and its position so it is stable across repeated accesses
+                self.seed = random.getrandbits(64)
+            else:
+                self.ids = array.array("q", (rand(offset, offset + docs_to_index) for _ in range(docs_to_index)))
+
+    def id_at(self, i):
+        """
+        :param i: A position in the range [0, ``len(self)``).
+        :return: The (numeric) id at this position.
+        """
+        if self.ids is not None:
+            return self.ids[i]
+        elif self.seed is not None:
+            # uniformly distributed in the closed interval [offset, offset + docs_to_index] like random.randint
+            return self.offset + ConflictingIds._mix((self.seed + i) & ConflictingIds._MASK) % (self.docs_to_index + 1)
+        else:
+            return self.offset + i
+
+    @staticmethod
+    def _mix(x):
+        # SplitMix64 finalizer, see http://xorshift.di.unimi.it/splitmix64.c
+        x = (x + 0x9E3779B97F4A7C15) & ConflictingIds._MASK
+        x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & ConflictingIds._MASK
+        x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & ConflictingIds._MASK
+        return x ^ (x >> 31)
+
+    def __len__(self):
+        return self.docs_to_index
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.docs_to_index))]
+        if i < 0:
+            i += self.docs_to_index
+        if not 0 <= i < self.docs_to_index:
+            raise IndexError("id index [%d] out of range" % i)
+        return "%10d" % self.id_at(i)
+
+    def __iter__(self):
+        for i in range(self.docs_to_index):
+            yield "%10d" % self.id_at(i)
+
+    def __eq__(self, other):
+        try:
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        except TypeError:
+            return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self, *args, **kwargs):
+        return "%d ids with conflicts of type [%s] starting at [%d]" % (self.docs_to_index, self.conflicts, self.offset)
 
 
 def chain(*iterables):
@@ -305,8 +569,23 @@ def chain(*iterables):
                 yield element
 
 
+def data_source(type):
+    """
+    :param type: A type with a document file.
+    :return: A tuple of the path to the file that contains the documents of this type and the ``FileSource`` class to read it. Documents are
+             read directly from the compressed archive if it has not been decompressed but a block index exists for it (see
+             ``io.prepare_block_index``).
+    """
+    if type.document_archive and not os.path.isfile(type.document_file) and \
+            os.path.isfile(io.block_index_path(type.document_archive)):
+        return type.document_archive, io.CompressedFileSource
+    else:
+        return type.document_file, io.FileSource
+
+
 def create_default_reader(index, type, offset, num_lines, num_docs, action_metadata, batch_size, bulk_size, id_conflicts):
-    source = Slice(io.FileSource, offset, num_lines)
+    data_file, source_class = data_source(type)
+    source = Slice(source_class, offset, num_lines)
 
     if action_metadata == ActionMetaData.Generate:
         am_handler = GenerateActionMetaData(index, type, build_conflicting_ids(id_conflicts, num_docs, offset))
@@ -317,7 +596,72 @@ def create_default_reader(index, type, offset, num_lines, num_docs, action_metad
     else:
         raise RuntimeError("Missing action-meta-data handler implementation for %s" % action_metadata)
 
-    return IndexDataReader(type.document_file, batch_size, bulk_size, source, am_handler, index, type)
+    return IndexDataReader(data_file, batch_size, bulk_size, source, am_handler, index, type)
+
+
+def create_mmap_reader(index, type, offset, num_lines, num_docs, action_metadata, batch_size, bulk_size, id_conflicts):
+    if data_source(type)[1] is not io.FileSource:
+        raise exceptions.SystemSetupError("Cannot memory-map documents for [%s/%s] as they are only available compressed in [%s]." %
+                                          (index, type, type.document_archive))
+    if action_metadata == ActionMetaData.Generate:
+        am_handler = GenerateActionMetaData(index, type, build_conflicting_ids(id_conflicts, num_docs, offset))
+    else:
+        am_handler = None
+    return MmapIndexDataReader(type.document_file, batch_size, bulk_size, offset, num_lines, action_metadata, am_handler, index, type)
+
+
+def byte_range_data_file(type):
+    """
+    :return: The path to the (uncompressed) data file of the provided type which can be split into byte ranges.
+    """
+    data_file, source_class = data_source(type)
+    if source_class is not io.FileSource:
+        raise exceptions.SystemSetupError("Cannot partition documents for [%s] by bytes as they are only available compressed in [%s]." %
+                                          (type, type.document_archive))
+    return data_file
+
+
+def create_byte_range_reader(index, type, start, end, action_metadata, batch_size, bulk_size):
+    am_handler = GenerateActionMetaData(index, type, None) if action_metadata == ActionMetaData.Generate else NoneActionMetaData()
+    return IndexDataReader(byte_range_data_file(type), batch_size, bulk_size, ByteRangeSlice(io.FileSource, start, end), am_handler, index,
+                           type)
+
+
+def create_byte_range_mmap_reader(index, type, start, end, action_metadata, batch_size, bulk_size):
+    am_handler = GenerateActionMetaData(index, type, None) if action_metadata == ActionMetaData.Generate else None
+    return MmapIndexDataReader(byte_range_data_file(type), batch_size, bulk_size, None, None, action_metadata, am_handler, index, type,
+                               byte_range=(start, end))
+
+
+def create_cached_reader(index, type, offset, num_lines, num_docs, action_metadata, batch_size, bulk_size, id_conflicts):
+    cache_file = bulk_cache_file(data_source(type)[0], index, type, offset, num_lines, action_metadata, bulk_size)
+    if os.path.isfile(cache_file):
+        logger.info("Reading bulks for [%s/%s] from bulk cache [%s]." % (index, type, cache_file))
+        return BulkCacheReader(cache_file, batch_size, bulk_size, index, type)
+    else:
+        logger.info("Bulk cache [%s] for [%s/%s] does not exist yet. Creating it while indexing." % (cache_file, index, type))
+        return BulkCacheWriter(create_default_reader(index, type, offset, num_lines, num_docs, action_metadata, batch_size, bulk_size,
+                                                     id_conflicts), cache_file)
+
+
+def bulk_cache_file(data_file, index, type, offset, num_lines, action_metadata, bulk_size):
+    """
+    Determines the name of the bulk cache file. Bulk bodies are cached per data file, bulk size, action and meta-data line handling and
+    the range of lines that a client reads. The cache is implicitly invalidated when the data file changes.
+
+    :return: The path to the bulk cache file (it does not need to exist).
+    """
+    stat = os.stat(data_file)
+    key = "%s;%s;%d;%d;%s;%d;%d;%d" % (index, type, offset, num_lines, action_metadata.name, bulk_size, stat.st_size, int(stat.st_mtime))
+    return "%s.%s.bulk" % (data_file, hashlib.sha1(key.encode("utf-8")).hexdigest()[:16])
+
+
+def encode_bulk(bulk):
+    """
+    :param bulk: A list of lines for a bulk request.
+    :return: The bulk body as it is sent to Elasticsearch.
+    """
+    return ("\n".join(bulk) + "\n").encode("utf-8")
 
 
 def bounds(total_docs, client_index, num_clients, action_metadata):
@@ -347,7 +691,7 @@ def bounds(total_docs, client_index, num_clients, action_metadata):
 
 
 def bulk_data_based(num_clients, client_index, indices, action_metadata, batch_size, bulk_size, id_conflicts, pipeline,
-                    create_reader=create_default_reader):
+                    create_reader=create_default_reader, byte_ranges=False):
     """
     Calculates the necessary schedule for bulk operations.
 
@@ -361,11 +705,23 @@ def bulk_data_based(num_clients, client_index, indices, action_metadata, batch_s
     :param pipeline: Name of the ingest pipeline to use. May be None.
     :param create_reader: A function to create the index reader. By default a file based index reader will be created. This parameter is
                           intended for testing only.
+    :param byte_ranges: True iff the data file should be split between clients by byte ranges (see ``io.line_aligned_range``). In that
+                        case, ``create_reader`` is invoked with the byte range instead of the line offset and the number of lines and
+                        documents (see ``create_byte_range_reader``).
     :return: A generator for the bulk operations of the given client.
     """
     readers = []
     for index in indices:
         for type in index.types:
+            if byte_ranges:
+                start, end = io.line_aligned_range(byte_range_data_file(type), client_index, num_clients)
+                if end > start:
+                    logger.info("Client [%d] will index docs in the byte range [%d, %d) for [%s/%s]" %
+                                (client_index, start, end, index, type))
+                    readers.append(create_reader(index, type, start, end, action_metadata, batch_size, bulk_size))
+                else:
+                    logger.info("Client [%d] skips [%s/%s] (no documents to read)." % (client_index, index, type))
+                continue
             offset, num_docs, num_lines = bounds(type.number_of_documents, client_index, num_clients, action_metadata)
             if num_docs > 0:
                 logger.info("Client [%d] will index [%d] docs starting from line offset [%d] for [%s/%s]" %
@@ -379,11 +735,19 @@ def bulk_data_based(num_clients, client_index, indices, action_metadata, batch_s
         # each batch can contain of one or more bulks
         for bulk in batch:
             bulk_id += 1
+            if isinstance(bulk, tuple):
+                # encoded bulks are provided along with their number of lines
+                number_of_lines, body = bulk
+            else:
+                number_of_lines, body = len(bulk), bulk
+            action_metadata_present = action_metadata != ActionMetaData.NoMetaData
             params = {
                 "index": index,
                 "type": type,
-                "action_metadata_present": action_metadata != ActionMetaData.NoMetaData,
-                "body": bulk,
+                "action_metadata_present": action_metadata_present,
+                "body": body,
+                # only half of the lines are documents if action and meta-data lines are present
+                "bulk-size": number_of_lines // 2 if action_metadata_present else number_of_lines,
                 # a globally unique id for this bulk
                 "bulk-id": "%d-%d" % (client_index, bulk_id)
             }
@@ -401,27 +765,55 @@ class NoneActionMetaData:
 
 
 class GenerateActionMetaData:
+    """
+    Generates an action and meta-data line for each document. Iterating provides each line as a string; ``next_encoded()`` provides it as
+    bytes and only needs to encode the document id (if any) as everything else is encoded upfront.
+    """
+
     def __init__(self, index_name, type_name, conflicting_ids, rand=random.randint):
         self.index_name = index_name
         self.type_name = type_name
         self.conflicting_ids = conflicting_ids
         self.rand = rand
         self.id_up_to = 0
+        # action and meta-data lines only differ in the document id so we format everything else only once
+        self.meta_data = '{"index": {"_index": "%s", "_type": "%s"}}' % (index_name, type_name)
+        self.meta_data_with_id = '{"index": {"_index": "%s", "_type": "%s", "_id": "%%s"}}' % (str(index_name).replace("%", "%%"),
+                                                                                               str(type_name).replace("%", "%%"))
+        self.encoded_meta_data = self.meta_data.encode("utf-8")
+        self.encoded_id_prefix = ('{"index": {"_index": "%s", "_type": "%s", "_id": "' % (index_name, type_name)).encode("utf-8")
+        self.encoded_id_suffix = b'"}}'
 
     def __iter__(self):
         return self
 
+    def _next_id(self):
+        if self.conflicting_ids is None:
+            return None
+        # 25% of the time we replace a doc:
+        if self.id_up_to > 0 and self.rand(0, 3) == 3:
+            return self.conflicting_ids[self.rand(0, self.id_up_to - 1)]
+        else:
+            doc_id = self.conflicting_ids[self.id_up_to]
+            self.id_up_to += 1
+            return doc_id
+
     def __next__(self):
-        if self.conflicting_ids is not None:
-            # 25% of the time we replace a doc:
-            if self.id_up_to > 0 and self.rand(0, 3) == 3:
-                doc_id = self.conflicting_ids[self.rand(0, self.id_up_to - 1)]
-            else:
-                doc_id = self.conflicting_ids[self.id_up_to]
-                self.id_up_to += 1
-            return '{"index": {"_index": "%s", "_type": "%s", "_id": "%s"}}' % (self.index_name, self.type_name, doc_id)
+        doc_id = self._next_id()
+        if doc_id is None:
+            return self.meta_data
         else:
-            return '{"index": {"_index": "%s", "_type": "%s"}}' % (self.index_name, self.type_name)
+            return self.meta_data_with_id % doc_id
+
+    def next_encoded(self):
+        """
+        :return: The next action and meta-data line as bytes (without a trailing newline).
+        """
+        doc_id = self._next_id()
+        if doc_id is None:
+            return self.encoded_meta_data
+        else:
+            return self.encoded_id_prefix + doc_id.encode("ascii") + self.encoded_id_suffix
 
 
 class SourceActionMetaData:
@@ -474,6 +866,49 @@ class Slice:
         return "%s[%d;%d]" % (self.source, self.offset, self.offset + self.number_of_lines)
 
 
+class ByteRangeSlice:
+    """
+    Provides all lines of a file that start within a byte range (see ``io.line_aligned_range``).
+    """
+
+    def __init__(self, source_class, start, end):
+        self.source_class = source_class
+        self.source = None
+        self.start = start
+        self.end = end
+        self.position = start
+
+    def open(self, file_name, mode):
+        # we need to know the size of each line in bytes so we read the file in binary mode and decode each line
+        self.source = self.source_class(file_name, "rb").open()
+        self.source.seek(self.start)
+        self.position = self.start
+        return self
+
+    def close(self):
+        self.source.close()
+        self.source = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.position >= self.end:
+            raise StopIteration()
+        line = self.source.readline()
+        if len(line) == 0:
+            raise StopIteration()
+        self.position += len(line)
+        return line.decode("utf-8").strip()
+
+    @property
+    def bytes_read(self):
+        return self.position - self.start
+
+    def __str__(self):
+        return "%s[%d;%d)" % (self.source, self.start, self.end)
+
+
 class IndexDataReader:
     """
     Reads a file in bulks into an array and also adds a meta-data line before each document if necessary.
@@ -518,6 +953,13 @@ class IndexDataReader:
         except IOError:
             logger.exception("Could not read [%s]" % self.data_file)
 
+    @property
+    def bytes_read(self):
+        """
+        :return: The number of bytes that have been read so far. Only supported for byte range sources (see ``ByteRangeSlice``).
+        """
+        return self.file_source.bytes_read
+
     def read_bulk(self):
         docs_in_bulk = 0
         current_bulk = []
@@ -536,8 +978,550 @@ class IndexDataReader:
         return False
 
 
+class MmapIndexDataReader:
+    """
+    Reads bulks directly from a memory-mapped data file. If the data file already contains everything that is needed for the bulk request
+    (i.e. no action and meta-data lines need to be generated), each bulk body is a slice of the mapping so documents are neither decoded nor
+    copied. Otherwise, generated action and meta-data lines are interleaved with the (undecoded) documents in a single copy.
+
+    Each bulk is returned as a tuple of its number of lines and the body.
+    """
+
+    def __init__(self, data_file, batch_size, bulk_size, offset, number_of_lines, action_metadata, action_metadata_handler, index_name,
+                 type_name, byte_range=None):
+        """
+        :param byte_range: If provided, a tuple of the start and end offset of the byte range that should be read. ``offset`` and
+                           ``number_of_lines`` are ignored in that case.
+        """
+        self.data_file = data_file
+        self.batch_size = batch_size
+        self.bulk_size = bulk_size
+        self.offset = offset
+        self.number_of_lines = number_of_lines
+        self.action_metadata_handler = action_metadata_handler
+        self.index_name = index_name
+        self.type_name = type_name
+        self.byte_range = byte_range
+        # the source file contains an action and meta-data line for each document
+        self.source_lines_per_doc = 2 if action_metadata == ActionMetaData.SourceFile else 1
+        self.mapping = None
+        self.view = None
+        self.position = 0
+        self.end = 0
+        self.remaining_lines = 0
+
+    def __enter__(self):
+        if os.path.getsize(self.data_file) > 0:
+            with open(self.data_file, "rb") as f:
+                # the mapping stays valid after the file is closed
+                self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.byte_range:
+                self.position, self.end = self.byte_range
+                # an upper bound as each line consists of at least one byte
+                self.remaining_lines = self.end - self.position
+            else:
+                io.skip_lines(self.data_file, self.mapping, self.offset)
+                self.position = self.mapping.tell()
+                self.end = len(self.mapping)
+                self.remaining_lines = self.number_of_lines
+            self.view = memoryview(self.mapping)
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        batch = []
+        docs_in_batch = 0
+        while docs_in_batch < self.batch_size:
+            docs_in_bulk, bulk = self.read_bulk()
+            if docs_in_bulk == 0:
+                break
+            docs_in_batch += docs_in_bulk
+            batch.append(bulk)
+        if docs_in_batch == 0:
+            raise StopIteration()
+        return self.index_name, self.type_name, batch
+
+    @property
+    def bytes_read(self):
+        """
+        :return: The number of bytes that have been read so far. Only supported when reading a byte range.
+        """
+        start = self.byte_range[0]
+        return self.position - start if self.position > start else 0
+
+    def read_bulk(self):
+        lines_to_read = min(self.bulk_size * self.source_lines_per_doc, self.remaining_lines)
+        size = self.end if self.mapping is not None else 0
+        line_ends = []
+        end = self.position
+        while len(line_ends) < lines_to_read and end < size:
+            newline = self.mapping.find(b"\n", end)
+            end = size if newline == -1 else newline + 1
+            line_ends.append(end)
+
+        lines_read = len(line_ends)
+        if lines_read == 0:
+            return 0, None
+        start = self.position
+        self.position = end
+        self.remaining_lines -= lines_read
+        docs_in_bulk = lines_read // self.source_lines_per_doc
+
+        if self.action_metadata_handler:
+            parts = []
+            line_start = start
+            for line_end in line_ends:
+                parts.append(self.action_metadata_handler.next_encoded())
+                parts.append(b"\n")
+                parts.append(self.view[line_start:line_end])
+                line_start = line_end
+            if self.mapping[end - 1] != ord("\n"):
+                parts.append(b"\n")
+            return docs_in_bulk, (2 * lines_read, b"".join(parts))
+        elif self.mapping[end - 1] != ord("\n"):
+            # only the last line of a file may not be terminated properly. We need to copy this bulk once to append a newline.
+            return docs_in_bulk, (lines_read, self.view[start:end].tobytes() + b"\n")
+        else:
+            return docs_in_bulk, (lines_read, self.view[start:end])
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Bulk bodies that are still referenced are slices of the mapping so we cannot close it explicitly. It is closed when the last
+        # reference is gone.
+        self.view = None
+        self.mapping = None
+        return False
+
+
+# Each entry in a bulk cache file consists of the length of the bulk body in bytes and its number of lines followed by the body itself
+BULK_CACHE_HEADER = struct.Struct("<QQ")
+
+
+class BulkCacheWriter:
+    """
+    Wraps an index data reader, encodes each bulk to bytes and writes it to a bulk cache file. Each bulk is returned as a tuple of its
+    number of lines and the encoded body. The bulk cache file is only retained if all bulks have been read so a partially written cache is
+    never used.
+    """
+
+    def __init__(self, reader, cache_file):
+        self.reader = reader
+        self.cache_file = cache_file
+        self.tmp_cache_file = "%s.%d.tmp" % (cache_file, os.getpid())
+        self.cache = None
+        self.complete = False
+
+    def __enter__(self):
+        self.reader.__enter__()
+        self.cache = open(self.tmp_cache_file, "wb")
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            index_name, type_name, batch = next(self.reader)
+        except StopIteration:
+            self.complete = True
+            raise
+        encoded_batch = []
+        for bulk in batch:
+            body = encode_bulk(bulk)
+            self.cache.write(BULK_CACHE_HEADER.pack(len(body), len(bulk)))
+            self.cache.write(body)
+            encoded_batch.append((len(bulk), body))
+        return index_name, type_name, encoded_batch
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cache.close()
+        self.cache = None
+        if self.complete and exc_type is None:
+            os.replace(self.tmp_cache_file, self.cache_file)
+            logger.info("Created bulk cache [%s]." % self.cache_file)
+        else:
+            os.remove(self.tmp_cache_file)
+        return self.reader.__exit__(exc_type, exc_val, exc_tb)
+
+
+class BulkCacheReader:
+    """
+    Reads ready-to-send bulk bodies from a bulk cache file (see ``BulkCacheWriter``).
+    """
+
+    def __init__(self, cache_file, batch_size, bulk_size, index_name, type_name):
+        self.cache_file = cache_file
+        self.bulks_per_batch = batch_size // bulk_size
+        self.index_name = index_name
+        self.type_name = type_name
+        self.cache = None
+
+    def __enter__(self):
+        self.cache = open(self.cache_file, "rb")
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        batch = []
+        while len(batch) < self.bulks_per_batch:
+            header = self.cache.read(BULK_CACHE_HEADER.size)
+            if len(header) < BULK_CACHE_HEADER.size:
+                break
+            body_length, number_of_lines = BULK_CACHE_HEADER.unpack(header)
+            batch.append((number_of_lines, self.cache.read(body_length)))
+        if len(batch) == 0:
+            raise StopIteration()
+        return self.index_name, self.type_name, batch
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cache.close()
+        self.cache = None
+        return False
+
+
+class SyntheticDocumentParamSource(ParamSource):
+    """
+    Generates bulk requests with synthetic documents instead of reading documents from a file. The structure of the documents is defined
+    by a field specification (see ``SyntheticDocuments``).
+    """
+
+    def __init__(self, indices, params):
+        super().__init__(indices, params)
+        if len(indices) == 1 and len(indices[0].types) == 1:
+            default_index = indices[0].name
+            default_type = indices[0].types[0].name
+        else:
+            default_index = None
+            default_type = None
+
+        self.index_name = params.get("index", default_index)
+        self.type_name = params.get("type", default_type)
+        if not self.index_name:
+            raise exceptions.InvalidSyntax("'index' is mandatory")
+        if not self.type_name:
+            raise exceptions.InvalidSyntax("'type' is mandatory")
+
+        self.documents = self._positive_int(params, "documents")
+        self.bulk_size = self._positive_int(params, "bulk-size")
+        self.pipeline = params.get("pipeline", None)
+        seed = params.get("seed", 0)
+        if not isinstance(seed, int):
+            raise exceptions.InvalidSyntax("'seed' must be an integer but was [%s]" % str(seed))
+        self.generator = SyntheticDocuments(params.get("fields", None), seed)
+
+    @staticmethod
+    def _positive_int(params, name):
+        try:
+            value = int(params[name])
+        except KeyError:
+            raise exceptions.InvalidSyntax("Mandatory parameter '%s' is missing" % name)
+        except ValueError:
+            raise exceptions.InvalidSyntax("'%s' must be numeric" % name)
+        if value <= 0:
+            raise exceptions.InvalidSyntax("'%s' must be positive but was %d" % (name, value))
+        return value
+
+    def partition(self, partition_index, total_partitions):
+        return PartitionSyntheticDocumentParamSource(self.indices, partition_index, total_partitions, self.index_name, self.type_name,
+                                                     self.generator, self.documents, self.bulk_size, self.pipeline)
+
+    def params(self):
+        raise exceptions.RallyError("Do not use a SyntheticDocumentParamSource without partitioning")
+
+    def size(self):
+        raise exceptions.RallyError("Do not use a SyntheticDocumentParamSource without partitioning")
+
+
+class PartitionSyntheticDocumentParamSource(ParamSource):
+    def __init__(self, indices, partition_index, total_partitions, index_name, type_name, generator, documents, bulk_size, pipeline=None):
+        """
+
+        :param indices: Specification of affected indices.
+        :param partition_index: The current partition index.  Must be in the range [0, `total_partitions`).
+        :param total_partitions: The total number of partitions (i.e. clients) for bulk index operations.
+        :param index_name: The name of the index to which documents are added.
+        :param type_name: The name of the type of the documents.
+        :param generator: A ``SyntheticDocuments`` instance.
+        :param documents: The total number of documents that all clients generate.
+        :param bulk_size: The size of bulk index operations (number of documents per bulk).
+        :param pipeline: The name of the ingest pipeline to run.
+        """
+        super().__init__(indices, {})
+        self.partition_index = partition_index
+        self.total_partitions = total_partitions
+        # in contrast to ``bounds`` every document is assigned to exactly one client even if documents are not evenly divisible
+        self.start = documents * partition_index // total_partitions
+        self.end = documents * (partition_index + 1) // total_partitions
+        self.bulk_size = bulk_size
+        logger.info("Client [%d] will index synthetic docs [%d, %d) for [%s/%s]" % (partition_index, self.start, self.end, index_name,
+                                                                                     type_name))
+        self.internal_params = synthetic_bulks(partition_index, index_name, type_name, generator, self.start, self.end, bulk_size,
+                                               pipeline)
+
+    def partition(self, partition_index, total_partitions):
+        raise exceptions.RallyError("Cannot partition a PartitionSyntheticDocumentParamSource further")
+
+    def params(self):
+        return next(self.internal_params)
+
+    def size(self):
+        complete_bulks, rest = divmod(self.end - self.start, self.bulk_size)
+        return complete_bulks + 1 if rest > 0 else complete_bulks
+
+
+def synthetic_bulks(client_index, index_name, type_name, generator, start, end, bulk_size, pipeline):
+    """
+    :return: A generator for the bulk operations of the given client that index the synthetic documents [start, end).
+    """
+    action_metadata_line = GenerateActionMetaData(index_name, type_name, None).meta_data + "\n"
+    docs = generator.documents(start, end)
+    bulk_id = 0
+    for bulk_start in range(start, end, bulk_size):
+        bulk_id += 1
+        number_of_docs = min(bulk_size, end - bulk_start)
+        params = {
+            "index": index_name,
+            "type": type_name,
+            "action_metadata_present": True,
+            "body": "".join(action_metadata_line + doc + "\n" for doc in itertools.islice(docs, number_of_docs)).encode("utf-8"),
+            "bulk-size": number_of_docs,
+            # a globally unique id for this bulk
+            "bulk-id": "%d-%d" % (client_index, bulk_id)
+        }
+        if pipeline:
+            params["pipeline"] = pipeline
+        yield params
+
+
+class SyntheticDocuments:
+    """
+    Generates JSON documents according to a field specification, e.g.::
+
+        {
+          "status": {"type": "keyword", "cardinality": 20, "distribution": "zipf"},
+          "size": {"type": "integer", "distribution": "normal", "mean": 5000, "stddev": 1000, "min": 0},
+          "message": {"type": "text", "vocabulary-size": 5000, "min-words": 5, "max-words": 20}
+        }
+
+    Documents are generated in chunks of ``CHUNK_SIZE`` consecutive documents. The values of one field in one chunk are generated in one
+    go from a random number generator that is derived from the seed, the chunk and the field name. Hence, the n-th document depends only
+    on the seed and the field specification but neither on the number of clients that generate the corpus nor on the order of fields.
+    """
+
+    CHUNK_SIZE = 1000
+
+    def __init__(self, fields, seed=0):
+        """
+        :param fields: A dict of field names to field definitions. The type of each field is determined by its property ``type``.
+        :param seed: The seed of the random number generators.
+        """
+        if not fields or not isinstance(fields, dict):
+            raise exceptions.InvalidSyntax("'fields' must define at least one field")
+        self.seed = seed
+        self.field_names = []
+        self.fields = []
+        encoded_names = []
+        for name, spec in fields.items():
+            field_type = spec.get("type")
+            try:
+                field_class = SyntheticDocuments.FIELD_TYPES[field_type]
+            except KeyError:
+                raise exceptions.InvalidSyntax("Unknown type [%s] of field [%s]. Use one of %s." %
+                                               (field_type, name, ", ".join(sorted(SyntheticDocuments.FIELD_TYPES.keys()))))
+            self.field_names.append(name)
+            self.fields.append(field_class(name, spec))
+            encoded_names.append(json.dumps(name).replace("%", "%%"))
+        # field values are already encoded as JSON so a document is just a (pre-built) template that is filled with values
+        self.template = "{" + ", ".join("%s: %%s" % name for name in encoded_names) + "}"
+
+    def documents(self, start, end):
+        """
+        :return: A generator of the (JSON-encoded) documents at the positions [start, end) of the corpus.
+        """
+        chunk_size = SyntheticDocuments.CHUNK_SIZE
+        for chunk in range(start // chunk_size, (end + chunk_size - 1) // chunk_size):
+            chunk_start = chunk * chunk_size
+            # a field may draw several random numbers per value so we always generate complete chunks to get the same values
+            columns = [field.values(random.Random("%d-%d-%s" % (self.seed, chunk, name)), chunk_size)
+                       for name, field in zip(self.field_names, self.fields)]
+            template = self.template
+            rows = zip(*columns)
+            for row in itertools.islice(rows, max(start - chunk_start, 0), min(end - chunk_start, chunk_size)):
+                yield template % row
+
+    class WeightedChoice:
+        """
+        Chooses elements of a population either uniformly or with a Zipf distribution (the element at rank ``k`` is chosen with a
+        probability proportional to ``1 / k^exponent``).
+        """
+
+        def __init__(self, name, spec, population):
+            self.population = population
+            distribution = spec.get("distribution", "uniform")
+            if distribution == "uniform":
+                self.cumulative_weights = None
+            elif distribution == "zipf":
+                exponent = spec.get("exponent", 1.0)
+                if exponent <= 0:
+                    raise exceptions.InvalidSyntax("The exponent of field [%s] must be positive but is [%s]." % (name, str(exponent)))
+                self.cumulative_weights = list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, len(population) + 1)))
+            else:
+                raise exceptions.InvalidSyntax("Unknown distribution [%s] of field [%s]. Use one of uniform, zipf." % (distribution, name))
+
+        def choose(self, rand, n):
+            p = self.population
+            r = rand.random
+            if self.cumulative_weights is None:
+                size = len(p)
+                return [p[int(r() * size)] for _ in range(n)]
+            else:
+                weights = self.cumulative_weights
+                total = weights[-1]
+                return [p[bisect.bisect(weights, r() * total)] for _ in range(n)]
+
+    class Number:
+        def __init__(self, name, spec):
+            self.distribution = spec.get("distribution", "uniform")
+            self.lower = spec.get("min", None)
+            self.upper = spec.get("max", None)
+            # a uniform distribution requires bounds whereas values of a normal distribution are only limited to bounds if provided
+            if self.distribution == "uniform":
+                self.lower = 0 if self.lower is None else self.lower
+                self.upper = 100 if self.upper is None else self.upper
+            elif self.distribution == "normal":
+                self.mean = spec.get("mean", 0)
+                self.stddev = spec.get("stddev", 1)
+                if self.stddev < 0:
+                    raise exceptions.InvalidSyntax("The standard deviation of field [%s] must not be negative." % name)
+            else:
+                raise exceptions.InvalidSyntax("Unknown distribution [%s] of field [%s]. Use one of normal, uniform." %
+                                               (self.distribution, name))
+            if self.lower is not None and self.upper is not None and self.lower > self.upper:
+                raise exceptions.InvalidSyntax("The minimum of field [%s] must not be greater than its maximum." % name)
+
+        def raw_values(self, rand, n):
+            if self.distribution == "uniform":
+                u = rand.uniform
+                lower, upper = self.lower, self.upper
+                return [u(lower, upper) for _ in range(n)]
+            else:
+                g = rand.gauss
+                mean, stddev = self.mean, self.stddev
+                values = [g(mean, stddev) for _ in range(n)]
+                if self.lower is not None:
+                    values = [max(v, self.lower) for v in values]
+                if self.upper is not None:
+                    values = [min(v, self.upper) for v in values]
+                return values
+
+    class Integer(Number):
+        def values(self, rand, n):
+            if self.distribution == "uniform":
+                # randint includes the upper bound
+                ri = rand.randint
+                lower, upper = int(self.lower), int(self.upper)
+                return [str(ri(lower, upper)) for _ in range(n)]
+            return [str(round(v)) for v in self.raw_values(rand, n)]
+
+    class Float(Number):
+        def values(self, rand, n):
+            return [repr(v) for v in self.raw_values(rand, n)]
+
+    class Keyword:
+        def __init__(self, name, spec):
+            values = spec.get("values", None)
+            if values is None:
+                cardinality = spec.get("cardinality", 1000)
+                if cardinality <= 0:
+                    raise exceptions.InvalidSyntax("The cardinality of field [%s] must be positive but is [%s]." % (name, str(cardinality)))
+                prefix = spec.get("prefix", name)
+                values = ["%s-%d" % (prefix, i) for i in range(cardinality)]
+            elif len(values) == 0:
+                raise exceptions.InvalidSyntax("The values of field [%s] must not be empty." % name)
+            self.choice = SyntheticDocuments.WeightedChoice(name, spec, [json.dumps(v) for v in values])
+
+        def values(self, rand, n):
+            return self.choice.choose(rand, n)
+
+    class Text:
+        # consonant-vowel syllables to build synthetic words
+        SYLLABLES = [c + v for c in "bcdfghjklmnprstvwz" for v in "aeiou"]
+
+        def __init__(self, name, spec):
+            vocabulary = spec.get("vocabulary", None)
+            if vocabulary is None:
+                vocabulary = [self.synthetic_word(rank) for rank in range(spec.get("vocabulary-size", 10000))]
+            if len(vocabulary) == 0:
+                raise exceptions.InvalidSyntax("The vocabulary of field [%s] must not be empty." % name)
+            self.min_words = spec.get("min-words", 1)
+            self.max_words = spec.get("max-words", 10)
+            if self.min_words < 0 or self.min_words > self.max_words:
+                raise exceptions.InvalidSyntax("Field [%s] requires 0 <= 'min-words' <= 'max-words'." % name)
+            # natural language is Zipf distributed
+            if "distribution" not in spec:
+                spec = dict(spec)
+                spec["distribution"] = "zipf"
+            # escape each word only once; a sequence of escaped words separated by spaces is a properly escaped string
+            self.choice = SyntheticDocuments.WeightedChoice(name, spec, [json.dumps(w)[1:-1] for w in vocabulary])
+
+        @staticmethod
+        def synthetic_word(rank):
+            # frequent words (i.e. a low rank) are short
+            syllables = SyntheticDocuments.Text.SYLLABLES
+            word = ""
+            while rank >= 0:
+                word += syllables[rank % len(syllables)]
+                rank = rank // len(syllables) - 1
+            return word
+
+        def values(self, rand, n):
+            ri = rand.randint
+            lengths = [ri(self.min_words, self.max_words) for _ in range(n)]
+            words = iter(self.choice.choose(rand, sum(lengths)))
+            return ['"%s"' % " ".join(itertools.islice(words, length)) for length in lengths]
+
+    class Boolean:
+        def __init__(self, name, spec):
+            self.probability = spec.get("probability", 0.5)
+            if not 0 <= self.probability <= 1:
+                raise exceptions.InvalidSyntax("The probability of field [%s] must be in the range [0, 1]." % name)
+
+        def values(self, rand, n):
+            r = rand.random
+            p = self.probability
+            return ["true" if r() < p else "false" for _ in range(n)]
+
+    class Date:
+        def __init__(self, name, spec):
+            try:
+                self.start = calendar.timegm(datetime.datetime.strptime(spec.get("start", "2000-01-01"), "%Y-%m-%d").timetuple())
+                self.end = calendar.timegm(datetime.datetime.strptime(spec.get("end", "2020-01-01"), "%Y-%m-%d").timetuple())
+            except ValueError:
+                raise exceptions.InvalidSyntax("The start and end of field [%s] must be dates in the format yyyy-MM-dd." % name)
+            if self.start > self.end:
+                raise exceptions.InvalidSyntax("The start of field [%s] must not be after its end." % name)
+
+        def values(self, rand, n):
+            ri = rand.randint
+            start, end = self.start, self.end
+            return [time.strftime('"%Y-%m-%dT%H:%M:%SZ"', time.gmtime(ri(start, end))) for _ in range(n)]
+
+    FIELD_TYPES = {
+        "integer": Integer,
+        "float": Float,
+        "keyword": Keyword,
+        "text": Text,
+        "boolean": Boolean,
+        "date": Date
+    }
+
+
 register_param_source_for_operation(track.OperationType.Index, BulkIndexParamSource)
 register_param_source_for_operation(track.OperationType.Search, SearchParamSource)
 
 # Also register by name, so users can use it too
 register_param_source_for_name("file-reader", BulkIndexParamSource)
+register_param_source_for_name("synthetic-documents", SyntheticDocumentParamSource)
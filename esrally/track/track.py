@@ -212,7 +212,7 @@ class Parallel:
 
 class Task:
     def __init__(self, operation, meta_data=None, warmup_iterations=0, iterations=1, warmup_time_period=None, time_period=None, clients=1,
-                 target_throughput=None):
+                 target_throughput=None, schedule="deterministic", throughput_search=None, load_profile=None):
         self.operation = operation
         self.meta_data = meta_data if meta_data else {}
         self.warmup_iterations = warmup_iterations
@@ -221,6 +221,9 @@ class Task:
         self.time_period = time_period
         self.clients = clients
         self.target_throughput = target_throughput
+        self.schedule = schedule
+        self.throughput_search = throughput_search
+        self.load_profile = load_profile
 
     def __hash__(self):
         return hash(self.operation)
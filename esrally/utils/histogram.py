@@ -0,0 +1,156 @@
+import array
+import base64
+import math
+import struct
+import zlib
+
+# magic, significant figures, scale, highest trackable value, total count, min, max, sum, number of entries
+_HEADER = struct.Struct("<4sBQQQdddQ")
+_MAGIC = b"RHD1"
+
+
+class Histogram:
+    """
+    A high dynamic range (HDR) histogram (see also http://hdrhistogram.org/).
+
+    Values are recorded into buckets whose width grows with the magnitude of the value such that each recorded value is represented with a
+    fixed number of significant figures. Hence, memory consumption depends only on the range and precision of values but not on the number
+    of recorded values. Histograms with the same configuration can be merged and percentiles can be determined without sorting any values.
+    """
+
+    def __init__(self, significant_figures=3, highest_trackable_value=3600 * 1000 * 1000, scale=1000):
+        """
+        Creates a new histogram.
+
+        :param significant_figures: The number of significant decimal figures that are maintained for each recorded value (1 - 5).
+        :param highest_trackable_value: The highest value (in histogram units) that can be tracked. Larger values are recorded as this value.
+        :param scale: The number of histogram units per value. Histogram units are integers so the default of 1000 records e.g. milliseconds
+        with a resolution of one microsecond. The default highest trackable value corresponds to one hour then.
+        """
+        if not 1 <= significant_figures <= 5:
+            raise ValueError("Significant figures must be between 1 and 5 but was [%s]" % str(significant_figures))
+        self.significant_figures = significant_figures
+        self.highest_trackable_value = highest_trackable_value
+        self.scale = scale
+        self.sub_bucket_count_magnitude = int(math.ceil(math.log2(2 * 10 ** significant_figures)))
+        self.sub_bucket_half_count_magnitude = self.sub_bucket_count_magnitude - 1
+        self.sub_bucket_count = 1 << self.sub_bucket_count_magnitude
+        self.sub_bucket_half_count = self.sub_bucket_count >> 1
+        self.sub_bucket_mask = self.sub_bucket_count - 1
+        # sparse representation: only few buckets are populated for typical latency distributions
+        self.counts = {}
+        self.total_count = 0
+        self.min = None
+        self.max = None
+        self.sum = 0
+
+    def record_value(self, value, count=1):
+        """
+        Records a value.
+
+        :param value: A non-negative value.
+        :param count: The number of occurrences of this value. Default: 1.
+        """
+        if value < 0:
+            raise ValueError("Cannot record negative value [%s]" % str(value))
+        idx = self._counts_index(min(int(value * self.scale), self.highest_trackable_value))
+        self.counts[idx] = self.counts.get(idx, 0) + count
+        self.total_count += count
+        self.sum += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def add(self, other):
+        """
+        Merges all values of another histogram into this one.
+
+        :param other: A histogram with the same configuration.
+        """
+        if (self.significant_figures, self.highest_trackable_value, self.scale) != \
+                (other.significant_figures, other.highest_trackable_value, other.scale):
+            raise ValueError("Cannot merge histograms with a different configuration.")
+        for idx, count in other.counts.items():
+            self.counts[idx] = self.counts.get(idx, 0) + count
+        self.total_count += other.total_count
+        self.sum += other.sum
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    @property
+    def mean(self):
+        return self.sum / self.total_count if self.total_count > 0 else None
+
+    def value_at_percentile(self, percentile):
+        """
+        :param percentile: A percentile between [0, 100].
+        :return: The (highest equivalent) value at this percentile or ``None`` if no value has been recorded.
+        """
+        if self.total_count == 0:
+            return None
+        target = max(int(math.ceil(min(float(percentile), 100.0) / 100.0 * self.total_count)), 1)
+        seen = 0
+        for idx in sorted(self.counts):
+            seen += self.counts[idx]
+            if seen >= target:
+                value = self._highest_equivalent_value(idx) / self.scale
+                # the exact minimum and maximum are known so we never report a value outside of this range
+                return max(min(value, self.max), self.min)
+        return self.max
+
+    def percentiles(self, percentiles):
+        """
+        :param percentiles: A list of percentiles between [0, 100].
+        :return: A list of the corresponding values.
+        """
+        return [self.value_at_percentile(p) for p in percentiles]
+
+    def _counts_index(self, value):
+        bucket_index = max((value | self.sub_bucket_mask).bit_length() - self.sub_bucket_count_magnitude, 0)
+        sub_bucket_index = value >> bucket_index
+        return ((bucket_index + 1) << self.sub_bucket_half_count_magnitude) + (sub_bucket_index - self.sub_bucket_half_count)
+
+    def _highest_equivalent_value(self, idx):
+        bucket_index = (idx >> self.sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (idx & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self.sub_bucket_half_count
+            bucket_index = 0
+        return ((sub_bucket_index + 1) << bucket_index) - 1
+
+    def encode(self):
+        """
+        :return: A compact string representation of this histogram (see ``decode``).
+        """
+        entries = array.array("Q")
+        for idx in sorted(self.counts):
+            entries.append(idx)
+            entries.append(self.counts[idx])
+        header = _HEADER.pack(_MAGIC, self.significant_figures, self.scale, self.highest_trackable_value, self.total_count,
+                              self.min if self.min is not None else math.nan, self.max if self.max is not None else math.nan, self.sum,
+                              len(self.counts))
+        return base64.b64encode(zlib.compress(header + entries.tobytes())).decode("ascii")
+
+    @staticmethod
+    def decode(encoded):
+        """
+        :param encoded: A string that has been created with ``Histogram#encode()``.
+        :return: The corresponding histogram.
+        """
+        data = zlib.decompress(base64.b64decode(encoded))
+        magic, significant_figures, scale, highest_trackable_value, total_count, min_value, max_value, sum_values, entry_count = \
+            _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("Invalid histogram encoding.")
+        h = Histogram(significant_figures=significant_figures, highest_trackable_value=highest_trackable_value, scale=scale)
+        entries = array.array("Q")
+        entries.frombytes(data[_HEADER.size:_HEADER.size + entry_count * 2 * entries.itemsize])
+        h.counts = dict(zip(entries[0::2], entries[1::2]))
+        h.total_count = total_count
+        h.min = None if math.isnan(min_value) else min_value
+        h.max = None if math.isnan(max_value) else max_value
+        h.sum = sum_values
+        return h
@@ -1,3 +1,4 @@
+import io as _io
 import os
 import errno
 import re
@@ -7,6 +8,11 @@ import gzip
 import zipfile
 import tarfile
 import logging
+import mmap
+import struct
+import itertools
+import zlib
+import concurrent.futures
 
 from esrally.utils import console
 
@@ -52,6 +58,64 @@ class FileSource:
         return self.file_name
 
 
+class CompressedFileSource:
+    """
+    Reads a bz2 or gzip compressed file with the same interface as ``FileSource``. Offsets in ``seek`` refer to the compressed file and
+    need to point to the start of a gzip member or a bz2 stream (see ``prepare_block_index``).
+    """
+    def __init__(self, file_name, mode):
+        self.file_name = file_name
+        self.mode = mode
+        self.compressed = None
+        self.f = None
+
+    def open(self):
+        self.compressed = open(self.file_name, "rb")
+        self._decompress()
+        # allow for chaining
+        return self
+
+    def _decompress(self):
+        _, extension = splitext(self.file_name)
+        if extension == ".bz2":
+            stream = bz2.BZ2File(self.compressed, mode="rb")
+        elif extension == ".gz":
+            stream = gzip.GzipFile(fileobj=self.compressed, mode="rb")
+        else:
+            raise RuntimeError("Unsupported file extension [%s]. Cannot read [%s]" % (extension, self.file_name))
+        self.f = _io.TextIOWrapper(stream) if "t" in self.mode else stream
+
+    def seek(self, offset):
+        # decompressors cannot seek so we start a new one at the provided member (or stream). Closing the current one keeps the
+        # compressed file open.
+        self.f.close()
+        self.compressed.seek(offset)
+        self._decompress()
+
+    def read(self):
+        return self.f.read()
+
+    def readline(self):
+        return self.f.readline()
+
+    def close(self):
+        self.f.close()
+        self.f = None
+        self.compressed.close()
+        self.compressed = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def __str__(self, *args, **kwargs):
+        return self.file_name
+
+
 class StringAsFileSource:
     """
     Implementation of ``FileSource`` intended for tests. It's kept close to ``FileSource`` to simplify maintenance but it is not meant to
@@ -175,6 +239,64 @@ def decompress(zip_name, target_directory):
         raise RuntimeError("Unsupported file extension [%s]. Cannot decompress [%s]" % (extension, zip_name))
 
 
+def decompress_and_index(archive_path, stride=None):
+    """
+    Decompresses the provided archive next to the archive and builds the file offset table for the decompressed file in the same pass
+    (see ``prepare_file_offset_table``). Only archives that contain a single file (bz2, gz) are supported. If available, ``pbzip2`` or
+    ``pigz`` are used to decompress bz2 or gz archives (``pbzip2`` decompresses archives with multiple streams in parallel).
+
+    :param archive_path: The full path name to the file that should be decompressed.
+    :param stride: The number of lines between two entries in the offset table. Defaults to ``DEFAULT_OFFSET_TABLE_STRIDE``.
+    :return: The path to the decompressed file.
+    """
+    stride = stride if stride else DEFAULT_OFFSET_TABLE_STRIDE
+    data_file_path, extension = splitext(archive_path)
+    if extension not in [".bz2", ".gz"]:
+        raise RuntimeError("Unsupported file extension [%s]. Cannot decompress and index [%s]" % (extension, archive_path))
+    collector = LineOffsetCollector(stride)
+    with _decompressed_stream(archive_path, extension) as source, open(data_file_path, mode="wb") as target:
+        for data in iter(lambda: source.read(16 * _SCAN_BLOCK_SIZE), b""):
+            collector.update(data)
+            target.write(data)
+    write_file_offset_table(offset_table_path(data_file_path), stride, collector.file_offsets())
+    return data_file_path
+
+
+def _decompressed_stream(archive_path, extension):
+    if extension == ".bz2":
+        binary, fallback = guess_install_location("pbzip2"), bz2.open
+    else:
+        binary, fallback = guess_install_location("pigz"), gzip.open
+    if binary:
+        logger.info("Decompressing [%s] with [%s]." % (archive_path, binary))
+        return _ProcessOutput([binary, "-dc", archive_path])
+    else:
+        return fallback(archive_path, "rb")
+
+
+class _ProcessOutput:
+    """
+    Provides the standard output of a process as a file-like object. Raises an error on close if the process has failed.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def read(self, size=-1):
+        return self.process.stdout.read(size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.process.stdout.close()
+        return_code = self.process.wait()
+        if exc_type is None and return_code != 0:
+            raise RuntimeError("[%s] has exited with code [%d]." % (" ".join(self.args), return_code))
+        return False
+
+
 def _do_decompress(target_directory, compressed_file):
     try:
         compressed_file.extractall(path=target_directory)
@@ -217,32 +339,417 @@ def splitext(file_name):
         return os.path.splitext(file_name)
 
 
-def prepare_file_offset_table(data_file_path):
+# Magic bytes, stride and number of entries of a binary file offset table. The header is followed by the entries (each entry is an unsigned
+# 64 bit integer in native byte order). Entry i is the byte offset of line number i * stride.
+OFFSET_TABLE_MAGIC = b"RLYOFF01"
+OFFSET_TABLE_HEADER = struct.Struct("=8sQQ")
+OFFSET_TABLE_ENTRY = struct.Struct("=Q")
+
+DEFAULT_OFFSET_TABLE_STRIDE = 1000
+
+# block size within which we search for individual line breaks when building the file offset table
+_SCAN_BLOCK_SIZE = 64 * 1024
+# files larger than this are scanned in parallel
+_PARALLEL_SCAN_THRESHOLD = 256 * 1024 * 1024
+
+
+def offset_table_path(data_file_path):
+    return "%s.offsets" % data_file_path
+
+
+def prepare_file_offset_table(data_file_path, stride=DEFAULT_OFFSET_TABLE_STRIDE, workers=None):
     """
     Creates a file that contains a mapping from line numbers to file offsets for the provided path. This file is used internally by
     #skip_lines(data_file_path, data_file) to speed up line skipping.
 
+    The file offset table contains one entry for every ``stride`` lines. It is built with a chunked byte scan (in parallel for large files).
+
     :param data_file_path: The path to a text file that is readable by this process.
+    :param stride: The number of lines between two entries in the offset table. Smaller values use more disk space but allow to skip
+    lines faster.
+    :param workers: The number of processes that scan the data file. Defaults to the number of CPUs. Only relevant for large files.
     """
-    offset_file_path = "%s.offset" % data_file_path
+    offset_file_path = offset_table_path(data_file_path)
     # recreate only if necessary as this can be time-consuming
-    if not os.path.exists(offset_file_path) or os.path.getmtime(offset_file_path) < os.path.getmtime(data_file_path):
+    if not os.path.exists(offset_file_path) or os.path.getmtime(offset_file_path) < os.path.getmtime(data_file_path) or \
+            FileOffsetTable.stride_of(offset_file_path) != stride:
         console.info("Preparing file offset table for [%s] ... " % data_file_path, end="", flush=True, logger=logger)
-        line_number = 0
-        with open(offset_file_path, mode="w") as offset_file:
-            with open(data_file_path, mode="rt") as data_file:
-                while True:
-                    line = data_file.readline()
-                    if len(line) == 0:
-                        break
-                    line_number += 1
-                    if line_number % 50000 == 0:
-                        print("%d;%d" % (line_number, data_file.tell()), file=offset_file)
+        offsets = scan_line_offsets(data_file_path, stride, workers)
+        write_file_offset_table(offset_file_path, stride, offsets)
         console.println("[OK]")
     else:
         logger.info("Skipping creation of file offset table at [%s] as it is still valid." % offset_file_path)
 
 
+def write_file_offset_table(offset_file_path, stride, offsets):
+    """
+    Writes a file offset table. The table is written to a temporary file first so readers never see a partially written table.
+
+    :param offset_file_path: The path of the file offset table.
+    :param stride: The number of lines between two entries.
+    :param offsets: A list of file offsets. Entry i is the byte offset of line number i * stride.
+    """
+    tmp_path = "%s.%d.tmp" % (offset_file_path, os.getpid())
+    with open(tmp_path, mode="wb") as offset_file:
+        offset_file.write(OFFSET_TABLE_HEADER.pack(OFFSET_TABLE_MAGIC, stride, len(offsets)))
+        for offset in offsets:
+            offset_file.write(OFFSET_TABLE_ENTRY.pack(offset))
+    os.replace(tmp_path, offset_file_path)
+
+
+def scan_line_offsets(data_file_path, stride, workers=None):
+    """
+    Determines the byte offset of every ``stride``-th line in the provided file.
+
+    :param data_file_path: The path to a text file that is readable by this process.
+    :param stride: The number of lines between two offsets.
+    :param workers: The number of processes that scan the data file in parallel. Defaults to the number of CPUs.
+    :return: A list of byte offsets. Entry i is the byte offset of line number i * stride.
+    """
+    if stride <= 0:
+        raise ValueError("stride must be positive but was [%d]" % stride)
+    size = os.path.getsize(data_file_path)
+    workers = workers if workers else os.cpu_count() or 1
+    if size < _PARALLEL_SCAN_THRESHOLD or workers == 1:
+        return [0] + _line_offsets_in_range(data_file_path, 0, size, 0, stride)
+
+    range_size = -(-size // workers)
+    ranges = [(start, min(start + range_size, size)) for start in range(0, size, range_size)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        # first pass: count the lines in each range so we know the number of the first line in each range
+        line_counts = list(pool.map(_count_lines_in_range, itertools.repeat(data_file_path), [r[0] for r in ranges], [r[1] for r in ranges]))
+        first_lines = [0] + list(itertools.accumulate(line_counts))[:-1]
+        # second pass: determine the offsets within each range
+        offsets_per_range = pool.map(_line_offsets_in_range, itertools.repeat(data_file_path), [r[0] for r in ranges],
+                                     [r[1] for r in ranges], first_lines, itertools.repeat(stride))
+        return [0] + list(itertools.chain.from_iterable(offsets_per_range))
+
+
+def _count_lines_in_range(data_file_path, start, end):
+    lines = 0
+    with open(data_file_path, mode="rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(16 * _SCAN_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            lines += block.count(b"\n")
+    return lines
+
+
+def _line_offsets_in_range(data_file_path, start, end, first_line, stride):
+    """
+    :return: The offsets of all lines with a line number that is a (positive) multiple of ``stride`` and that start after a line break in
+    the byte range [start, end). ``first_line`` is the number of line breaks before ``start``.
+    """
+    collector = LineOffsetCollector(stride, first_line=first_line, start=start)
+    with open(data_file_path, mode="rb") as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            block = f.read(min(_SCAN_BLOCK_SIZE, end - position))
+            if not block:
+                break
+            collector.update(block)
+            position += len(block)
+    # the last line break of a file does not start a new line
+    size = os.path.getsize(data_file_path)
+    return [o for o in collector.offsets if o < size]
+
+
+def line_aligned_range(data_file_path, part, parts):
+    """
+    Splits a text file into ``parts`` byte ranges of roughly equal size whose boundaries are aligned to the start of lines. Each line of
+    the file belongs to exactly one range. Only the file size is needed and a short scan for the next line break at each boundary.
+
+    :param data_file_path: The path to a text file that is readable by this process.
+    :param part: The current part. Must be in the range [0, ``parts``).
+    :param parts: The total number of parts.
+    :return: A tuple of the (inclusive) start and the (exclusive) end offset of the byte range. The range may be empty.
+    """
+    size = os.path.getsize(data_file_path)
+    with open(data_file_path, mode="rb") as f:
+        return _next_line_start(f, size * part // parts, size), _next_line_start(f, size * (part + 1) // parts, size)
+
+
+def _next_line_start(f, offset, size):
+    """
+    :return: The offset of the first line that starts at or after ``offset``.
+    """
+    if offset == 0 or offset >= size:
+        return min(offset, size)
+    # a line starts at offset if the preceding byte is a line break
+    position = offset - 1
+    f.seek(position)
+    for block in iter(lambda: f.read(_SCAN_BLOCK_SIZE), b""):
+        idx = block.find(b"\n")
+        if idx >= 0:
+            return position + idx + 1
+        position += len(block)
+    return size
+
+
+def count_lines_in_range(data_file_path, start, end):
+    """
+    :return: The number of lines that start in the byte range [start, end) of the provided file. ``start`` needs to be the start of a
+             line (see ``line_aligned_range``).
+    """
+    if end <= start:
+        return 0
+    lines = _count_lines_in_range(data_file_path, start, end)
+    # the last line of a file may not be terminated by a line break
+    with open(data_file_path, mode="rb") as f:
+        f.seek(end - 1)
+        if f.read(1) != b"\n":
+            lines += 1
+    return lines
+
+
+class LineOffsetCollector:
+    """
+    Determines the byte offset of every ``stride``-th line of a stream of bytes that is provided incrementally.
+    """
+
+    def __init__(self, stride, first_line=0, start=0):
+        """
+        :param stride: The number of lines between two offsets.
+        :param first_line: The number of line breaks before the first byte of the stream.
+        :param start: The byte offset of the first byte of the stream.
+        """
+        self.stride = stride
+        self.offsets = []
+        # number of line breaks that we have seen so far
+        self.lines = first_line
+        self.position = start
+        self.next_line = (first_line // stride + 1) * stride
+
+    def update(self, data):
+        for block_start in range(0, len(data), _SCAN_BLOCK_SIZE):
+            self._update_block(data[block_start:block_start + _SCAN_BLOCK_SIZE])
+
+    def _update_block(self, block):
+        lines_in_block = block.count(b"\n")
+        # only search for individual line breaks if the next line that we're interested in starts within this block
+        idx = -1
+        line = self.lines
+        while self.next_line <= self.lines + lines_in_block:
+            while line < self.next_line:
+                idx = block.find(b"\n", idx + 1)
+                line += 1
+            self.offsets.append(self.position + idx + 1)
+            self.next_line += self.stride
+        self.lines += lines_in_block
+        self.position += len(block)
+
+    def file_offsets(self):
+        """
+        :return: All offsets for a complete file (i.e. including the offset of the first line), suitable for ``write_file_offset_table``.
+        """
+        # the last line break of a file does not start a new line
+        return [0] + [o for o in self.offsets if o < self.position]
+
+
+class FileOffsetTable:
+    """
+    Provides constant time access to a binary file offset table (see ``prepare_file_offset_table``). The table is memory-mapped.
+    """
+
+    def __init__(self, offset_file_path):
+        self.offset_file_path = offset_file_path
+        with open(offset_file_path, mode="rb") as f:
+            self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.stride, self.entries = OFFSET_TABLE_HEADER.unpack_from(self.mapping)
+        if magic != OFFSET_TABLE_MAGIC:
+            self.mapping.close()
+            raise ValueError("[%s] is not a valid file offset table." % offset_file_path)
+
+    @staticmethod
+    def stride_of(offset_file_path):
+        """
+        :return: The stride of the provided file offset table or ``None`` if it is not a valid file offset table.
+        """
+        with open(offset_file_path, mode="rb") as f:
+            header = f.read(OFFSET_TABLE_HEADER.size)
+        if len(header) < OFFSET_TABLE_HEADER.size:
+            return None
+        magic, stride, _ = OFFSET_TABLE_HEADER.unpack(header)
+        return stride if magic == OFFSET_TABLE_MAGIC else None
+
+    def find(self, line_number):
+        """
+        :param line_number: A non-negative line number.
+        :return: A tuple of the closest line number that is less or equal than the provided one and its byte offset.
+        """
+        entry = min(line_number // self.stride, self.entries - 1)
+        if entry < 0:
+            return 0, 0
+        offset, = OFFSET_TABLE_ENTRY.unpack_from(self.mapping, OFFSET_TABLE_HEADER.size + entry * OFFSET_TABLE_ENTRY.size)
+        return entry * self.stride, offset
+
+    def close(self):
+        self.mapping.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+BLOCK_INDEX_MAGIC = b"RLYBLK01"
+# magic, stride, uncompressed size, number of entries
+BLOCK_INDEX_HEADER = struct.Struct("=8sQQQ")
+# compressed offset, line breaks before this offset, whether a line starts at this offset
+BLOCK_INDEX_ENTRY = struct.Struct("=QQB")
+
+
+def block_index_path(archive_path):
+    return "%s.blocks" % archive_path
+
+
+def prepare_block_index(archive_path, stride=DEFAULT_OFFSET_TABLE_STRIDE):
+    """
+    Creates a file that maps line numbers to the offsets at which independently compressed parts of an archive (gzip members or bz2
+    streams) start. With this block index, documents can be read directly from the archive and #skip_lines(archive_path, data_file) can
+    jump close to any line without decompressing all preceding data. Archives that consist of a single member (or stream) are supported
+    but need to be decompressed from the start to skip lines. Archives with many members are e.g. created by ``bgzip`` or ``pbzip2``.
+
+    :param archive_path: The path to a bz2 or gzip compressed text file.
+    :param stride: The minimum number of lines between two entries in the block index.
+    :return: The uncompressed size of the archive in bytes.
+    """
+    index_file_path = block_index_path(archive_path)
+    if not os.path.exists(index_file_path) or os.path.getmtime(index_file_path) < os.path.getmtime(archive_path) or \
+            BlockIndex.header_of(index_file_path)[0] != stride:
+        console.info("Preparing block index for [%s] ... " % archive_path, end="", flush=True, logger=logger)
+        entries, uncompressed_size = scan_blocks(archive_path, stride)
+        tmp_path = "%s.%d.tmp" % (index_file_path, os.getpid())
+        with open(tmp_path, mode="wb") as index_file:
+            index_file.write(BLOCK_INDEX_HEADER.pack(BLOCK_INDEX_MAGIC, stride, uncompressed_size, len(entries)))
+            for entry in entries:
+                index_file.write(BLOCK_INDEX_ENTRY.pack(*entry))
+        os.replace(tmp_path, index_file_path)
+        console.println("[OK]")
+        if len(entries) == 1:
+            logger.warning("[%s] consists of a single compressed block. Clients need to decompress all preceding data to skip lines." %
+                           archive_path)
+        return uncompressed_size
+    else:
+        logger.info("Skipping creation of block index at [%s] as it is still valid." % index_file_path)
+        return BlockIndex.header_of(index_file_path)[1]
+
+
+def scan_blocks(archive_path, stride):
+    """
+    Decompresses the provided archive once and determines where its gzip members (or bz2 streams) start.
+
+    :param archive_path: The path to a bz2 or gzip compressed text file.
+    :param stride: The minimum number of lines between two entries.
+    :return: A tuple of a list of block index entries and the uncompressed size in bytes.
+    """
+    _, extension = splitext(archive_path)
+    if extension == ".bz2":
+        new_decompressor = bz2.BZ2Decompressor
+    elif extension == ".gz":
+        def new_decompressor():
+            return zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    else:
+        raise RuntimeError("Unsupported file extension [%s]. Cannot create a block index for [%s]" % (extension, archive_path))
+
+    entries = [(0, 0, True)]
+    lines = 0
+    uncompressed_size = 0
+    line_start = True
+    # compressed offset of the first byte that has not been fed to the decompressor yet
+    position = 0
+    pending_entry = None
+    decompressor = new_decompressor()
+    with open(archive_path, mode="rb") as f:
+        for data in iter(lambda: f.read(16 * _SCAN_BLOCK_SIZE), b""):
+            while data:
+                if pending_entry:
+                    # a new member starts here
+                    if pending_entry[1] - entries[-1][1] >= stride:
+                        entries.append(pending_entry)
+                    pending_entry = None
+                decompressed = decompressor.decompress(data)
+                lines += decompressed.count(b"\n")
+                uncompressed_size += len(decompressed)
+                if decompressed:
+                    line_start = decompressed.endswith(b"\n")
+                if decompressor.eof:
+                    consumed = len(data) - len(decompressor.unused_data)
+                    position += consumed
+                    data = data[consumed:]
+                    decompressor = new_decompressor()
+                    pending_entry = (position, lines, line_start)
+                else:
+                    position += len(data)
+                    data = b""
+    return entries, uncompressed_size
+
+
+class BlockIndex:
+    """
+    Provides access to a binary block index (see ``prepare_block_index``). The index is memory-mapped.
+    """
+
+    def __init__(self, index_file_path):
+        self.index_file_path = index_file_path
+        with open(index_file_path, mode="rb") as f:
+            self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.stride, self.uncompressed_size, self.entries = BLOCK_INDEX_HEADER.unpack_from(self.mapping)
+        if magic != BLOCK_INDEX_MAGIC:
+            self.mapping.close()
+            raise ValueError("[%s] is not a valid block index." % index_file_path)
+
+    @staticmethod
+    def header_of(index_file_path):
+        """
+        :return: A tuple of the stride and the uncompressed size of the provided block index or ``(None, None)`` if it is invalid.
+        """
+        with open(index_file_path, mode="rb") as f:
+            header = f.read(BLOCK_INDEX_HEADER.size)
+        if len(header) < BLOCK_INDEX_HEADER.size:
+            return None, None
+        magic, stride, uncompressed_size, _ = BLOCK_INDEX_HEADER.unpack(header)
+        return (stride, uncompressed_size) if magic == BLOCK_INDEX_MAGIC else (None, None)
+
+    def _entry(self, idx):
+        return BLOCK_INDEX_ENTRY.unpack_from(self.mapping, BLOCK_INDEX_HEADER.size + idx * BLOCK_INDEX_ENTRY.size)
+
+    def find(self, line_number):
+        """
+        :param line_number: A non-negative line number.
+        :return: A tuple of a line number and the compressed offset of the block from which to start decompressing. After reading
+                 ``line_number`` minus the returned line number lines from this offset, the next line is the requested one.
+        """
+        # binary search for the last block that starts before the requested line
+        low, high = 0, self.entries - 1
+        while low < high:
+            mid = (low + high + 1) // 2
+            offset, lines, line_start = self._entry(mid)
+            if lines < line_number or (lines == line_number and line_start):
+                low = mid
+            else:
+                high = mid - 1
+        offset, lines, line_start = self._entry(low)
+        return lines, offset
+
+    def close(self):
+        self.mapping.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
 def skip_lines(data_file_path, data_file, number_of_lines_to_skip):
     """
     Skips the first `number_of_lines_to_skip` lines in `data_file` as a side effect.
@@ -254,19 +761,20 @@ def skip_lines(data_file_path, data_file, number_of_lines_to_skip):
     if number_of_lines_to_skip == 0:
         return
 
-    offset_file_path = "%s.offset" % data_file_path
+    offset_file_path = offset_table_path(data_file_path)
+    index_file_path = block_index_path(data_file_path)
     offset = 0
     remaining_lines = number_of_lines_to_skip
     # can we fast forward?
     if os.path.exists(offset_file_path):
-        with open(offset_file_path) as offsets:
-            for line in offsets:
-                line_number, offset_in_bytes = [int(i) for i in line.strip().split(";")]
-                if line_number <= number_of_lines_to_skip:
-                    offset = offset_in_bytes
-                    remaining_lines = number_of_lines_to_skip - line_number
-                else:
-                    break
+        with FileOffsetTable(offset_file_path) as offsets:
+            line_number, offset = offsets.find(number_of_lines_to_skip)
+            remaining_lines = number_of_lines_to_skip - line_number
+    elif os.path.exists(index_file_path):
+        # the data file is compressed; the offset refers to the start of a compressed block
+        with BlockIndex(index_file_path) as blocks:
+            line_number, offset = blocks.find(number_of_lines_to_skip)
+            remaining_lines = number_of_lines_to_skip - line_number
     # fast forward to the last known file offset
     data_file.seek(offset)
     # forward the last remaining lines if needed
@@ -17,6 +17,57 @@ def physical_cpu_cores():
     return psutil.cpu_count(logical=False)
 
 
+def pin_to_cpu(index, pid=None):
+    """
+    Pins a process to a single logical CPU core. Consecutive indices are spread across physical cores first, i.e. a process is only pinned
+    to a hyperthreading sibling of another logical core once every physical core is in use.
+
+    :param index: An arbitrary non-negative number. The process is pinned to the logical core ``index`` modulo the number of cores (in
+                  the order determined by ``spread_across_physical_cores``).
+    :param pid: The process to pin. Optional. Defaults to the current process.
+    :return: The logical core to which the process has been pinned or ``None`` if CPU affinity is unsupported on this platform.
+    """
+    try:
+        process = psutil.Process(pid)
+        available_cores = spread_across_physical_cores(process.cpu_affinity())
+        core = available_cores[index % len(available_cores)]
+        process.cpu_affinity([core])
+        return core
+    except (AttributeError, NotImplementedError, OSError):
+        return None
+
+
+def spread_across_physical_cores(logical_cores, thread_siblings=None):
+    """
+    :param logical_cores: A list of logical CPU cores.
+    :param thread_siblings: A function that returns an identifier of the physical core of a logical core or ``None`` if it is unknown.
+                            Optional. Defaults to reading the CPU topology on Linux.
+    :return: The logical cores ordered such that the first logical core of each physical core precedes the second logical core of any
+             physical core and so on. If the CPU topology is unknown, the logical cores are returned in their original order.
+    """
+    if thread_siblings is None:
+        thread_siblings = _thread_siblings
+    physical_cores = {}
+    for core in logical_cores:
+        physical_core = thread_siblings(core)
+        if physical_core is None:
+            return logical_cores
+        physical_cores.setdefault(physical_core, []).append(core)
+    siblings = sorted(sorted(cores) for cores in physical_cores.values())
+    ordered = []
+    for rank in range(max((len(cores) for cores in siblings), default=0)):
+        ordered.extend(cores[rank] for cores in siblings if rank < len(cores))
+    return ordered
+
+
+def _thread_siblings(logical_core):
+    try:
+        with open("/sys/devices/system/cpu/cpu%d/topology/thread_siblings_list" % logical_core) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
 def cpu_model():
     """
     :return: The CPU model name.
@@ -41,6 +41,7 @@ setup(name="esrally",
       long_description=long_description,
       url="https://github.com/elastic/rally",
       license="Apache License, Version 2.0",
+      python_requires=">=3.5",
       packages=find_packages(
           where=".",
           exclude=("tests*",)
@@ -51,7 +52,7 @@ setup(name="esrally",
       test_suite="tests",
       tests_require=tests_require,
       entry_points={
-          "console_scripts": ["esrally=esrally.rally:main"],
+          "console_scripts": ["esrally=esrally.rally:main", "esrallyd=esrally.rallyd:main"],
       },
       classifiers=[
           "Topic :: System :: Benchmark",
@@ -62,7 +63,6 @@ setup(name="esrally",
           "Operating System :: POSIX",
           "Programming Language :: Python",
           "Programming Language :: Python :: 3",
-          "Programming Language :: Python :: 3.4",
           "Programming Language :: Python :: 3.5",
           "Programming Language :: Python :: 3.6"
       ],
@@ -0,0 +1,75 @@
+import asyncio
+import socket
+from unittest import TestCase
+
+import elasticsearch
+
+from esrally import client
+
+
+def run_async(coroutine_function):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine_function())
+    finally:
+        loop.close()
+
+
+def unused_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class AsyncEsClientTests(TestCase):
+    RESPONSE = b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 11\r\n\r\n{\"took\":1}\n"
+
+    def test_refused_connection_raises_connection_error(self):
+        es = client.AsyncEsClient([{"host": "127.0.0.1", "port": unused_port()}], {"timeout": 5})
+
+        async def search():
+            await es.search(index="test", body={"query": {"match_all": {}}})
+
+        with self.assertRaises(elasticsearch.ConnectionError):
+            run_async(search)
+
+    def test_retries_once_if_idle_connection_has_been_closed(self):
+        handlers = []
+
+        async def handle(reader, writer):
+            handlers.append(asyncio.current_task())
+            requests = 0
+            while True:
+                # read the request header (there is no request body)
+                line = await reader.readline()
+                if not line:
+                    writer.close()
+                    return
+                while line != b"\r\n":
+                    line = await reader.readline()
+                requests += 1
+                if requests > 1:
+                    # the client keeps the connection alive but the server closes it without a response
+                    writer.close()
+                    return
+                writer.write(AsyncEsClientTests.RESPONSE)
+                await writer.drain()
+
+        async def search_twice():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            es = client.AsyncEsClient([{"host": "127.0.0.1", "port": port}], {"timeout": 5})
+            try:
+                first = await es.search(index="test")
+                second = await es.search(index="test")
+                return first, second
+            finally:
+                es.close()
+                await asyncio.gather(*handlers)
+                server.close()
+                await server.wait_closed()
+
+        first, second = run_async(search_twice)
+        self.assertEqual({"took": 1}, first)
+        self.assertEqual({"took": 1}, second)
+        self.assertEqual(2, len(handlers))
@@ -0,0 +1,193 @@
+import asyncio
+import concurrent.futures
+import time
+import unittest.mock as mock
+from unittest import TestCase
+
+import elasticsearch
+
+from esrally import metrics, track
+from esrally.driver import driver, async_driver, runner
+from esrally.track import params
+
+
+class AsyncDriverTestParamSource:
+    def __init__(self, indices=None, params=None):
+        if params is None:
+            params = {}
+        self._indices = indices
+        self._params = params
+
+    def partition(self, partition_index, total_partitions):
+        return self
+
+    def size(self):
+        return self._params["size"] if "size" in self._params else 1
+
+    def params(self):
+        return self._params
+
+
+class AsyncEsClient:
+    def __init__(self, bulk_response=None, error=None, delay=None):
+        self.bulk_response = bulk_response
+        self.error = error
+        self.delay = delay
+        self.bulk_calls = 0
+
+    async def bulk(self, body, index=None, doc_type=None, params=None):
+        self.bulk_calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.bulk_response
+
+
+def run_async(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class AsyncExecutorTests(TestCase):
+    def setUp(self):
+        params.register_param_source_for_name("async-driver-test-param-source", AsyncDriverTestParamSource)
+        self.test_track = track.Track(name="unittest", short_description="unittest track", description="unittest track",
+                                      source_root_url="http://example.org",
+                                      indices=None,
+                                      challenges=None)
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_execute_schedule_with_async_runner(self):
+        async_es = AsyncEsClient(bulk_response={"errors": False})
+        task = track.Task(track.Operation("bulk-index", track.OperationType.Index.name, params={
+            "body": ["action_metadata_line", "index_line"],
+            "action_metadata_present": True,
+            "size": 10
+        },
+                                          param_source="async-driver-test-param-source"),
+                          warmup_iterations=0, iterations=10, clients=1)
+        schedule = driver.schedule_for(self.test_track, task, 0, asynchronous=True)
+        sampler = driver.Sampler(client_id=3, task=task, start_timestamp=0)
+
+        run_async(async_driver.execute_schedule_async(schedule, None, async_es, sampler, self.pool))
+
+        samples = sampler.samples
+        self.assertEqual(10, len(samples))
+        self.assertEqual(10, async_es.bulk_calls)
+        for sample in samples:
+            self.assertEqual(3, sample.client_id)
+            self.assertEqual(metrics.SampleType.Normal, sample.sample_type)
+            self.assertEqual(1, sample.total_ops)
+            self.assertEqual("docs", sample.total_ops_unit)
+            self.assertEqual(sample.latency_ms, sample.service_time_ms)
+
+    def test_execute_throttled_schedule_does_not_wait_for_responses(self):
+        # each response takes longer than the waiting time between two requests
+        async_es = AsyncEsClient(bulk_response={"errors": False}, delay=0.2)
+        task = track.Task(track.Operation("bulk-index", track.OperationType.Index.name, params={
+            "body": ["action_metadata_line", "index_line"],
+            "action_metadata_present": True,
+            "size": 10
+        },
+                                          param_source="async-driver-test-param-source"),
+                          warmup_iterations=0, iterations=10, clients=1, target_throughput=100)
+        schedule = driver.schedule_for(self.test_track, task, 0, asynchronous=True)
+        sampler = driver.Sampler(client_id=0, task=task, start_timestamp=0)
+
+        start = time.perf_counter()
+        run_async(async_driver.execute_schedule_async(schedule, None, async_es, sampler, self.pool))
+        duration = time.perf_counter() - start
+
+        samples = sampler.samples
+        self.assertEqual(10, len(samples))
+        # a closed-loop client would need at least 10 * 0.2 seconds
+        self.assertTrue(duration < 1.0, msg="Expected schedule to complete in less than one second but took [%f] seconds." % duration)
+        for sample in samples:
+            self.assertTrue(sample.latency_ms >= sample.service_time_ms)
+
+    def test_throughput_search_evaluates_delayed_responses_in_their_own_step(self):
+        task = track.Task(track.Operation("bulk-index", track.OperationType.Index.name, params={
+            "body": ["action_metadata_line", "index_line"],
+            "action_metadata_present": True
+        },
+                                          param_source="async-driver-test-param-source"))
+        search = driver.ThroughputSearch({
+            "min-throughput": 10,
+            "max-throughput": 20,
+            "latency-slo": 100,
+            "step-duration": 0.2,
+            "precision": 0.2
+        })
+
+        class SlowAtHighThroughputEsClient(AsyncEsClient):
+            async def bulk(self, body, index=None, doc_type=None, params=None):
+                # responses at high throughput take longer than a step
+                self.delay = 0.3 if search.target_throughput > 15 else 0.01
+                return await super().bulk(body, index, doc_type, params)
+
+        async_es = SlowAtHighThroughputEsClient(bulk_response={"errors": False})
+        sampler = driver.Sampler(client_id=0, task=task, start_timestamp=0)
+        sampler.add_observer(search.record)
+        schedule = driver.throughput_search_based(search, "deterministic", {}, runner.runner_for(track.OperationType.Index.name,
+                                                                                                  asynchronous=True),
+                                                  AsyncDriverTestParamSource(params=task.operation.params), sampler)
+
+        run_async(async_driver.execute_schedule_async(schedule, None, async_es, sampler, self.pool))
+
+        # 10 (met) -> 20 (violated) -> 15 (met) -> 17.5 (violated). If slow responses of a step were attributed to the next one, 15 would
+        # violate the SLO as well.
+        self.assertEqual(4, search.steps)
+        self.assertEqual(15, search.capacity)
+        self.assertEqual(0, search.pending)
+
+    def test_execute_single_async_records_http_errors(self):
+        async_es = AsyncEsClient(error=elasticsearch.TransportError(429, "es_rejected_execution_exception"))
+        bulk_params = {
+            "body": ["action_metadata_line", "index_line"],
+            "action_metadata_present": True
+        }
+
+        total_ops, total_ops_unit, request_meta_data = run_async(
+            async_driver.execute_single_async(runner.AsyncBulkIndex(), None, async_es, bulk_params, self.pool))
+
+        self.assertEqual(0, total_ops)
+        self.assertEqual("ops", total_ops_unit)
+        self.assertEqual({
+            "http_status": 429,
+            "error_description": "es_rejected_execution_exception"
+        }, request_meta_data)
+
+    def test_execute_single_async_runs_sync_runner_in_pool(self):
+        es = mock.Mock()
+        sync_runner = runner.DelegatingRunner(lambda es, params: (5, "MB"))
+
+        total_ops, total_ops_unit, request_meta_data = run_async(
+            async_driver.execute_single_async(sync_runner, es, None, {}, self.pool))
+
+        self.assertEqual(5, total_ops)
+        self.assertEqual("MB", total_ops_unit)
+        self.assertIsNone(request_meta_data)
+
+
+class AsyncRunnerRegistryTests(TestCase):
+    def test_prefers_async_runner_if_available(self):
+        self.assertIsInstance(runner.runner_for(track.OperationType.Index.name), runner.BulkIndex)
+        self.assertIsInstance(runner.runner_for(track.OperationType.Index.name, asynchronous=True), runner.AsyncBulkIndex)
+        # there is no asynchronous implementation so we fall back to the synchronous one
+        self.assertIsInstance(runner.runner_for(track.OperationType.ForceMerge.name, asynchronous=True), runner.ForceMerge)
+
+    def test_async_only_runner_requires_async_engine(self):
+        async def user_defined(es, params):
+            return 1, "ops"
+
+        runner.register_runner("async-only-unit-test", user_defined)
+        self.assertTrue(runner.is_async(runner.runner_for("async-only-unit-test", asynchronous=True)))
+        with self.assertRaises(Exception):
+            runner.runner_for("async-only-unit-test")
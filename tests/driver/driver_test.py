@@ -1,7 +1,13 @@
+import socket
+import subprocess
+import sys
+import time
 import unittest.mock as mock
 from unittest import TestCase
 
-from esrally import metrics, track
+import thespian.actors
+
+from esrally import exceptions, metrics, track
 from esrally.driver import driver
 from esrally.track import params
 from esrally.utils import io
@@ -160,6 +166,25 @@ class AllocatorTests(TestCase):
         self.assertEqual([{op1, op2, op3}], allocator.operations_per_joinpoint)
 
 
+class WorkerAllocationTests(TestCase):
+    def test_distributes_clients_round_robin(self):
+        allocations = [["client-0"], ["client-1"], ["client-2"], ["client-3"], ["client-4"]]
+
+        workers = driver.allocate_clients_to_workers(allocations, 2)
+
+        self.assertEqual([
+            {0: ["client-0"], 2: ["client-2"], 4: ["client-4"]},
+            {1: ["client-1"], 3: ["client-3"]}
+        ], workers)
+
+    def test_uses_at_most_one_worker_per_client(self):
+        allocations = [["client-0"], ["client-1"]]
+
+        workers = driver.allocate_clients_to_workers(allocations, 8)
+
+        self.assertEqual([{0: ["client-0"]}, {1: ["client-1"]}], workers)
+
+
 class IndexManagementTests(TestCase):
     @mock.patch("elasticsearch.Elasticsearch")
     def test_setup_auto_managed_index(self, es):
@@ -236,6 +261,130 @@ class MetricsAggregationTests(TestCase):
         self.assertEqual((1470838600, 26, metrics.SampleType.Normal, 6666.666666666667, "docs/s"), throughput[5])
         # self.assertEqual((1470838600.5, 26.5, metrics.SampleType.Normal, 10000), throughput[6])
 
+    def test_incremental_metrics_aggregation(self):
+        task = track.Task(track.Operation("index", track.OperationType.Index, param_source="driver-test-param-source"), clients=2)
+
+        samples = [
+            driver.Sample(0, 1470838595, 21, task, metrics.SampleType.Warmup, None, -1, -1, 5000, "docs", 1, 1 / 9),
+            driver.Sample(0, 1470838596, 22, task, metrics.SampleType.Normal, None, -1, -1, 5000, "docs", 2, 2 / 9),
+            driver.Sample(0, 1470838597, 23, task, metrics.SampleType.Normal, None, -1, -1, 5000, "docs", 3, 3 / 9),
+            driver.Sample(0, 1470838598, 24, task, metrics.SampleType.Normal, None, -1, -1, 5000, "docs", 4, 4 / 9),
+            driver.Sample(1, 1470838598.5, 24.5, task, metrics.SampleType.Normal, None, -1, -1, 5000, "docs", 4.5, 7 / 9),
+            driver.Sample(0, 1470838599, 25, task, metrics.SampleType.Normal, None, -1, -1, 5000, "docs", 5, 5 / 9),
+            driver.Sample(1, 1470838599.5, 25.5, task, metrics.SampleType.Normal, None, -1, -1, 5000, "docs", 5.5, 8 / 9),
+            driver.Sample(0, 1470838600, 26, task, metrics.SampleType.Normal, None, -1, -1, 5000, "docs", 6, 6 / 9),
+            driver.Sample(1, 1470838600.5, 26.5, task, metrics.SampleType.Normal, None, -1, -1, 5000, "docs", 6.5, 9 / 9)
+        ]
+
+        calculator = driver.ThroughputCalculator()
+        # only client 0 has reported samples so far
+        calculator.add(samples[:4])
+        self.assertEqual({}, calculator.calculate())
+        # both clients have reported samples up to 1470838598.5
+        calculator.add(samples[4:6])
+        throughput = calculator.calculate()[task]
+        self.assertEqual(4, len(throughput))
+        self.assertEqual((1470838598, 24, metrics.SampleType.Normal, 5000, "docs/s"), throughput[-1])
+
+        calculator.add(samples[6:])
+        throughput += calculator.calculate(final=True)[task]
+
+        self.assertEqual(driver.calculate_global_throughput(samples)[task], throughput)
+
+    def test_throughput_series_per_client_and_host(self):
+        task = track.Task(track.Operation("index", track.OperationType.Index, param_source="driver-test-param-source"), clients=2)
+
+        samples = [
+            driver.Sample(0, 1000.5, 0.5, task, metrics.SampleType.Normal, None, -1, -1, 100, "docs", 0.5, 0.25),
+            driver.Sample(1, 1000.75, 0.75, task, metrics.SampleType.Normal, None, -1, -1, 200, "docs", 0.75, 0.25),
+            driver.Sample(0, 1001.0, 1.0, task, metrics.SampleType.Normal, None, -1, -1, 100, "docs", 1.0, 0.5),
+            driver.Sample(1, 1002.5, 2.5, task, metrics.SampleType.Normal, None, -1, -1, 200, "docs", 2.5, 1.0),
+            driver.Sample(0, 1003.5, 3.5, task, metrics.SampleType.Normal, None, -1, -1, 100, "docs", 3.5, 1.0)
+        ]
+
+        calculator = driver.ThroughputCalculator(bucket_interval_secs=2, per_client=True, client_hosts={0: "10.0.0.1", 1: "10.0.0.1"})
+        calculator.add(samples)
+        calculator.calculate()
+        # the task has started at 1000 and all clients have reported samples until 1002.5 so only the first bucket [1000, 1002) is complete
+        self.assertEqual([
+            ("client_throughput", task, 0, 1002.0, 2.0, metrics.SampleType.Normal, 100.0, "docs/s"),
+            ("client_throughput", task, 1, 1002.0, 2.0, metrics.SampleType.Normal, 100.0, "docs/s"),
+            ("host_throughput", task, "10.0.0.1", 1002.0, 2.0, metrics.SampleType.Normal, 200.0, "docs/s")
+        ], calculator.pop_series())
+
+        calculator.calculate(final=True)
+        self.assertEqual([
+            ("client_throughput", task, 0, 1004.0, 4.0, metrics.SampleType.Normal, 50.0, "docs/s"),
+            ("client_throughput", task, 1, 1004.0, 4.0, metrics.SampleType.Normal, 100.0, "docs/s"),
+            ("host_throughput", task, "10.0.0.1", 1004.0, 4.0, metrics.SampleType.Normal, 150.0, "docs/s")
+        ], calculator.pop_series())
+
+
+class SamplerTests(TestCase):
+    def test_retrieves_samples_incrementally(self):
+        task = track.Task(track.Operation("index", track.OperationType.Index, param_source="driver-test-param-source"))
+        sampler = driver.Sampler(client_id=1, task=task, start_timestamp=0, block_size=3)
+
+        for i in range(4):
+            sampler.add(metrics.SampleType.Warmup, None, 10 + i, 5 + i, 1000, "docs", i, i / 8)
+        samples = sampler.samples
+        self.assertEqual(4, len(samples))
+        self.assertEqual([10, 11, 12, 13], [s.latency_ms for s in samples])
+
+        for i in range(4, 8):
+            meta_data = {"success": False} if i == 6 else None
+            sampler.add(metrics.SampleType.Normal, meta_data, 10 + i, 5 + i, 1, "ops" if i == 7 else "docs", i, i / 8)
+        samples = sampler.samples
+        self.assertEqual(4, len(samples))
+        self.assertEqual([14, 15, 16, 17], [s.latency_ms for s in samples])
+        self.assertEqual([None, None, {"success": False}, None], [s.request_meta_data for s in samples])
+        self.assertEqual(["docs", "docs", "docs", "ops"], [s.total_ops_unit for s in samples])
+
+        last = samples[-1]
+        self.assertEqual(1, last.client_id)
+        self.assertEqual(task, last.task)
+        self.assertEqual(metrics.SampleType.Normal, last.sample_type)
+        self.assertEqual(12, last.service_time_ms)
+        self.assertEqual(7 / 8, last.percent_completed)
+
+        # all blocks except the one that is currently written have been released
+        self.assertEqual(1, len(sampler.blocks))
+        self.assertEqual(0, len(sampler.samples))
+
+    def test_retrieves_samples_at_block_boundaries(self):
+        task = track.Task(track.Operation("index", track.OperationType.Index, param_source="driver-test-param-source"))
+        sampler = driver.Sampler(client_id=1, task=task, start_timestamp=0, block_size=4)
+
+        for i in range(4):
+            sampler.add(metrics.SampleType.Normal, None, i, i, 1, "docs", i, i / 8)
+        # the only block is full but the writer has not started a new one yet
+        self.assertEqual([0, 1, 2, 3], [s.latency_ms for s in sampler.samples])
+        self.assertEqual(0, len(sampler.samples))
+
+        for i in range(4, 8):
+            sampler.add(metrics.SampleType.Normal, None, i, i, 1, "docs", i, i / 8)
+        self.assertEqual([4, 5, 6, 7], [s.latency_ms for s in sampler.samples])
+        self.assertEqual(1, len(sampler.blocks))
+
+        sampler.add(metrics.SampleType.Normal, None, 8, 8, 1, "docs", 8, 1.0)
+        self.assertEqual([8], [s.latency_ms for s in sampler.samples])
+
+    def test_records_histograms_per_sample_type(self):
+        task = track.Task(track.Operation("index", track.OperationType.Index, param_source="driver-test-param-source"))
+        sampler = driver.Sampler(client_id=1, task=task, start_timestamp=0)
+
+        sampler.add(metrics.SampleType.Warmup, None, 100, 50, 1000, "docs", 1, 0.25)
+        for i in range(1, 4):
+            sampler.add(metrics.SampleType.Normal, None, 10 * i, 5 * i, 1000, "docs", 1 + i, 0.25 + 0.25 * i)
+
+        histograms = {(sample_type, name): h for t, sample_type, name, h in sampler.histograms if t == task}
+        self.assertEqual(4, len(histograms))
+        self.assertEqual(1, histograms[(metrics.SampleType.Warmup, "latency")].total_count)
+        self.assertEqual(100, histograms[(metrics.SampleType.Warmup, "latency")].max)
+        self.assertEqual(3, histograms[(metrics.SampleType.Normal, "service_time")].total_count)
+        self.assertEqual(15, histograms[(metrics.SampleType.Normal, "service_time")].max)
+        self.assertEqual(10, histograms[(metrics.SampleType.Normal, "latency")].min)
+
 
 class SchedulerTests(ScheduleTestCase):
     def setUp(self):
@@ -262,6 +411,16 @@ class SchedulerTests(ScheduleTestCase):
         ]
         self.assert_schedule(expected_schedule, schedule)
 
+    def test_search_task_with_load_profile_does_not_start_at_once(self):
+        task = track.Task(track.Operation("search", track.OperationType.Search.name, param_source="driver-test-param-source"),
+                          warmup_iterations=0, iterations=5, clients=1, target_throughput=10,
+                          load_profile=[{"type": "ramp", "duration": 10, "from": 0, "to": 1}])
+        schedule = list(driver.schedule_for(self.test_track, task, 0))
+
+        self.assertEqual(5, len(schedule))
+        # the ramp starts at zero throughput so no request is issued at the start of the task
+        self.assertTrue(all(invocation_time > 0 for invocation_time, _, _, _, _ in schedule))
+
     def test_search_task_two_clients(self):
         task = track.Task(track.Operation("search", track.OperationType.Search.name, param_source="driver-test-param-source"),
                           warmup_iterations=2, iterations=10, clients=2, target_throughput=10)
@@ -277,6 +436,43 @@ class SchedulerTests(ScheduleTestCase):
         ]
         self.assert_schedule(expected_schedule, schedule)
 
+    def test_search_task_with_poisson_schedule(self):
+        task = track.Task(track.Operation("search", track.OperationType.Search.name, param_source="driver-test-param-source"),
+                          warmup_iterations=0, iterations=100, clients=1, target_throughput=10, schedule="poisson")
+        schedule = list(driver.schedule_for(self.test_track, task, 0))
+
+        self.assertEqual(100, len(schedule))
+        previous_invocation_time = 0
+        for invocation_time, sample_type, progress_percent, runner, params in schedule:
+            self.assertTrue(invocation_time >= previous_invocation_time)
+            previous_invocation_time = invocation_time
+        # intended start times are independent of the actual execution and thus known upfront: roughly 100 requests at 10 ops/s
+        self.assertTrue(5 < previous_invocation_time < 20)
+
+    def test_search_task_with_prefetched_parameters(self):
+        task = track.Task(track.Operation("search", track.OperationType.Search.name, param_source="driver-test-param-source"),
+                          warmup_iterations=1, iterations=3, clients=1, target_throughput=10)
+        sampler = driver.Sampler(client_id=0, task=task, start_timestamp=0)
+        schedule = driver.schedule_for(self.test_track, task, 0, sampler=sampler, prefetch_size=2)
+
+        self.assert_schedule([
+            (0, metrics.SampleType.Warmup, 1 / 4, {}),
+            (0.1, metrics.SampleType.Normal, 2 / 4, {}),
+            (0.2, metrics.SampleType.Normal, 3 / 4, {}),
+            (0.3, metrics.SampleType.Normal, 4 / 4, {}),
+        ], schedule)
+        self.assertEqual(1, len(sampler.results))
+        _, name, underruns, _ = sampler.results[0]
+        self.assertEqual("parameter_underruns", name)
+        self.assertTrue(underruns >= 0)
+
+    def test_cannot_prefetch_parameters_for_asynchronous_schedule(self):
+        task = track.Task(track.Operation("search", track.OperationType.Search.name, param_source="driver-test-param-source"),
+                          warmup_iterations=1, iterations=3, clients=1)
+        sampler = driver.Sampler(client_id=0, task=task, start_timestamp=0)
+        with self.assertRaises(exceptions.RallyAssertionError):
+            driver.schedule_for(self.test_track, task, 0, asynchronous=True, sampler=sampler, prefetch_size=2)
+
     def test_schedule_for_warmup_time_based(self):
         task = track.Task(track.Operation("time-based", track.OperationType.Index.name, params={"body": ["a"], "size": 11},
                                           param_source="driver-test-param-source"),
@@ -298,6 +494,35 @@ class SchedulerTests(ScheduleTestCase):
             (10.0, metrics.SampleType.Normal, 11 / 11, {"body": ["a"], "size": 11}),
         ], list(invocations))
 
+    def test_schedule_runs_until_param_source_of_unknown_size_is_exhausted(self):
+        class UnknownSizeParamSource:
+            def __init__(self, indices, params):
+                self.remaining = 3
+                self.percent_completed = 0.0
+
+            def partition(self, partition_index, total_partitions):
+                return self
+
+            def size(self):
+                return None
+
+            def params(self):
+                if self.remaining == 0:
+                    raise StopIteration()
+                self.remaining -= 1
+                self.percent_completed = (3 - self.remaining) / 4
+                return {"remaining": self.remaining}
+
+        params.register_param_source_for_name("unknown-size-param-source", UnknownSizeParamSource)
+        task = track.Task(track.Operation("time-based", track.OperationType.Index.name, param_source="unknown-size-param-source"),
+                          warmup_time_period=0, clients=1, target_throughput=1)
+
+        self.assert_schedule([
+            (0.0, metrics.SampleType.Normal, 1 / 4, {"remaining": 2}),
+            (1.0, metrics.SampleType.Normal, 2 / 4, {"remaining": 1}),
+            (2.0, metrics.SampleType.Normal, 3 / 4, {"remaining": 0}),
+        ], list(driver.schedule_for(self.test_track, task, 0)))
+
     def test_schedule_for_time_based(self):
         task = track.Task(track.Operation("time-based", track.OperationType.Index.name, params={"body": ["a"], "size": 11},
                                           param_source="driver-test-param-source"), warmup_time_period=0.1, time_period=0.1, clients=1)
@@ -323,6 +548,67 @@ class SchedulerTests(ScheduleTestCase):
             self.assertEqual({"body": ["a"], "size": 11}, params)
 
 
+class ThroughputSearchTests(TestCase):
+    def test_searches_highest_throughput_that_meets_slo(self):
+        task = track.Task(track.Operation("search", track.OperationType.Search.name, param_source="driver-test-param-source"))
+        sampler = driver.Sampler(client_id=0, task=task, start_timestamp=0)
+        search = driver.ThroughputSearch({
+            "min-throughput": 20,
+            "max-throughput": 200,
+            "latency-slo": 100,
+            "step-duration": 1,
+            "step-warmup-time-period": 0.5
+        }, clients=2)
+        sampler.add_observer(search.record)
+
+        schedule = driver.throughput_search_based(search, "deterministic", {}, runner=None, params=DriverTestParamSource(),
+                                                  sampler=sampler)
+        previous_invocation_time = -1
+        warmup_samples = 0
+        for invocation_time, sample_type, progress_percent, runner, params in schedule:
+            self.assertTrue(invocation_time > previous_invocation_time)
+            previous_invocation_time = invocation_time
+            if sample_type == metrics.SampleType.Warmup:
+                warmup_samples += 1
+            # Elasticsearch can sustain up to 35 ops/s per client
+            latency = 10 if search.target_throughput <= 35 else 500
+            sampler.add(sample_type, None, latency, latency, 1, "ops", 0, progress_percent)
+
+        # 10 (met) -> 20 (met) -> 40 (violated) -> 30 (met) -> 35 (met) -> 37.5 (violated) -> 36.25 (violated)
+        self.assertEqual(7, search.steps)
+        self.assertEqual(35, search.capacity)
+        self.assertTrue(warmup_samples > 0)
+        self.assertEqual([(task, "throughput_capacity", 35, "ops/s")], sampler.results)
+
+    def test_capacity_is_zero_if_minimum_throughput_violates_slo(self):
+        search = driver.ThroughputSearch({"min-throughput": 10, "max-throughput": 100, "latency-slo": 100})
+        search.record(metrics.SampleType.Normal, None, 200, 200)
+
+        self.assertFalse(search.next_step())
+        self.assertEqual(0, search.capacity)
+
+    def test_stops_at_maximum_throughput(self):
+        search = driver.ThroughputSearch({"min-throughput": 10, "max-throughput": 30, "latency-slo": 100, "ramp-factor": 2})
+        steps = 0
+        while True:
+            steps += 1
+            search.record(metrics.SampleType.Normal, None, 10, 10)
+            if not search.next_step():
+                break
+
+        # 10 -> 20 -> 30
+        self.assertEqual(3, steps)
+        self.assertEqual(30, search.capacity)
+
+    def test_errors_violate_slo(self):
+        search = driver.ThroughputSearch({"min-throughput": 10, "max-throughput": 100, "latency-slo": 100, "max-error-rate": 0.1})
+        for i in range(10):
+            search.record(metrics.SampleType.Normal, {"success": False} if i < 2 else None, 10, 10)
+
+        self.assertFalse(search.next_step())
+        self.assertEqual(0, search.capacity)
+
+
 class ExecutorTests(TestCase):
     class NoopContextManager:
         def __init__(self, mock):
@@ -482,3 +768,92 @@ class ExecutorTests(TestCase):
     def test_execute_single_with_key_error(self):
         # TODO dm: Implement a mock that throws a KeyError when called (simulates missing parameters)
         pass
+
+
+class LoadDriverHostTests(TestCase):
+    def test_local_load_drivers_have_no_requirements(self):
+        self.assertIsNone(driver.load_driver_requirements("localhost"))
+        self.assertIsNone(driver.load_driver_requirements("127.0.0.1"))
+        self.assertEqual({"ip": "10.17.0.5"}, driver.load_driver_requirements("10.17.0.5"))
+
+    @mock.patch("socket.getaddrinfo")
+    @mock.patch("socket.gethostname")
+    def test_addresses_of_this_machine_are_local(self, mock_gethostname, mock_getaddrinfo):
+        mock_gethostname.return_value = "loaddriver01"
+        mock_getaddrinfo.side_effect = lambda name, port: [(None, None, None, "", ("192.168.14.77" if name == "loaddriver01" else
+                                                                                    "127.0.0.1", 0))]
+
+        self.assertTrue(driver.is_local_load_driver("192.168.14.77"))
+        self.assertTrue(driver.is_local_load_driver("127.0.0.1"))
+        self.assertFalse(driver.is_local_load_driver("192.168.14.78"))
+
+    def test_capability_check(self):
+        capabilities = {"ip": "10.17.0.5", "Admin Port": 1900}
+        self.assertTrue(driver.load_driver_capability_check(capabilities, None))
+        self.assertTrue(driver.load_driver_capability_check(capabilities, {"ip": "10.17.0.5"}))
+        self.assertFalse(driver.load_driver_capability_check(capabilities, {"ip": "10.17.0.6"}))
+        self.assertFalse(driver.load_driver_capability_check({}, {"ip": "10.17.0.6"}))
+
+    def test_estimate_clock_offset_based_on_shortest_round_trip(self):
+        samples = [
+            # long round trip
+            (10.0, 110.5, 11.0),
+            # shortest round trip
+            (12.0, 112.01, 12.02),
+            (13.0, 113.1, 13.1)
+        ]
+        self.assertAlmostEqual(100.0, driver.estimate_clock_offset(samples))
+
+
+class DistributedLoadDriverTests(TestCase):
+    """
+    Runs a coordinator and a load driver actor system on the loopback interface (as two ``esrallyd`` daemons with separate admin ports).
+    """
+
+    @staticmethod
+    def free_port():
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
+
+    @staticmethod
+    def rallyd(*args):
+        subprocess.check_call([sys.executable, "-m", "esrally.rallyd"] + list(args), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def setUp(self):
+        self.coordinator_port = DistributedLoadDriverTests.free_port()
+        self.load_driver_port = DistributedLoadDriverTests.free_port()
+        self.rallyd("start", "--node-ip", "127.0.0.1", "--coordinator-ip", "127.0.0.1", "--coordinator-port", str(self.coordinator_port),
+                    "--admin-port", str(self.coordinator_port))
+        self.rallyd("start", "--node-ip", "127.0.0.2", "--coordinator-ip", "127.0.0.1", "--coordinator-port", str(self.coordinator_port),
+                    "--admin-port", str(self.load_driver_port))
+
+    def tearDown(self):
+        self.rallyd("stop", "--admin-port", str(self.load_driver_port))
+        self.rallyd("stop", "--admin-port", str(self.coordinator_port))
+
+    def create_load_generator(self, actor_system, host, timeout=10):
+        # the load driver actor system joins the coordinator's convention asynchronously
+        deadline = time.perf_counter() + timeout
+        while True:
+            try:
+                return actor_system.createActor(driver.LoadGenerator, targetActorRequirements=driver.load_driver_requirements(host))
+            except thespian.actors.NoCompatibleSystemForActor:
+                if time.perf_counter() > deadline:
+                    raise
+                time.sleep(0.2)
+
+    def test_runs_load_generator_in_actor_system_of_load_driver_host(self):
+        actor_system = thespian.actors.ActorSystem("multiprocTCPBase", capabilities={"Admin Port": self.coordinator_port},
+                                                   transientUnique=True)
+        self.assertFalse(driver.is_local_load_driver("127.0.0.2"))
+
+        # the coordinator's actor system does not satisfy the requirements of this load generator, so it runs on the other one
+        load_generator = self.create_load_generator(actor_system, "127.0.0.2")
+        response = actor_system.ask(load_generator, driver.ClockSyncRequest(7), 10)
+        self.assertIsInstance(response, driver.ClockSyncResponse)
+        self.assertEqual(7, response.worker_id)
+        actor_system.tell(load_generator, thespian.actors.ActorExitRequest())
+
+        with self.assertRaises(thespian.actors.NoCompatibleSystemForActor):
+            self.create_load_generator(actor_system, "127.0.0.3", timeout=0)
@@ -0,0 +1,57 @@
+import json
+import urllib.request
+from unittest import TestCase
+
+from esrally import metrics, track
+from esrally.driver import driver, live_stats
+
+
+class LiveStatsTests(TestCase):
+    def setUp(self):
+        self.task = track.Task(track.Operation("index", track.OperationType.Index.name, params=None), clients=2)
+
+    def batch(self, client_id, start, end, latency_ms, error_every=None):
+        batch = driver.SampleBatch(client_id, self.task)
+        for i in range(start, end):
+            meta_data = {"success": False} if error_every and i % error_every == 0 else None
+            batch.append(1000 + i / 10, i / 10, metrics.SampleType.Normal, meta_data, latency_ms, latency_ms, 100, "docs", 0.1,
+                         (i + 1) / end)
+        return batch
+
+    def test_rolling_statistics(self):
+        stats = live_stats.LiveStats(window_secs=5)
+        # 20 seconds of samples, ten requests per second and client
+        stats.add_batch(self.batch(client_id=0, start=0, end=200, latency_ms=10, error_every=10))
+        stats.add_batch(self.batch(client_id=1, start=0, end=200, latency_ms=20))
+
+        snapshot = stats.snapshot()
+        self.assertEqual(1, len(snapshot))
+        s = snapshot[0]
+        self.assertEqual("index", s["operation"])
+        self.assertEqual("normal", s["sample-type"])
+        self.assertEqual("docs/s", s["throughput"]["unit"])
+        # 2 clients * 10 requests per second * 100 docs, only the most recent five seconds are considered
+        self.assertAlmostEqual(2000, s["throughput"]["value"], delta=100)
+        self.assertAlmostEqual(10, s["latency"]["50.0"], delta=0.1)
+        self.assertAlmostEqual(20, s["latency"]["99.0"], delta=0.1)
+        self.assertAlmostEqual(0.05, s["error_rate"], delta=0.01)
+        self.assertEqual(2, s["active_clients"])
+        self.assertEqual(1.0, s["percent_completed"])
+
+        stats.clear()
+        self.assertEqual([], stats.snapshot())
+
+    def test_serves_statistics_via_http(self):
+        stats = live_stats.LiveStats()
+        stats.add_batch(self.batch(client_id=0, start=0, end=20, latency_ms=10))
+        server = live_stats.LiveStatsServer(stats, port=0)
+        server.start()
+        try:
+            with urllib.request.urlopen("http://localhost:%d/stats" % server.port) as response:
+                result = json.loads(response.read().decode("utf-8"))
+        finally:
+            server.close()
+
+        self.assertEqual(1, len(result["tasks"]))
+        self.assertEqual("index", result["tasks"][0]["operation"])
+        self.assertEqual(1, result["tasks"][0]["active_clients"])
@@ -34,6 +34,31 @@ class BulkIndexRunnerTests(TestCase):
 
         es.bulk.assert_called_with(body=bulk_params["body"], params={})
 
+    @mock.patch("elasticsearch.Elasticsearch")
+    def test_bulk_index_success_with_encoded_body(self, es):
+        es.transport.perform_request.return_value = (200, {
+            "errors": False
+        })
+        bulk = runner.BulkIndex()
+
+        bulk_params = {
+            "body": b"index_line\nindex_line\nindex_line\n",
+            "action_metadata_present": False,
+            "index": "test-index",
+            "type": "test-type"
+        }
+
+        result = bulk(es, bulk_params)
+
+        self.assertEqual(3, result["weight"])
+        self.assertEqual(3, result["bulk-size"])
+        self.assertEqual("docs", result["unit"])
+        self.assertEqual(True, result["success"])
+        self.assertEqual(0, result["error-count"])
+
+        es.bulk.assert_not_called()
+        es.transport.perform_request.assert_called_with("POST", "/test-index/test-type/_bulk", params={}, body=bulk_params["body"])
+
     @mock.patch("elasticsearch.Elasticsearch")
     def test_bulk_index_success_without_metadata(self, es):
         es.bulk.return_value = {
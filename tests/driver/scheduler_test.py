@@ -0,0 +1,116 @@
+from unittest import TestCase
+
+from esrally import exceptions
+from esrally.driver import scheduler
+
+
+class SchedulerTests(TestCase):
+    def test_deterministic_scheduler_waits_mean_time(self):
+        s = scheduler.scheduler_for("deterministic", {"target-throughput": 10})
+
+        self.assertAlmostEqual(0.1, s.next(0))
+        self.assertAlmostEqual(0.5, s.next(0.4))
+
+    def test_poisson_scheduler_approximates_target_throughput(self):
+        s = scheduler.scheduler_for("poisson", {"target-throughput": 100})
+
+        current = 0
+        previous = 0
+        for i in range(0, 10000):
+            current = s.next(current)
+            self.assertTrue(current >= previous)
+            previous = current
+        # 10000 requests at 100 ops/s should take roughly 100 seconds
+        self.assertTrue(95 <= current <= 105, msg="Expected 10000 requests to be scheduled within [95, 105] seconds but took [%f]" % current)
+
+    def test_uniform_scheduler_stays_within_bounds(self):
+        s = scheduler.scheduler_for("uniform", {"target-throughput": 10})
+
+        for i in range(0, 1000):
+            wait_time = s.next(1.0) - 1.0
+            self.assertTrue(0 <= wait_time <= 0.2)
+
+    def test_register_custom_scheduler(self):
+        class BurstScheduler:
+            def __init__(self, params):
+                self.burst_size = params["burst-size"]
+                self.wait_time = self.burst_size / params["target-throughput"]
+                self.it = 0
+
+            def next(self, current):
+                self.it += 1
+                return current + self.wait_time if self.it % self.burst_size == 0 else current
+
+        scheduler.register_scheduler("unit-test-burst", BurstScheduler)
+        s = scheduler.scheduler_for("unit-test-burst", {"target-throughput": 10, "burst-size": 2})
+
+        self.assertEqual(0, s.next(0))
+        self.assertAlmostEqual(0.2, s.next(0))
+
+    def test_unknown_scheduler(self):
+        with self.assertRaises(exceptions.SystemSetupError) as ctx:
+            scheduler.scheduler_for("unknown", {"target-throughput": 10})
+        self.assertEqual("No scheduler available for name [unknown]", ctx.exception.args[0])
+
+
+class LoadProfileTests(TestCase):
+    def test_stage_factors(self):
+        profile = scheduler.LoadProfile([
+            {"name": "warm-up", "type": "ramp", "duration": 10, "from": 0, "to": 1},
+            {"type": "steps", "duration": 30, "from": 1, "to": 2, "steps": 3},
+            {"type": "sine", "duration": 40, "mean": 1, "amplitude": 0.5},
+            {"type": "spike", "duration": 10, "peak": 4, "at": 5, "spike-duration": 2}
+        ])
+
+        self.assertEqual(90, profile.duration)
+        self.assertAlmostEqual(0.0, profile.factor(0))
+        self.assertAlmostEqual(0.5, profile.factor(5))
+        self.assertEqual("warm-up", profile.stage_name(5))
+        self.assertAlmostEqual(1.0, profile.factor(15))
+        self.assertAlmostEqual(1.5, profile.factor(25))
+        self.assertAlmostEqual(2.0, profile.factor(35))
+        self.assertEqual("steps-2", profile.stage_name(35))
+        self.assertAlmostEqual(1.5, profile.factor(50))
+        self.assertAlmostEqual(0.5, profile.factor(70))
+        self.assertAlmostEqual(1.0, profile.factor(81))
+        self.assertAlmostEqual(4.0, profile.factor(86))
+        self.assertEqual("spike-4", profile.stage_name(86))
+        # the task continues at its target throughput afterwards
+        self.assertAlmostEqual(1.0, profile.factor(100))
+        self.assertIsNone(profile.stage_name(100))
+
+    def test_invalid_stages(self):
+        with self.assertRaises(exceptions.SystemSetupError) as ctx:
+            scheduler.LoadProfile([{"type": "wave", "duration": 10}])
+        self.assertEqual("Unknown load profile stage type [wave]. Use one of constant, ramp, sine, spike, steps.", ctx.exception.args[0])
+
+        with self.assertRaises(exceptions.SystemSetupError) as ctx:
+            scheduler.LoadProfile([{"type": "ramp"}])
+        self.assertEqual("Load profile stage [1] requires the property 'duration'.", ctx.exception.args[0])
+
+    def test_profiled_scheduler_follows_ramp(self):
+        profile = scheduler.LoadProfile([{"type": "ramp", "duration": 10, "from": 0, "to": 1}])
+        s = scheduler.ProfiledScheduler(scheduler.scheduler_for("deterministic", {"target-throughput": 10}), profile)
+
+        current = 0
+        scheduled = []
+        while current < 20:
+            current = s.next(current)
+            scheduled.append(current)
+        # half of the target throughput on average during the ramp, full target throughput afterwards
+        during_ramp = len([t for t in scheduled if t < 10])
+        after_ramp = len([t for t in scheduled if 10 <= t < 20])
+        self.assertAlmostEqual(50, during_ramp, delta=2)
+        self.assertAlmostEqual(100, after_ramp, delta=2)
+        # requests become more frequent as load rises
+        self.assertTrue(scheduled[1] - scheduled[0] > scheduled[-2] - scheduled[-3])
+
+    def test_profiled_scheduler_delays_first_request(self):
+        profile = scheduler.LoadProfile([{"type": "ramp", "duration": 10, "from": 0, "to": 1}])
+        s = scheduler.ProfiledScheduler(scheduler.scheduler_for("deterministic", {"target-throughput": 10}), profile)
+
+        first = [s.first() for _ in range(100)]
+        # the ramp accumulates the work of one waiting time (0.1 seconds) after sqrt(2) seconds
+        self.assertTrue(all(0 < t <= 1.5 for t in first))
+        # clients start at different times
+        self.assertTrue(len(set(first)) > 1)
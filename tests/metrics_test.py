@@ -1,10 +1,12 @@
 import os
 import datetime
+import tempfile
 import unittest.mock as mock
 from unittest import TestCase
 import elasticsearch.exceptions
 
 from esrally import config, metrics, track, exceptions
+from esrally.utils import histogram
 
 
 class MockClientFactory:
@@ -107,6 +109,97 @@ class EsClientTests(TestCase):
                          "store on host [127.0.0.1] at port [9243].", ctx.exception.args[0])
 
 
+class BulkFlusherTests(TestCase):
+    class ScriptedBulk:
+        """
+        Simulates ``elasticsearch.helpers.streaming_bulk``. Each call consumes the next list of status codes (one per action).
+        """
+
+        def __init__(self, responses):
+            self.responses = responses
+            self.calls = []
+
+        def __call__(self, client, actions, **kwargs):
+            self.calls.append([a["_source"] for a in actions])
+            statuses = self.responses.pop(0) if self.responses else [201] * len(actions)
+            for status in statuses:
+                if status == 201:
+                    yield True, {"index": {"status": 201}}
+                else:
+                    yield False, {"index": {"status": status, "error": "unit-test"}}
+
+    @mock.patch("esrally.time.sleep")
+    def test_sends_chunks_and_retries_rejected_documents(self, sleep):
+        bulk = BulkFlusherTests.ScriptedBulk([[201, 429], [201]])
+        flusher = metrics.BulkFlusher(client=None, chunk_size=2, concurrency=1, max_retries=3, initial_backoff=2)
+
+        with mock.patch("elasticsearch.helpers.streaming_bulk", bulk):
+            flusher.bulk_index(index="rally-2016", doc_type="metrics", items=[{"n": 1}, {"n": 2}, {"n": 3}, {"n": 4}, {"n": 5}])
+
+        # the rejected document is retried before the next chunk is sent as there is only one worker
+        self.assertEqual([[{"n": 1}, {"n": 2}], [{"n": 2}], [{"n": 3}, {"n": 4}], [{"n": 5}]], bulk.calls)
+        sleep.assert_called_once_with(2)
+
+    @mock.patch("esrally.time.sleep")
+    def test_drops_documents_with_non_retryable_errors(self, sleep):
+        bulk = BulkFlusherTests.ScriptedBulk([[201, 400]])
+        flusher = metrics.BulkFlusher(client=None, chunk_size=10, concurrency=1, max_retries=3)
+
+        with mock.patch("elasticsearch.helpers.streaming_bulk", bulk):
+            flusher.bulk_index(index="rally-2016", doc_type="metrics", items=[{"n": 1}, {"n": 2}])
+
+        self.assertEqual(1, len(bulk.calls))
+        self.assertEqual(0, sleep.call_count)
+
+    @mock.patch("esrally.time.sleep")
+    def test_raises_error_if_documents_cannot_be_sent_without_spool(self, sleep):
+        bulk = BulkFlusherTests.ScriptedBulk([["N/A"], ["N/A"]])
+        flusher = metrics.BulkFlusher(client=None, chunk_size=10, concurrency=1, max_retries=1)
+
+        with mock.patch("elasticsearch.helpers.streaming_bulk", bulk):
+            with self.assertRaises(exceptions.RallyError):
+                flusher.bulk_index(index="rally-2016", doc_type="metrics", items=[{"n": 1}])
+
+    @mock.patch("esrally.time.sleep")
+    def test_spools_and_replays_documents(self, sleep):
+        with tempfile.TemporaryDirectory() as spool_dir:
+            bulk = BulkFlusherTests.ScriptedBulk([[503, 201], [503]])
+            flusher = metrics.BulkFlusher(client=None, chunk_size=10, concurrency=2, max_retries=1, spool_dir=spool_dir)
+
+            with mock.patch("elasticsearch.helpers.streaming_bulk", bulk):
+                flusher.bulk_index(index="rally-2016", doc_type="metrics", items=[{"n": 1}, {"n": 2}])
+            self.assertEqual(1, len(os.listdir(spool_dir)))
+
+            # the metrics store is available again
+            bulk = BulkFlusherTests.ScriptedBulk([])
+            with mock.patch("elasticsearch.helpers.streaming_bulk", bulk):
+                flusher.bulk_index(index="rally-2016", doc_type="metrics", items=[{"n": 3}])
+
+            # spooled documents are replayed after the new documents have been sent successfully
+            self.assertEqual([[{"n": 3}], [{"n": 1}]], bulk.calls)
+            self.assertEqual(0, len(os.listdir(spool_dir)))
+
+    @mock.patch("esrally.time.sleep")
+    def test_stops_retrying_and_replaying_while_metrics_store_is_unavailable(self, sleep):
+        with tempfile.TemporaryDirectory() as spool_dir:
+            bulk = BulkFlusherTests.ScriptedBulk([["N/A"], ["N/A"]])
+            flusher = metrics.BulkFlusher(client=None, chunk_size=1, concurrency=1, max_retries=1, spool_dir=spool_dir)
+
+            with mock.patch("elasticsearch.helpers.streaming_bulk", bulk):
+                flusher.bulk_index(index="rally-2016", doc_type="metrics", items=[{"n": 1}, {"n": 2}])
+            # the second chunk is spooled without an attempt once the first one has exhausted its retries
+            self.assertEqual([[{"n": 1}], [{"n": 1}]], bulk.calls)
+            self.assertEqual(1, sleep.call_count)
+            self.assertEqual(1, len(os.listdir(spool_dir)))
+
+            # the metrics store is still unavailable so the spool is not replayed
+            bulk = BulkFlusherTests.ScriptedBulk([["N/A"], ["N/A"]])
+            with mock.patch("elasticsearch.helpers.streaming_bulk", bulk):
+                flusher.bulk_index(index="rally-2016", doc_type="metrics", items=[{"n": 3}])
+            self.assertEqual([[{"n": 3}], [{"n": 3}]], bulk.calls)
+            self.assertEqual(2, len(os.listdir(spool_dir)))
+
+
 class EsMetricsTests(TestCase):
     TRIAL_TIMESTAMP = datetime.datetime(2016, 1, 31)
 
@@ -217,20 +310,15 @@ class EsMetricsTests(TestCase):
 
     def test_get_value(self):
         throughput = 5000
-        search_result = {
-            "hits": {
-                "total": 1,
-                "hits": [
-                    {
-                        "_source": {
-                            "@timestamp": StaticClock.NOW * 1000,
-                            "value": throughput
-                        }
-                    }
-                ]
+        hits = [
+            {
+                "_source": {
+                    "@timestamp": StaticClock.NOW * 1000,
+                    "value": throughput
+                }
             }
-        }
-        self.es_mock.search = mock.MagicMock(return_value=search_result)
+        ]
+        self.es_mock.scan = mock.MagicMock(return_value=hits)
 
         self.metrics_store.open(EsMetricsTests.TRIAL_TIMESTAMP, "test", "append-no-conflicts", "defaults")
 
@@ -280,7 +368,7 @@ class EsMetricsTests(TestCase):
 
         actual_throughput = self.metrics_store.get_one("indexing_throughput", lap=3)
 
-        self.es_mock.search.assert_called_with(index="rally-2016", doc_type="metrics", body=expected_query)
+        self.es_mock.scan.assert_called_with(index="rally-2016", doc_type="metrics", body=expected_query)
 
         self.assertEqual(throughput, actual_throughput)
 
@@ -360,6 +448,75 @@ class EsMetricsTests(TestCase):
 
         self.assertEqual(median_throughput, actual_median_throughput)
 
+    def test_get_summary(self):
+        def stats_bucket(key, count, min_value, max_value, median, unit=None, sample_types=None, operations=None):
+            bucket = {
+                "key": key,
+                "metric_stats": {"count": count, "min": min_value, "max": max_value, "avg": None, "sum": None},
+                "percentile_stats": {"values": {"50.0": median, "90.0": None, "99.0": None, "99.9": None, "99.99": None, "100.0": None}},
+                "units": {"buckets": [{"key": unit}] if unit else []}
+            }
+            if sample_types is not None:
+                bucket["sample_types"] = {"buckets": sample_types}
+            if operations is not None:
+                bucket["operations"] = {"buckets": operations}
+            return bucket
+
+        self.es_mock.search = mock.MagicMock(return_value={
+            "aggregations": {
+                "names": {
+                    "buckets": [
+                        stats_bucket("throughput", 4, 100, 900, 500, "docs/s", sample_types=[
+                            stats_bucket("normal", 3, 400, 900, 600),
+                            stats_bucket("warmup", 1, 100, 100, 100)
+                        ], operations=[
+                            stats_bucket("index", 4, 100, 900, 500, "docs/s", sample_types=[
+                                stats_bucket("normal", 3, 400, 900, 600),
+                                stats_bucket("warmup", 1, 100, 100, 100)
+                            ])
+                        ]),
+                        stats_bucket("latency", 0, None, None, None, "ms", sample_types=[
+                            stats_bucket("normal", 0, None, None, None)
+                        ], operations=[
+                            stats_bucket("index", 0, None, None, None, "ms", sample_types=[
+                                stats_bucket("normal", 0, None, None, None)
+                            ])
+                        ])
+                    ]
+                }
+            }
+        })
+        h = histogram.Histogram()
+        for v in range(1, 101):
+            h.record_value(v)
+        self.es_mock.scan = mock.MagicMock(return_value=[
+            {
+                "_source": {
+                    "name": "latency",
+                    "operation": "index",
+                    "sample-type": "normal",
+                    "histogram": h.encode()
+                }
+            }
+        ])
+
+        self.metrics_store.open(EsMetricsTests.TRIAL_TIMESTAMP, "test", "append-no-conflicts", "defaults")
+        summary = self.metrics_store.get_summary(lap=1)
+
+        # one aggregation query and one query for histograms
+        self.assertEqual(1, self.es_mock.search.call_count)
+        self.assertEqual(1, self.es_mock.scan.call_count)
+
+        normal = metrics.SampleType.Normal
+        self.assertEqual("docs/s", summary.get_unit("throughput", operation="index"))
+        self.assertEqual(600, summary.get_median("throughput", operation="index", sample_type=normal))
+        self.assertEqual(400, summary.get_stats("throughput", operation="index", sample_type=normal)["min"])
+        self.assertEqual(4, summary.get_count("throughput"))
+        self.assertEqual("ms", summary.get_unit("latency", operation="index"))
+        self.assertEqual(100, summary.get_count("latency", operation="index", sample_type=normal))
+        self.assertAlmostEqual(50, summary.get_median("latency", operation="index", sample_type=normal), delta=0.1)
+        self.assertIsNone(summary.get_stats("service_time", operation="index"))
+
 
 class EsRaceStoreTests(TestCase):
     TRIAL_TIMESTAMP = datetime.datetime(2016, 1, 31)
@@ -466,6 +623,58 @@ class InMemoryMetricsStoreTests(TestCase):
 
         self.assert_equal_percentiles("query_latency", [99, 99.9, 100], {99: 990.0, 99.9: 999.0, 100: 1000.0})
 
+    def test_cached_results_are_updated_when_adding_values(self):
+        self.metrics_store.open(EsMetricsTests.TRIAL_TIMESTAMP, "test", "append-no-conflicts", "defaults", create=True)
+        self.metrics_store.lap = 1
+        for i in range(1, 11):
+            self.metrics_store.put_value_cluster_level("service_time", float(i), "ms", operation="bulk",
+                                                       operation_type=track.OperationType.Index.name)
+            self.metrics_store.put_value_cluster_level("service_time", float(i * 10), "ms", operation="search",
+                                                       operation_type=track.OperationType.Search.name)
+
+        self.assertEqual(10, self.metrics_store.get_stats("service_time", operation="bulk")["max"])
+        self.assertEqual(20, self.metrics_store.get_count("service_time"))
+        self.assertEqual(100, self.metrics_store.get_stats("service_time", operation_type=track.OperationType.Search)["max"])
+        self.assertEqual(5.5, self.metrics_store.get_median("service_time", operation="bulk", lap=1))
+        self.assertIsNone(self.metrics_store.get_stats("service_time", operation="bulk", lap=2))
+
+        self.metrics_store.lap = 2
+        self.metrics_store.put_value_cluster_level("service_time", 1000.0, "ms", operation="bulk",
+                                                   operation_type=track.OperationType.Index.name)
+
+        self.assertEqual(1000, self.metrics_store.get_stats("service_time", operation="bulk")["max"])
+        self.assertEqual(21, self.metrics_store.get_count("service_time"))
+        self.assertEqual(1, self.metrics_store.get_count("service_time", operation="bulk", lap=2))
+        self.assertEqual(6, self.metrics_store.get_median("service_time", operation="bulk"))
+        self.assertEqual(5.5, self.metrics_store.get_median("service_time", operation="bulk", lap=1))
+
+    def test_get_percentiles_and_stats_from_histograms(self):
+        self.metrics_store.open(EsMetricsTests.TRIAL_TIMESTAMP, "test", "append-no-conflicts", "defaults", create=True)
+        self.metrics_store.lap = 1
+        # e.g. one histogram per client
+        for client in range(2):
+            h = histogram.Histogram()
+            for i in range(1, 501):
+                h.record_value(float(client * 500 + i))
+            self.metrics_store.put_histogram_cluster_level("latency", h, "ms", operation="bulk")
+
+        self.metrics_store.close()
+
+        self.metrics_store.open(EsMetricsTests.TRIAL_TIMESTAMP, "test", "append-no-conflicts", "defaults")
+
+        self.assertEqual(2, len(self.metrics_store.docs))
+        # values are recorded with three significant figures
+        percentiles = self.metrics_store.get_percentiles("latency", percentiles=[50.0, 99.0, 100])
+        self.assertEqual([50.0, 99.0, 100], list(percentiles.keys()))
+        self.assertAlmostEqual(500.0, percentiles[50.0], delta=0.5)
+        self.assertAlmostEqual(990.0, percentiles[99.0], delta=1.0)
+        self.assertEqual(1000.0, percentiles[100])
+        stats = self.metrics_store.get_stats("latency", operation="bulk")
+        self.assertEqual(1000, stats["count"])
+        self.assertEqual(1.0, stats["min"])
+        self.assertEqual(1000.0, stats["max"])
+        self.assertAlmostEqual(500.5, stats["avg"])
+
     def test_get_median(self):
         self.metrics_store.open(EsMetricsTests.TRIAL_TIMESTAMP, "test", "append-no-conflicts", "defaults", create=True)
         self.metrics_store.lap = 1
@@ -478,6 +687,47 @@ class InMemoryMetricsStoreTests(TestCase):
 
         self.assertAlmostEqual(500.5, self.metrics_store.get_median("query_latency", lap=1))
 
+    def test_get_summary(self):
+        self.metrics_store.open(EsMetricsTests.TRIAL_TIMESTAMP, "test", "append-no-conflicts", "defaults", create=True)
+        for lap in [1, 2]:
+            self.metrics_store.lap = lap
+            for i in range(1, 101):
+                self.metrics_store.put_value_cluster_level("indexing_total_time", float(i), "ms")
+                self.metrics_store.put_value_cluster_level("throughput", float(i), "docs/s", operation="index",
+                                                           sample_type=metrics.SampleType.Warmup if i <= 10 else metrics.SampleType.Normal)
+
+        summary = self.metrics_store.get_summary(lap=2)
+
+        self.assertEqual(5050, summary.get_sum("indexing_total_time"))
+        self.assertEqual(100, summary.get_count("throughput"))
+        self.assertEqual(90, summary.get_count("throughput", operation="index", sample_type=metrics.SampleType.Normal))
+        self.assertEqual(11, summary.get_stats("throughput", operation="index", sample_type=metrics.SampleType.Normal)["min"])
+        self.assertEqual(55.5, summary.get_median("throughput", operation="index", sample_type=metrics.SampleType.Normal))
+        self.assertEqual("docs/s", summary.get_unit("throughput", operation="index"))
+        self.assertEqual(10100, self.metrics_store.get_summary().get_sum("indexing_total_time"))
+
+    def test_put_values_batch(self):
+        self.metrics_store.open(EsMetricsTests.TRIAL_TIMESTAMP, "test", "append-no-conflicts", "defaults", create=True)
+        self.metrics_store.lap = 1
+        self.metrics_store.add_meta_info(metrics.MetaInfoScope.cluster, None, "cluster-name", "test")
+        self.metrics_store.put_values_batch("throughput", [
+            (StaticClock.NOW, 1, metrics.SampleType.Warmup, 1000, "docs/s"),
+            (StaticClock.NOW + 1, 2, metrics.SampleType.Normal, 2000, "docs/s"),
+            (StaticClock.NOW + 2, 3, metrics.SampleType.Normal, 3000, "docs/s")
+        ], operation="index", operation_type=track.OperationType.Index, meta_data={"client_id": 0})
+
+        self.assertEqual(3, len(self.metrics_store.docs))
+        first, second, _ = self.metrics_store.docs
+        self.assertEqual({"cluster-name": "test", "client_id": 0}, first["meta"])
+        # documents share their meta-data
+        self.assertIs(first["meta"], second["meta"])
+        self.assertEqual("warmup", first["sample-type"])
+        self.assertEqual(2 * 1000 * 1000, second["relative-time"])
+        self.assertEqual((StaticClock.NOW + 1) * 1000, second["@timestamp"])
+        self.assertEqual("index", second["operation"])
+        self.assertEqual([2000, 3000], self.metrics_store.get("throughput", operation="index", sample_type=metrics.SampleType.Normal))
+        self.assertEqual("docs/s", self.metrics_store.get_unit("throughput"))
+
     def assert_equal_percentiles(self, name, percentiles, expected_percentiles):
         actual_percentiles = self.metrics_store.get_percentiles(name, percentiles=percentiles)
         self.assertEqual(len(expected_percentiles), len(actual_percentiles))
@@ -528,3 +778,75 @@ class InMemoryMetricsStoreTests(TestCase):
 
 
 
+
+
+class SqliteStoreTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cfg = config.Config()
+        self.cfg.add(config.Scope.application, "system", "env.name", "unittest")
+        self.cfg.add(config.Scope.application, "system", "list.races.max_results", 10)
+        self.cfg.add(config.Scope.application, "reporting", "datastore.sqlite.path", os.path.join(self.tmp_dir.name, "rally.db"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_metrics_are_persisted(self):
+        metrics_store = metrics.SqliteMetricsStore(self.cfg, clock=StaticClock)
+        metrics_store.open(EsMetricsTests.TRIAL_TIMESTAMP, "test", "append-no-conflicts", "defaults", create=True)
+        metrics_store.lap = 1
+        metrics_store.put_value_cluster_level("throughput", 1, "docs/s", operation="index", sample_type=metrics.SampleType.Warmup)
+        for i in range(1, 1001):
+            metrics_store.put_value_cluster_level("throughput", float(i), "docs/s", operation="index")
+        h = histogram.Histogram()
+        for i in range(1, 101):
+            h.record_value(float(i))
+        metrics_store.put_histogram_cluster_level("latency", h, "ms", operation="index")
+        metrics_store.close()
+
+        # a new store instance reads from the same file
+        metrics_store = metrics.SqliteMetricsStore(self.cfg, clock=StaticClock)
+        metrics_store.open(EsMetricsTests.TRIAL_TIMESTAMP, "test", "append-no-conflicts", "defaults")
+
+        self.assertEqual(1001, len(metrics_store.get("throughput", lap=1)))
+        self.assertEqual("docs/s", metrics_store.get_unit("throughput", operation="index"))
+        self.assertAlmostEqual(500.5, metrics_store.get_median("throughput", sample_type=metrics.SampleType.Normal, lap=1))
+        stats = metrics_store.get_stats("throughput", operation="index", sample_type=metrics.SampleType.Normal)
+        self.assertEqual(1000, stats["count"])
+        self.assertEqual(1.0, stats["min"])
+        self.assertEqual(1000.0, stats["max"])
+        self.assertEqual(500500.0, stats["sum"])
+        self.assertEqual(100, metrics_store.get_count("latency", operation="index"))
+        self.assertEqual(100.0, metrics_store.get_percentiles("latency", percentiles=[100])[100])
+        self.assertIsNone(metrics_store.get_stats("service_time"))
+
+        summary = metrics_store.get_summary(lap=1)
+        self.assertEqual(1001, summary.get_count("throughput"))
+        self.assertEqual(100, summary.get_count("latency", operation="index", sample_type=metrics.SampleType.Normal))
+
+    def test_store_and_find_races(self):
+        self.cfg.add(config.Scope.application, "system", "pipeline", "unittest-pipeline")
+        self.cfg.add(config.Scope.application, "system", "user.tag", "")
+        self.cfg.add(config.Scope.application, "benchmarks", "challenge", "index")
+        self.cfg.add(config.Scope.application, "benchmarks", "car", "defaults")
+        self.cfg.add(config.Scope.application, "benchmarks", "laps", 1)
+        self.cfg.add(config.Scope.application, "launcher", "external.target.hosts", [{"host": "localhost", "port": "9200"}])
+        self.cfg.add(config.Scope.application, "source", "revision", "latest")
+        self.cfg.add(config.Scope.application, "source", "distribution.version", "5.0.0")
+
+        t = track.Track(name="unittest", short_description="unittest track", description="unittest track",
+                        source_root_url="http://example.org", indices=None,
+                        challenges=[track.Challenge(name="index", description="Index", index_settings=None,
+                                                    schedule=[track.Task(track.Operation("index", track.OperationType.Index))])])
+        for day in [1, 2]:
+            self.cfg.add(config.Scope.application, "meta", "time.start", datetime.datetime(2016, 1, day))
+            metrics.SqliteRaceStore(self.cfg).store_race(t)
+
+        race_store = metrics.SqliteRaceStore(self.cfg)
+        races = race_store.list()
+        self.assertEqual(2, len(races))
+        self.assertEqual(datetime.datetime(2016, 1, 2), races[0].trial_timestamp)
+        race = race_store.find_by_timestamp("20160101T000000Z")
+        self.assertEqual("unittest", race.track)
+        self.assertEqual("index", race.challenge.name)
+        self.assertIsNone(race_store.find_by_timestamp("20160103T000000Z"))
@@ -1,7 +1,9 @@
+import unittest.mock as mock
 from unittest import TestCase
 
 import jinja2
 
+from esrally import config, exceptions
 from esrally.track import loader
 
 
@@ -168,6 +170,182 @@ class TrackSpecificationReaderTests(TestCase):
         self.assertEqual("Track 'unittest' is invalid. Operation 'index-append' in challenge 'default-challenge' mixes warmup time period "
                          "with iterations. Please do not mix time periods and iterations.", ctx.exception.args[0])
 
+    def test_parse_with_schedule_but_without_target_throughput(self):
+        track_specification = {
+            "short-description": "short description for unit test",
+            "description": "longer description of this track for unit test",
+            "data-url": "https://localhost/data",
+            "indices": [
+                {
+                    "name": "test-index",
+                    "types": [
+                        {
+                            "name": "main",
+                            "documents": "documents-main.json.bz2",
+                            "document-count": 10,
+                            "compressed-bytes": 100,
+                            "uncompressed-bytes": 10000,
+                            "mapping": "main-type-mappings.json"
+                        }
+                    ]
+                }
+            ],
+            "operations": [
+                {
+                    "name": "search",
+                    "operation-type": "search",
+                    "index": "test-index"
+                }
+            ],
+            "challenges": [
+                {
+                    "name": "default-challenge",
+                    "description": "Default challenge",
+                    "schedule": [
+                        {
+                            "clients": 8,
+                            "operation": "search",
+                            "iterations": 1000,
+                            "schedule": "poisson"
+                        }
+                    ]
+                }
+
+            ]
+        }
+
+        reader = loader.TrackSpecificationReader()
+        with self.assertRaises(loader.TrackSyntaxError) as ctx:
+            reader("unittest", track_specification, "/mappings", "/data")
+        self.assertEqual("Track 'unittest' is invalid. Operation 'search' in challenge 'default-challenge' defines a 'poisson' schedule "
+                         "but no target throughput. Please define a 'target-throughput' for this operation.", ctx.exception.args[0])
+
+    def test_parse_with_target_throughput_and_throughput_search(self):
+        track_specification = {
+            "short-description": "short description for unit test",
+            "description": "longer description of this track for unit test",
+            "data-url": "https://localhost/data",
+            "indices": [
+                {
+                    "name": "test-index",
+                    "types": [
+                        {
+                            "name": "main",
+                            "documents": "documents-main.json.bz2",
+                            "document-count": 10,
+                            "compressed-bytes": 100,
+                            "uncompressed-bytes": 10000,
+                            "mapping": "main-type-mappings.json"
+                        }
+                    ]
+                }
+            ],
+            "operations": [
+                {
+                    "name": "search",
+                    "operation-type": "search",
+                    "index": "test-index"
+                }
+            ],
+            "challenges": [
+                {
+                    "name": "default-challenge",
+                    "description": "Default challenge",
+                    "schedule": [
+                        {
+                            "clients": 8,
+                            "operation": "search",
+                            "target-throughput": 100,
+                            "throughput-search": {
+                                "min-throughput": 10,
+                                "max-throughput": 1000,
+                                "latency-slo": 200
+                            }
+                        }
+                    ]
+                }
+
+            ]
+        }
+
+        reader = loader.TrackSpecificationReader()
+        with self.assertRaises(loader.TrackSyntaxError) as ctx:
+            reader("unittest", track_specification, "/mappings", "/data")
+        self.assertEqual("Track 'unittest' is invalid. Operation 'search' in challenge 'default-challenge' defines a target throughput "
+                         "and a throughput search. Please define only one of them.", ctx.exception.args[0])
+
+        del track_specification["challenges"][0]["schedule"][0]["target-throughput"]
+        with self.assertRaises(loader.TrackSyntaxError) as ctx:
+            reader("unittest", track_specification, "/mappings", "/data")
+        self.assertEqual("Track 'unittest' is invalid. Operation 'search' in challenge 'default-challenge' defines a throughput search "
+                         "with [8] clients. A throughput search is only supported with one client.", ctx.exception.args[0])
+
+        track_specification["challenges"][0]["schedule"][0]["clients"] = 1
+        track_specification["challenges"][0]["schedule"][0]["schedule"] = "poisson"
+        resulting_track = reader("unittest", track_specification, "/mappings", "/data")
+        task = resulting_track.challenges[0].schedule[0]
+        self.assertEqual({"min-throughput": 10, "max-throughput": 1000, "latency-slo": 200}, task.throughput_search)
+        self.assertEqual("poisson", task.schedule)
+
+    def test_parse_load_profile_requires_target_throughput(self):
+        track_specification = {
+            "short-description": "short description for unit test",
+            "description": "longer description of this track for unit test",
+            "data-url": "https://localhost/data",
+            "indices": [
+                {
+                    "name": "test-index",
+                    "types": [
+                        {
+                            "name": "main",
+                            "documents": "documents-main.json.bz2",
+                            "document-count": 10,
+                            "compressed-bytes": 100,
+                            "uncompressed-bytes": 10000,
+                            "mapping": "main-type-mappings.json"
+                        }
+                    ]
+                }
+            ],
+            "operations": [
+                {
+                    "name": "search",
+                    "operation-type": "search",
+                    "index": "test-index"
+                }
+            ],
+            "challenges": [
+                {
+                    "name": "default-challenge",
+                    "description": "Default challenge",
+                    "schedule": [
+                        {
+                            "clients": 8,
+                            "operation": "search",
+                            "load-profile": [
+                                {"type": "ramp", "duration": 60},
+                                {"name": "peak", "type": "spike", "duration": 30, "peak": 3}
+                            ]
+                        }
+                    ]
+                }
+
+            ]
+        }
+
+        reader = loader.TrackSpecificationReader()
+        with self.assertRaises(loader.TrackSyntaxError) as ctx:
+            reader("unittest", track_specification, "/mappings", "/data")
+        self.assertEqual("Track 'unittest' is invalid. Operation 'search' in challenge 'default-challenge' defines a load profile but "
+                         "no target throughput. Please define a 'target-throughput' for this operation.", ctx.exception.args[0])
+
+        track_specification["challenges"][0]["schedule"][0]["target-throughput"] = 100
+        resulting_track = reader("unittest", track_specification, "/mappings", "/data")
+        task = resulting_track.challenges[0].schedule[0]
+        self.assertEqual(100, task.target_throughput)
+        self.assertEqual([{"type": "ramp", "duration": 60}, {"name": "peak", "type": "spike", "duration": 30, "peak": 3}],
+                         task.load_profile)
+
     def test_parse_valid_track_specification(self):
         track_specification = {
             "short-description": "short description for unit test",
@@ -300,3 +478,32 @@ class TrackSpecificationReaderTests(TestCase):
         self.assertEqual(0, len(resulting_track.templates))
         self.assertEqual("test-index", resulting_track.indices[0].name)
         self.assertEqual(0, len(resulting_track.indices[0].types))
+
+
+class TrackRevisionTests(TestCase):
+    def setUp(self):
+        self.cfg = config.Config()
+        self.cfg.add(config.Scope.application, "system", "track.repository", "default")
+        self.cfg.add(config.Scope.application, "system", "offline.mode", False)
+        self.cfg.add(config.Scope.application, "system", "root.dir", "/rally")
+        self.cfg.add(config.Scope.application, "benchmarks", "track.repository.dir", "tracks")
+
+    @mock.patch("esrally.utils.git.head_revision", autospec=True)
+    @mock.patch("esrally.utils.git.is_working_copy", autospec=True)
+    def test_accepts_same_revision(self, mock_is_working_copy, mock_head_revision):
+        mock_is_working_copy.return_value = True
+        mock_head_revision.return_value = "1a2b3c4"
+
+        loader.ensure_track_revision(self.cfg, "1a2b3c4")
+
+        mock_head_revision.assert_called_with("/rally/tracks/default")
+
+    @mock.patch("esrally.utils.git.head_revision", autospec=True)
+    @mock.patch("esrally.utils.git.is_working_copy", autospec=True)
+    def test_rejects_different_revision(self, mock_is_working_copy, mock_head_revision):
+        mock_is_working_copy.return_value = True
+        mock_head_revision.return_value = "1a2b3c4"
+
+        with self.assertRaises(exceptions.SystemSetupError) as ctx:
+            loader.ensure_track_revision(self.cfg, "9f8e7d6")
+        self.assertIn("is at revision [1a2b3c4] but the coordinator uses revision [9f8e7d6]", ctx.exception.args[0])
@@ -1,8 +1,14 @@
+import bz2
+import json
+import os
+import tempfile
+import threading
+import time
 from unittest import TestCase
 
 from esrally import exceptions
 from esrally.utils import io
-from esrally.track import params
+from esrally.track import params, track
 
 
 class SliceTests(TestCase):
@@ -97,6 +103,22 @@ class ConflictingIdsBuilderTests(TestCase):
             params.build_conflicting_ids(params.IndexIdConflict.RandomConflicts, 3, 5, rand=lambda x, y: y)
         )
 
+    def test_random_conflicts_are_generated_on_demand(self):
+        # would need gigabytes of memory if ids were materialized
+        ids = params.build_conflicting_ids(params.IndexIdConflict.RandomConflicts, 1000 * 1000 * 1000, 5)
+
+        self.assertEqual(1000 * 1000 * 1000, len(ids))
+        # ids are stable across repeated accesses
+        self.assertEqual(ids[123456789], ids[123456789])
+        sample = [int(ids[i]) for i in range(1000)]
+        self.assertTrue(all(5 <= doc_id <= 5 + 1000 * 1000 * 1000 for doc_id in sample))
+        # random ids are spread across the whole range
+        self.assertTrue(len(set(sample)) > 990)
+        self.assertEqual(sample[-1], int(ids[999]))
+        self.assertEqual(ids[-1], ids[len(ids) - 1])
+        with self.assertRaises(IndexError):
+            ids[len(ids)]
+
 
 class ActionMetaDataTests(TestCase):
     def test_none_action_meta_data_is_none(self):
@@ -129,6 +151,27 @@ class ActionMetaDataTests(TestCase):
         # and we're back to random
         self.assertEqual('{"index": {"_index": "test_index", "_type": "test_type", "_id": "100"}}', next(generator))
 
+    def test_generate_action_meta_data_with_special_characters(self):
+        generator = params.GenerateActionMetaData("test_%_index", "test_type",
+                                                  conflicting_ids=params.build_conflicting_ids(params.IndexIdConflict.SequentialConflicts,
+                                                                                               2, 0),
+                                                  rand=lambda x, y: 0)
+
+        self.assertEqual('{"index": {"_index": "test_%_index", "_type": "test_type", "_id": "         0"}}', next(generator))
+        self.assertEqual('{"index": {"_index": "test_%_index", "_type": "test_type", "_id": "         1"}}', next(generator))
+
+    def test_generate_encoded_action_meta_data(self):
+        generator = params.GenerateActionMetaData("test_%_index", "test_type",
+                                                  conflicting_ids=params.build_conflicting_ids(params.IndexIdConflict.SequentialConflicts,
+                                                                                               2, 0),
+                                                  rand=lambda x, y: 0)
+
+        self.assertEqual(b'{"index": {"_index": "test_%_index", "_type": "test_type", "_id": "         0"}}', generator.next_encoded())
+        self.assertEqual(b'{"index": {"_index": "test_%_index", "_type": "test_type", "_id": "         1"}}', generator.next_encoded())
+
+        self.assertEqual(b'{"index": {"_index": "test_index", "_type": "test_type"}}',
+                         params.GenerateActionMetaData("test_index", "test_type", conflicting_ids=None).next_encoded())
+
     def test_source_file_action_meta_data(self):
         source = params.Slice(io.StringAsFileSource, 0, 5)
         generator = params.SourceActionMetaData(source)
@@ -290,6 +333,223 @@ class IndexDataReaderTests(TestCase):
                     bulk_index += 1
 
 
+class CompressedDataTests(TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.document_file = os.path.join(self.data_dir, "docs.json")
+        self.document_archive = os.path.join(self.data_dir, "docs.json.bz2")
+        with open(self.document_archive, "wb") as f:
+            for i in range(10):
+                f.write(bz2.compress(('{"key": "value%d"}\n' % i).encode("utf-8")))
+        self.type = track.Type("test_type", mapping_file=None, document_file=self.document_file, document_archive=self.document_archive,
+                               number_of_documents=10)
+
+    def tearDown(self):
+        for f in os.listdir(self.data_dir):
+            os.remove(os.path.join(self.data_dir, f))
+        os.rmdir(self.data_dir)
+
+    def test_reads_directly_from_indexed_archive(self):
+        # without a block index, the archive needs to be decompressed first
+        self.assertEqual((self.document_file, io.FileSource), params.data_source(self.type))
+
+        io.prepare_block_index(self.document_archive, stride=1)
+        self.assertEqual((self.document_archive, io.CompressedFileSource), params.data_source(self.type))
+
+        reader = params.create_default_reader("test_index", self.type, offset=5, num_lines=5, num_docs=5,
+                                              action_metadata=params.ActionMetaData.NoMetaData, batch_size=5, bulk_size=5, id_conflicts=None)
+        with reader:
+            bulks = [bulk for _, _, batch in reader for bulk in batch]
+        self.assertEqual([['{"key": "value5"}', '{"key": "value6"}', '{"key": "value7"}', '{"key": "value8"}', '{"key": "value9"}']],
+                         bulks)
+
+        with self.assertRaises(exceptions.SystemSetupError):
+            params.create_mmap_reader("test_index", self.type, offset=5, num_lines=5, num_docs=5,
+                                      action_metadata=params.ActionMetaData.NoMetaData, batch_size=5, bulk_size=5, id_conflicts=None)
+
+
+class ByteRangeTests(TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.document_file = os.path.join(self.data_dir, "docs.json")
+        with open(self.document_file, "wb") as f:
+            for i in range(10):
+                f.write(('{"key": "%s"}\n' % ("x" * i)).encode("utf-8"))
+        self.type = track.Type("test_type", mapping_file=None, document_file=self.document_file,
+                               document_archive=os.path.join(self.data_dir, "docs.json.bz2"), number_of_documents=10)
+
+    def tearDown(self):
+        for f in os.listdir(self.data_dir):
+            os.remove(os.path.join(self.data_dir, f))
+        os.rmdir(self.data_dir)
+
+    def read_docs(self, reader):
+        docs = []
+        with reader:
+            for _, _, batch in reader:
+                for bulk in batch:
+                    if isinstance(bulk, list):
+                        docs.extend(bulk)
+                    else:
+                        docs.extend(bytes(bulk[1]).decode("utf-8").splitlines())
+        return docs
+
+    def test_clients_read_each_document_exactly_once(self):
+        expected = ['{"key": "%s"}' % ("x" * i) for i in range(10)]
+        for create_reader in [params.create_byte_range_reader, params.create_byte_range_mmap_reader]:
+            docs = []
+            for client_index in range(3):
+                start, end = io.line_aligned_range(self.document_file, client_index, 3)
+                reader = create_reader("test_index", self.type, start, end, params.ActionMetaData.NoMetaData, batch_size=2, bulk_size=2)
+                docs.extend(self.read_docs(reader))
+            self.assertEqual(expected, docs)
+
+    def test_progress_is_based_on_bytes_read(self):
+        for reader in ["file", "mmap"]:
+            source = params.BulkIndexParamSource(indices=[track.Index("test_index", auto_managed=True, types=[self.type])], params={
+                "bulk-size": 2,
+                "partitioning": "bytes",
+                "reader": reader
+            })
+            for client_index in range(3):
+                partition = source.partition(client_index, 3)
+                start, end = io.line_aligned_range(self.document_file, client_index, 3)
+                docs = io.count_lines_in_range(self.document_file, start, end)
+                # the size is not known upfront as it would require reading the whole byte range
+                self.assertIsNone(partition.size())
+                self.assertEqual(0.0, partition.percent_completed)
+
+                progress = []
+                while True:
+                    try:
+                        partition.params()
+                    except StopIteration:
+                        break
+                    progress.append(partition.percent_completed)
+                self.assertEqual(docs // 2 + docs % 2, len(progress))
+                self.assertEqual(sorted(progress), progress)
+                self.assertEqual(1.0, progress[-1])
+
+    def test_cannot_partition_compressed_data_by_bytes(self):
+        with open(self.document_file, "rb") as f, open(self.type.document_archive, "wb") as archive:
+            archive.write(bz2.compress(f.read()))
+        io.prepare_block_index(self.type.document_archive, stride=1)
+        os.remove(self.document_file)
+
+        with self.assertRaises(exceptions.SystemSetupError):
+            params.byte_range_data_file(self.type)
+
+
+class BulkCacheTests(TestCase):
+    def setUp(self):
+        self.cache_file = os.path.join(tempfile.mkdtemp(), "documents.json.bulk")
+
+    def tearDown(self):
+        if os.path.exists(self.cache_file):
+            os.remove(self.cache_file)
+        os.rmdir(os.path.dirname(self.cache_file))
+
+    def reader(self, data, bulk_size, batch_size):
+        source = params.Slice(io.StringAsFileSource, 0, len(data))
+        am_handler = params.GenerateActionMetaData("test_index", "test_type", conflicting_ids=None)
+        return params.IndexDataReader(data, batch_size=batch_size, bulk_size=bulk_size, file_source=source, action_metadata=am_handler,
+                                      index_name="test_index", type_name="test_type")
+
+    def test_writes_and_reads_encoded_bulks(self):
+        data = [
+            '{"key": "value1"}',
+            '{"key": "value2"}',
+            '{"key": "value3"}'
+        ]
+        with params.BulkCacheWriter(self.reader(data, bulk_size=2, batch_size=2), self.cache_file) as writer:
+            written = [(index, type, batch) for index, type, batch in writer]
+
+        self.assertEqual([
+            ("test_index", "test_type", [(4, b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value1"}\n'
+                                             b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value2"}\n')]),
+            ("test_index", "test_type", [(2, b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value3"}\n')])
+        ], written)
+        self.assertTrue(os.path.isfile(self.cache_file))
+
+        with params.BulkCacheReader(self.cache_file, batch_size=2, bulk_size=2, index_name="test_index", type_name="test_type") as reader:
+            self.assertEqual(written, [(index, type, batch) for index, type, batch in reader])
+
+    def test_reads_multiple_bulks_per_batch(self):
+        data = ['{"key": "value%d"}' % i for i in range(5)]
+        with params.BulkCacheWriter(self.reader(data, bulk_size=1, batch_size=1), self.cache_file) as writer:
+            for _ in writer:
+                pass
+
+        with params.BulkCacheReader(self.cache_file, batch_size=2, bulk_size=1, index_name="test_index", type_name="test_type") as reader:
+            self.assertEqual([2, 2, 1], [len(batch) for _, _, batch in reader])
+
+    def test_does_not_retain_partially_written_cache(self):
+        data = [
+            '{"key": "value1"}',
+            '{"key": "value2"}'
+        ]
+        with params.BulkCacheWriter(self.reader(data, bulk_size=1, batch_size=1), self.cache_file) as writer:
+            next(writer)
+
+        self.assertFalse(os.path.exists(self.cache_file))
+        self.assertEqual([], os.listdir(os.path.dirname(self.cache_file)))
+
+
+class MmapIndexDataReaderTests(TestCase):
+    def setUp(self):
+        self.data_file = os.path.join(tempfile.mkdtemp(), "documents.json")
+
+    def tearDown(self):
+        os.remove(self.data_file)
+        os.rmdir(os.path.dirname(self.data_file))
+
+    def write_data(self, contents):
+        with open(self.data_file, "wb") as f:
+            f.write(contents)
+
+    def read_bulks(self, action_metadata, am_handler, bulk_size, offset, number_of_lines):
+        reader = params.MmapIndexDataReader(self.data_file, batch_size=bulk_size, bulk_size=bulk_size, offset=offset,
+                                            number_of_lines=number_of_lines, action_metadata=action_metadata,
+                                            action_metadata_handler=am_handler, index_name="test_index", type_name="test_type")
+        bulks = []
+        with reader:
+            for index, type, batch in reader:
+                for number_of_lines, body in batch:
+                    bulks.append((number_of_lines, body))
+        return bulks
+
+    def test_read_bulks_without_metadata_as_slices(self):
+        self.write_data(b'{"key": "value1"}\n{"key": "value2"}\n{"key": "value3"}\n{"key": "value4"}\n')
+
+        bulks = self.read_bulks(params.ActionMetaData.NoMetaData, None, bulk_size=2, offset=1, number_of_lines=3)
+
+        self.assertEqual(2, len(bulks))
+        self.assertIsInstance(bulks[0][1], memoryview)
+        self.assertEqual((2, b'{"key": "value2"}\n{"key": "value3"}\n'), (bulks[0][0], bytes(bulks[0][1])))
+        self.assertEqual((1, b'{"key": "value4"}\n'), (bulks[1][0], bytes(bulks[1][1])))
+
+    def test_read_bulks_with_metadata_in_source_file(self):
+        self.write_data(b'{"index": {"_id": "1"}}\n{"key": "value1"}\n{"index": {"_id": "2"}}\n{"key": "value2"}')
+
+        bulks = self.read_bulks(params.ActionMetaData.SourceFile, None, bulk_size=5, offset=0, number_of_lines=4)
+
+        # the last line is not terminated by a newline in the source file
+        self.assertEqual([(4, b'{"index": {"_id": "1"}}\n{"key": "value1"}\n{"index": {"_id": "2"}}\n{"key": "value2"}\n')],
+                         [(number_of_lines, bytes(body)) for number_of_lines, body in bulks])
+
+    def test_read_bulks_and_generate_metadata(self):
+        self.write_data(b'{"key": "value1"}\n{"key": "value2"}\n{"key": "value3"}\n')
+        am_handler = params.GenerateActionMetaData("test_index", "test_type", conflicting_ids=None)
+
+        bulks = self.read_bulks(params.ActionMetaData.Generate, am_handler, bulk_size=2, offset=0, number_of_lines=3)
+
+        self.assertEqual([
+            (4, b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value1"}\n'
+                b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value2"}\n'),
+            (2, b'{"index": {"_index": "test_index", "_type": "test_type"}}\n{"key": "value3"}\n')
+        ], bulks)
+
+
 class InvocationGeneratorTests(TestCase):
     class TestIndexReader:
         def __init__(self, data):
@@ -450,6 +710,42 @@ class BulkIndexParamSourceTests(TestCase):
 
         self.assertEqual("Cannot generate id conflicts [random] when 'action-and-meta-data' is [none].", ctx.exception.args[0])
 
+    def test_create_with_bulk_cache_and_conflicts(self):
+        with self.assertRaises(exceptions.InvalidSyntax) as ctx:
+            params.BulkIndexParamSource(indices=[], params={
+                "bulk-cache": True,
+                "conflicts": "sequential"
+            })
+
+        self.assertEqual("Cannot use a bulk cache when simulating id conflicts [sequential].", ctx.exception.args[0])
+
+    def test_create_with_unknown_reader(self):
+        with self.assertRaises(exceptions.InvalidSyntax) as ctx:
+            params.BulkIndexParamSource(indices=[], params={
+                "bulk-size": 5,
+                "reader": "magic"
+            })
+
+        self.assertEqual("Unknown 'reader' setting [magic]", ctx.exception.args[0])
+
+    def test_create_with_unknown_partitioning(self):
+        with self.assertRaises(exceptions.InvalidSyntax) as ctx:
+            params.BulkIndexParamSource(indices=[], params={
+                "bulk-size": 5,
+                "partitioning": "random"
+            })
+
+        self.assertEqual("Unknown 'partitioning' setting [random]", ctx.exception.args[0])
+
+    def test_create_with_byte_partitioning_and_conflicts(self):
+        with self.assertRaises(exceptions.InvalidSyntax) as ctx:
+            params.BulkIndexParamSource(indices=[], params={
+                "partitioning": "bytes",
+                "conflicts": "sequential"
+            })
+
+        self.assertEqual("Cannot partition by bytes when simulating id conflicts [sequential].", ctx.exception.args[0])
+
     def test_create_with_unknown_id_conflicts(self):
         with self.assertRaises(exceptions.InvalidSyntax) as ctx:
             params.BulkIndexParamSource(indices=[], params={
@@ -477,6 +773,158 @@ class BulkIndexParamSourceTests(TestCase):
         }))
 
 
+class PrefetchingParamSourceTests(TestCase):
+    class CountingParamSource:
+        def __init__(self, count):
+            self.count = count
+            self.current = 0
+
+        def size(self):
+            return self.count
+
+        def params(self):
+            if self.current == self.count:
+                raise StopIteration()
+            self.current += 1
+            return {"value": self.current}
+
+    def test_provides_all_parameters_in_order(self):
+        source = params.PrefetchingParamSource(PrefetchingParamSourceTests.CountingParamSource(100), buffer_size=10)
+        try:
+            self.assertEqual(100, source.size())
+            self.assertEqual([{"value": v} for v in range(1, 101)], [source.params() for _ in range(100)])
+            with self.assertRaises(StopIteration):
+                source.params()
+            # the parameter source stays exhausted
+            with self.assertRaises(StopIteration):
+                source.params()
+        finally:
+            source.close()
+
+    def test_counts_underruns(self):
+        class SlowParamSource:
+            def params(self):
+                time.sleep(0.05)
+                return {}
+
+        source = params.PrefetchingParamSource(SlowParamSource(), buffer_size=1)
+        try:
+            for _ in range(3):
+                source.params()
+        finally:
+            source.close()
+        # the first call always waits for the first parameters
+        self.assertEqual(2, source.underruns)
+
+    def test_shares_producer_threads(self):
+        # make sure that the producers of this process exist already
+        params.PrefetchingParamSource.producers()
+        threads_before = threading.active_count()
+        sources = [params.PrefetchingParamSource(PrefetchingParamSourceTests.CountingParamSource(20), buffer_size=5) for _ in range(50)]
+        try:
+            for source in sources:
+                self.assertEqual([{"value": v} for v in range(1, 21)], [source.params() for _ in range(20)])
+            self.assertLessEqual(threading.active_count() - threads_before, params.PrefetchingParamSource.PRODUCER_THREADS)
+        finally:
+            for source in sources:
+                source.close()
+
+
+class SyntheticDocumentParamSourceTests(TestCase):
+    FIELDS = {
+        "status": {"type": "keyword", "values": ["ok", "failed"], "distribution": "zipf"},
+        "size": {"type": "integer", "min": 10, "max": 20},
+        "load": {"type": "float", "distribution": "normal", "mean": 1.0, "stddev": 0.5, "min": 0.0},
+        "message": {"type": "text", "vocabulary": ["a", "\"quoted\"", "c"], "min-words": 2, "max-words": 4},
+        "active": {"type": "boolean", "probability": 1},
+        "@timestamp": {"type": "date", "start": "2017-01-01", "end": "2017-01-01"}
+    }
+
+    def param_source(self, documents, bulk_size, seed=0):
+        return params.SyntheticDocumentParamSource(indices=[track.Index("test_index", auto_managed=True, types=[
+            track.Type("test_type", mapping_file=None)])], params={
+            "documents": documents,
+            "bulk-size": bulk_size,
+            "seed": seed,
+            "fields": SyntheticDocumentParamSourceTests.FIELDS
+        })
+
+    def documents(self, source, partition_index, total_partitions):
+        partition = source.partition(partition_index, total_partitions)
+        docs = []
+        for _ in range(partition.size()):
+            p = partition.params()
+            self.assertEqual("test_index", p["index"])
+            self.assertEqual("test_type", p["type"])
+            self.assertTrue(p["action_metadata_present"])
+            lines = p["body"].decode("utf-8").splitlines()
+            self.assertEqual(2 * p["bulk-size"], len(lines))
+            self.assertEqual(['{"index": {"_index": "test_index", "_type": "test_type"}}'], list(set(lines[0::2])))
+            docs.extend(lines[1::2])
+        with self.assertRaises(StopIteration):
+            partition.params()
+        return docs
+
+    def test_generates_documents_according_to_field_definitions(self):
+        docs = [json.loads(doc) for doc in self.documents(self.param_source(documents=10, bulk_size=3), 0, 1)]
+
+        self.assertEqual(10, len(docs))
+        for doc in docs:
+            self.assertEqual(["@timestamp", "active", "load", "message", "size", "status"], sorted(doc.keys()))
+            self.assertIn(doc["status"], ["ok", "failed"])
+            self.assertTrue(10 <= doc["size"] <= 20)
+            self.assertTrue(doc["load"] >= 0.0)
+            words = doc["message"].split(" ")
+            self.assertTrue(2 <= len(words) <= 4)
+            self.assertTrue(set(words).issubset({"a", '"quoted"', "c"}))
+            self.assertTrue(doc["active"])
+            self.assertEqual("2017-01-01T00:00:00Z", doc["@timestamp"])
+
+    def test_corpus_is_independent_of_number_of_clients(self):
+        source = self.param_source(documents=2500, bulk_size=100, seed=42)
+        corpus = self.documents(source, 0, 1)
+        self.assertEqual(2500, len(corpus))
+        self.assertEqual(corpus, [doc for client in range(3) for doc in self.documents(source, client, 3)])
+
+        self.assertNotEqual(corpus, self.documents(self.param_source(documents=2500, bulk_size=100, seed=7), 0, 1))
+
+    def test_create_with_unknown_field_type(self):
+        with self.assertRaises(exceptions.InvalidSyntax) as ctx:
+            params.SyntheticDocumentParamSource(indices=[], params={
+                "index": "test_index",
+                "type": "test_type",
+                "documents": 10,
+                "bulk-size": 5,
+                "fields": {"location": {"type": "geo_point"}}
+            })
+
+        self.assertEqual("Unknown type [geo_point] of field [location]. Use one of boolean, date, float, integer, keyword, text.",
+                         ctx.exception.args[0])
+
+    def test_create_with_minimum_greater_than_maximum(self):
+        with self.assertRaises(exceptions.InvalidSyntax) as ctx:
+            params.SyntheticDocumentParamSource(indices=[], params={
+                "index": "test_index",
+                "type": "test_type",
+                "documents": 10,
+                "bulk-size": 5,
+                "fields": {"size": {"type": "integer", "distribution": "normal", "mean": 50, "min": 100, "max": 10}}
+            })
+
+        self.assertEqual("The minimum of field [size] must not be greater than its maximum.", ctx.exception.args[0])
+
+    def test_create_without_documents(self):
+        with self.assertRaises(exceptions.InvalidSyntax) as ctx:
+            params.SyntheticDocumentParamSource(indices=[], params={
+                "index": "test_index",
+                "type": "test_type",
+                "bulk-size": 5,
+                "fields": {"size": {"type": "integer"}}
+            })
+
+        self.assertEqual("Mandatory parameter 'documents' is missing", ctx.exception.args[0])
+
+
 class ParamsRegistrationTests(TestCase):
     @staticmethod
     def param_source_function(indices, params):
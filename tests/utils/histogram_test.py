@@ -0,0 +1,69 @@
+from unittest import TestCase
+
+from esrally.utils import histogram
+
+
+class HistogramTests(TestCase):
+    def test_records_values_with_configured_precision(self):
+        h = histogram.Histogram(significant_figures=3)
+        for i in range(1, 10001):
+            h.record_value(i / 10)
+
+        self.assertEqual(10000, h.total_count)
+        self.assertEqual(0.1, h.min)
+        self.assertEqual(1000.0, h.max)
+        self.assertAlmostEqual(500.05, h.mean)
+        self.assertAlmostEqual(500.0, h.value_at_percentile(50), delta=0.5)
+        self.assertAlmostEqual(990.0, h.value_at_percentile(99), delta=1.0)
+        self.assertAlmostEqual(999.0, h.value_at_percentile(99.9), delta=1.0)
+        self.assertEqual(1000.0, h.value_at_percentile(100))
+        self.assertEqual(0.1, h.value_at_percentile(0))
+
+    def test_empty_histogram_has_no_percentiles(self):
+        h = histogram.Histogram()
+        self.assertEqual(0, h.total_count)
+        self.assertIsNone(h.mean)
+        self.assertIsNone(h.value_at_percentile(99))
+
+    def test_rejects_negative_values(self):
+        with self.assertRaises(ValueError):
+            histogram.Histogram().record_value(-1)
+
+    def test_merge_histograms(self):
+        h1 = histogram.Histogram()
+        h2 = histogram.Histogram()
+        for i in range(1, 501):
+            h1.record_value(i)
+        for i in range(501, 1001):
+            h2.record_value(i)
+
+        h1.add(h2)
+
+        self.assertEqual(1000, h1.total_count)
+        self.assertEqual(1, h1.min)
+        self.assertEqual(1000, h1.max)
+        self.assertAlmostEqual(500, h1.value_at_percentile(50), delta=0.5)
+
+    def test_cannot_merge_histograms_with_different_configuration(self):
+        with self.assertRaises(ValueError):
+            histogram.Histogram(significant_figures=2).add(histogram.Histogram(significant_figures=3))
+
+    def test_encode_and_decode(self):
+        h = histogram.Histogram()
+        for i in range(1, 1001):
+            h.record_value(i * 1.5, count=2)
+
+        decoded = histogram.Histogram.decode(h.encode())
+
+        self.assertEqual(h.counts, decoded.counts)
+        self.assertEqual(2000, decoded.total_count)
+        self.assertEqual(1.5, decoded.min)
+        self.assertEqual(1500.0, decoded.max)
+        self.assertEqual(h.sum, decoded.sum)
+        self.assertEqual(h.percentiles([50, 99, 99.9]), decoded.percentiles([50, 99, 99.9]))
+
+    def test_encode_and_decode_empty_histogram(self):
+        decoded = histogram.Histogram.decode(histogram.Histogram().encode())
+        self.assertEqual(0, decoded.total_count)
+        self.assertIsNone(decoded.min)
+        self.assertIsNone(decoded.max)
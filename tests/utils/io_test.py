@@ -1,4 +1,7 @@
+import bz2
+import gzip
 import os
+import tempfile
 import unittest.mock as mock
 from unittest import TestCase
 
@@ -56,3 +59,207 @@ class IoTests(TestCase):
         self.assertEqual("/already/a/normalized/path", io.normalize_path("/already/a/normalized/path"))
         self.assertEqual("/not/normalized", io.normalize_path("/not/normalized/path/../"))
         self.assertEqual(os.path.expanduser("~"), io.normalize_path("~/Documents/.."))
+
+
+class FileOffsetTableTests(TestCase):
+    def setUp(self):
+        self.data_file = os.path.join(tempfile.mkdtemp(), "documents.json")
+        self.lines = ['{"key": "value%d"}\n' % i for i in range(1, 1001)]
+        with open(self.data_file, "wt") as f:
+            f.writelines(self.lines)
+
+    def tearDown(self):
+        data_dir = os.path.dirname(self.data_file)
+        for f in os.listdir(data_dir):
+            os.remove(os.path.join(data_dir, f))
+        os.rmdir(data_dir)
+
+    def expected_offsets(self, stride):
+        offsets = []
+        offset = 0
+        for line_number, line in enumerate(self.lines):
+            if line_number % stride == 0:
+                offsets.append(offset)
+            offset += len(line)
+        return offsets
+
+    def test_scan_line_offsets(self):
+        for stride in [1, 7, 100, 1000, 5000]:
+            self.assertEqual(self.expected_offsets(stride), io.scan_line_offsets(self.data_file, stride, workers=1))
+
+    @mock.patch("esrally.utils.io._PARALLEL_SCAN_THRESHOLD", 0)
+    @mock.patch("esrally.utils.io._SCAN_BLOCK_SIZE", 100)
+    def test_scan_line_offsets_in_parallel(self):
+        for stride in [1, 7, 100]:
+            self.assertEqual(self.expected_offsets(stride), io.scan_line_offsets(self.data_file, stride, workers=3))
+
+    def test_skip_lines_with_offset_table(self):
+        io.prepare_file_offset_table(self.data_file, stride=10)
+
+        with io.FileOffsetTable(io.offset_table_path(self.data_file)) as offsets:
+            self.assertEqual(10, offsets.stride)
+            self.assertEqual(100, offsets.entries)
+            self.assertEqual((0, 0), offsets.find(5))
+            self.assertEqual((990, self.expected_offsets(10)[99]), offsets.find(995))
+
+        with open(self.data_file, "rt") as f:
+            io.skip_lines(self.data_file, f, 537)
+            self.assertEqual(self.lines[537], f.readline())
+
+    def test_recreates_offset_table_with_different_stride(self):
+        io.prepare_file_offset_table(self.data_file, stride=10)
+        io.prepare_file_offset_table(self.data_file, stride=100)
+
+        self.assertEqual(100, io.FileOffsetTable.stride_of(io.offset_table_path(self.data_file)))
+
+
+class LineAlignedRangeTests(TestCase):
+    def setUp(self):
+        self.data_file = os.path.join(tempfile.mkdtemp(), "documents.json")
+
+    def tearDown(self):
+        os.remove(self.data_file)
+        os.rmdir(os.path.dirname(self.data_file))
+
+    def write_data(self, lines, terminate_last_line=True):
+        contents = "\n".join(lines) + ("\n" if terminate_last_line else "")
+        with open(self.data_file, "wb") as f:
+            f.write(contents.encode("utf-8"))
+
+    def lines_in_range(self, start, end):
+        with open(self.data_file, "rb") as f:
+            f.seek(start)
+            return f.read(end - start).decode("utf-8").splitlines()
+
+    def test_ranges_cover_each_line_exactly_once(self):
+        # lines of varying length so range boundaries fall in the middle of lines
+        lines = ['{"key": "%s"}' % ("x" * (i % 17)) for i in range(1, 200)]
+        for terminate_last_line in [True, False]:
+            self.write_data(lines, terminate_last_line)
+            for parts in [1, 2, 3, 7, 16]:
+                covered = []
+                previous_end = 0
+                for part in range(parts):
+                    start, end = io.line_aligned_range(self.data_file, part, parts)
+                    self.assertEqual(previous_end, start)
+                    previous_end = end
+                    lines_in_range = self.lines_in_range(start, end)
+                    self.assertEqual(len(lines_in_range), io.count_lines_in_range(self.data_file, start, end))
+                    covered.extend(lines_in_range)
+                self.assertEqual(os.path.getsize(self.data_file), previous_end)
+                self.assertEqual(lines, covered)
+
+    def test_more_parts_than_lines(self):
+        self.write_data(['{"key": "value1"}', '{"key": "value2"}'])
+
+        ranges = [io.line_aligned_range(self.data_file, part, 8) for part in range(8)]
+        self.assertEqual([1, 1], [io.count_lines_in_range(self.data_file, start, end) for start, end in ranges if end > start])
+        self.assertEqual(6, len([start for start, end in ranges if start == end]))
+
+
+class DecompressAndIndexTests(TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.contents = "".join(['{"key": "value%d"}\n' % i for i in range(1, 1001)]).encode("utf-8")
+
+    def tearDown(self):
+        for f in os.listdir(self.data_dir):
+            os.remove(os.path.join(self.data_dir, f))
+        os.rmdir(self.data_dir)
+
+    def assert_decompressed_and_indexed(self, archive_path):
+        data_file_path = io.decompress_and_index(archive_path, stride=10)
+
+        self.assertEqual(os.path.join(self.data_dir, "documents.json"), data_file_path)
+        with open(data_file_path, "rb") as f:
+            self.assertEqual(self.contents, f.read())
+        with io.FileOffsetTable(io.offset_table_path(data_file_path)) as offsets:
+            self.assertEqual(10, offsets.stride)
+            self.assertEqual(100, offsets.entries)
+            self.assertEqual((0, 0), offsets.find(0))
+            self.assertEqual((500, self.contents.index(b'{"key": "value501"}')), offsets.find(500))
+
+    @mock.patch("esrally.utils.io.guess_install_location")
+    def test_decompress_and_index_bz2(self, guess_install_location):
+        guess_install_location.return_value = None
+        archive_path = os.path.join(self.data_dir, "documents.json.bz2")
+        with bz2.open(archive_path, "wb") as f:
+            f.write(self.contents)
+
+        self.assert_decompressed_and_indexed(archive_path)
+
+    @mock.patch("esrally.utils.io.guess_install_location")
+    def test_decompress_and_index_gz(self, guess_install_location):
+        guess_install_location.return_value = None
+        archive_path = os.path.join(self.data_dir, "documents.json.gz")
+        with gzip.open(archive_path, "wb") as f:
+            f.write(self.contents)
+
+        self.assert_decompressed_and_indexed(archive_path)
+
+    @mock.patch("esrally.utils.io.guess_install_location")
+    def test_decompress_and_index_with_external_tool(self, guess_install_location):
+        # gzip supports the same command line parameters as pigz
+        guess_install_location.return_value = "gzip"
+        archive_path = os.path.join(self.data_dir, "documents.json.gz")
+        with gzip.open(archive_path, "wb") as f:
+            f.write(self.contents)
+
+        self.assert_decompressed_and_indexed(archive_path)
+
+
+class BlockIndexTests(TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.lines = ['{"key": "value%d"}\n' % i for i in range(1, 1001)]
+        self.contents = "".join(self.lines).encode("utf-8")
+
+    def tearDown(self):
+        for f in os.listdir(self.data_dir):
+            os.remove(os.path.join(self.data_dir, f))
+        os.rmdir(self.data_dir)
+
+    def write_archive(self, name, compress, block_size):
+        archive_path = os.path.join(self.data_dir, name)
+        with open(archive_path, "wb") as f:
+            # blocks deliberately do not end at line boundaries
+            for start in range(0, len(self.contents), block_size):
+                f.write(compress(self.contents[start:start + block_size]))
+        return archive_path
+
+    def assert_lines_can_be_skipped(self, archive_path):
+        for line_number in [0, 1, 17, 500, 537, 999]:
+            with io.CompressedFileSource(archive_path, "rt") as f:
+                io.skip_lines(archive_path, f, line_number)
+                self.assertEqual(self.lines[line_number], f.readline())
+                self.assertEqual(self.lines[line_number + 1] if line_number < 999 else "", f.readline())
+
+    def test_skip_lines_in_multi_member_gzip(self):
+        archive_path = self.write_archive("documents.json.gz", gzip.compress, block_size=1000)
+
+        self.assertEqual(len(self.contents), io.prepare_block_index(archive_path, stride=10))
+        with io.BlockIndex(io.block_index_path(archive_path)) as blocks:
+            self.assertTrue(blocks.entries > 10)
+            self.assertEqual(len(self.contents), blocks.uncompressed_size)
+            # we can start decompressing at a later block instead of at the beginning
+            line_number, offset = blocks.find(537)
+            self.assertTrue(500 < line_number <= 537)
+            self.assertTrue(offset > 0)
+        self.assert_lines_can_be_skipped(archive_path)
+
+    def test_skip_lines_in_multi_stream_bz2(self):
+        archive_path = self.write_archive("documents.json.bz2", bz2.compress, block_size=2500)
+
+        self.assertEqual(len(self.contents), io.prepare_block_index(archive_path, stride=10))
+        with io.BlockIndex(io.block_index_path(archive_path)) as blocks:
+            self.assertTrue(blocks.entries > 1)
+        self.assert_lines_can_be_skipped(archive_path)
+
+    def test_skip_lines_in_single_member_gzip(self):
+        archive_path = self.write_archive("documents.json.gz", gzip.compress, block_size=len(self.contents))
+
+        self.assertEqual(len(self.contents), io.prepare_block_index(archive_path, stride=10))
+        with io.BlockIndex(io.block_index_path(archive_path)) as blocks:
+            self.assertEqual(1, blocks.entries)
+            self.assertEqual((0, 0), blocks.find(537))
+        self.assert_lines_can_be_skipped(archive_path)
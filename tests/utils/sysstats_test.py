@@ -0,0 +1,28 @@
+from unittest import TestCase
+
+from esrally.utils import sysstats
+
+
+class SpreadAcrossPhysicalCoresTests(TestCase):
+    def test_uses_hyperthreading_siblings_last(self):
+        # 4 physical cores with 2 logical cores each; logical cores k and k + 4 are siblings
+        def siblings(core):
+            return "%d,%d" % (core % 4, core % 4 + 4)
+
+        self.assertEqual([0, 1, 2, 3, 4, 5, 6, 7], sysstats.spread_across_physical_cores(list(range(8)), siblings))
+
+    def test_uses_hyperthreading_siblings_last_if_siblings_are_adjacent(self):
+        # logical cores 2k and 2k + 1 are siblings
+        def siblings(core):
+            return "%d-%d" % (core - core % 2, core - core % 2 + 1)
+
+        self.assertEqual([0, 2, 4, 6, 1, 3, 5, 7], sysstats.spread_across_physical_cores(list(range(8)), siblings))
+
+    def test_spreads_only_available_cores(self):
+        def siblings(core):
+            return "%d-%d" % (core - core % 2, core - core % 2 + 1)
+
+        self.assertEqual([1, 2, 4, 3], sysstats.spread_across_physical_cores([1, 2, 3, 4], siblings))
+
+    def test_keeps_order_if_topology_is_unknown(self):
+        self.assertEqual([3, 1, 2], sysstats.spread_across_physical_cores([3, 1, 2], lambda core: None))